@@ -41,20 +41,35 @@ import argparse
 import logging
 import os
 import sys
-import tempfile
+import time
 
+from dlg_paletteGen.cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE, configure_cache
+from dlg_paletteGen.ids import DEFAULT_ID_MODE, ID_MODES, configure_ids
+from dlg_paletteGen.llm import DEFAULT_CONCURRENCY, DEFAULT_RATE, configure_llm
+from dlg_paletteGen.manifest import (
+    format_summary,
+    load_manifest,
+    run_manifest,
+    summarize,
+    write_summary,
+)
+from dlg_paletteGen.sandbox import DEFAULT_TIMEOUT, configure_sandbox
 from dlg_paletteGen.module_base import palettes_from_module
+from dlg_paletteGen.profiling import DEFAULT_TOP, configure_profiler
 from dlg_paletteGen.settings import DOXYGEN_SETTINGS, Language
-from dlg_paletteGen.source_base import process_compounddefs
-from dlg_paletteGen.support_functions import (
-    NAME,
-    VERSION,
-    prepare_and_write_palette,
-    process_doxygen,
-    process_xml,
+from dlg_paletteGen.source_base import palette_from_source
+from dlg_paletteGen.support_functions import NAME, PALETTE_COMPRESSIONS, VERSION
+from dlg_paletteGen.traversal import configure_traversal
+from dlg_paletteGen.watch import (
+    Watcher,
+    module_generator,
+    module_sources,
+    source_generator,
+    source_patterns,
+    watch,
 )
 
-from . import logger
+from . import logger, profiling
 
 
 def get_args(args=None):
@@ -62,19 +77,11 @@ def get_args(args=None):
     """
     Deal with the command line arguments.
 
-    :returns: (
-                args.idir:str,
-                args.tag:str,
-                args.ofile:str,
-                args.parse_all:bool,
-                args.module:str,
-                args.recursive:bool,
-                args.split:bool,
-                args.prevent_cyclic:bool,
-                language)
+    :param args: the parsed arguments, parsed from sys.argv if not given
+
+    :returns: argparse.Namespace, the arguments, with the defaults of the mode
+        applied and the language of the sources as args.language
     """
-    # inputdir, tag, outputfile, allow_missing_eagle_start, module_path,
-    # language
     parser = argparse.ArgumentParser(
         description=__doc__ + f"\nVersion: {VERSION}",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -140,10 +147,183 @@ def get_args(args=None):
     parser.add_argument(
         "-p",
         "--prevent-cyclic",
-        help="Prevent cyclic imports in module mode (should be off for most modules)",
+        help="Only extract the direct sub-modules in module mode, same as "
+        + "--max-depth 1 (sub-modules are extracted once, even if imported cyclically)",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--max-depth",
+        help="Maximum depth of the sub-modules extracted in module mode "
+        + "(default: no limit)",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--max-modules",
+        help="Maximum number of modules extracted per (sub-)module palette in module "
+        + "mode (default: no limit)",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--include",
+        help="Only extract the modules and members whose dotted names match this "
+        + "glob, or regular expression if prefixed by 're:' (module mode only, "
+        + "may be repeated)",
+        action="append",
+        default=[],
+    )
+    parser.add_argument(
+        "--exclude",
+        help="Skip the modules and members whose dotted names match this glob, "
+        + "e.g. '*.tests', or regular expression if prefixed by 're:' (module mode "
+        + "only, may be repeated)",
+        action="append",
+        default=[],
+    )
+    parser.add_argument(
+        "--stream",
+        help="Write the extracted components to temporary files and assemble the "
+        + "palettes from disk, keeping the memory use bounded (module mode only)",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--lazy",
+        help="Find the sub-modules without importing them, each sub-module is only "
+        + "imported when it is extracted (module mode only)",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="Number of worker processes used in split mode (default: 1)",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory of the persistent extraction cache (only applicable in "
+        + "module mode, default: no cache)",
+        default="",
+    )
+    parser.add_argument(
+        "--cache-size",
+        help="Maximum size of the extraction cache in MB (default: %(default)s)",
+        type=int,
+        default=DEFAULT_CACHE_SIZE // 1024**2,
+    )
+    parser.add_argument(
+        "--incremental",
+        help="Only re-extract changed modules (module mode, uses the extraction cache, "
+        + f"default: {DEFAULT_CACHE_DIR}) and only re-write changed palettes",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--sandbox",
+        help="Import and inspect the modules in separate processes, skipping the "
+        + "modules which fail, hang or crash (module mode only)",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--sandbox-timeout",
+        help="Maximum time in seconds to import and inspect a single module in the "
+        + "sandbox, 0 for no limit (default: %(default)s)",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+    )
+    parser.add_argument(
+        "--sandbox-memory",
+        help="Maximum memory of a sandbox process in MB, 0 for no limit "
+        + "(default: %(default)s)",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--static",
+        help="Extract the members from the source files without importing the "
+        + "modules (module mode only)",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--llm-concurrency",
+        help="Maximum number of concurrent LLM docstring requests "
+        + "(default: %(default)s)",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+    )
+    parser.add_argument(
+        "--llm-rate",
+        help="Maximum number of LLM docstring requests per second, 0 for no limit "
+        + "(default: %(default)s)",
+        type=float,
+        default=DEFAULT_RATE,
+    )
+    parser.add_argument(
+        "--llm-batch",
+        help="Maximum number of functions per LLM docstring request "
+        + "(default: %(default)s, i.e. no batching)",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--compact",
+        help="Write the palettes as minified JSON",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--compress",
+        help="Compress the palettes, the file extension (.gz, .zst) is appended "
+        + "(zstd requires the zstandard package)",
+        choices=list(PALETTE_COMPRESSIONS),
+        default=None,
+    )
+    parser.add_argument(
+        "--profile",
+        help="Report the time spent in the phases of the palette generation and "
+        + "write it as JSON next to the palette",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--profile-top",
+        help="Number of slowest members listed by --profile (default: %(default)s)",
+        type=int,
+        default=DEFAULT_TOP,
+    )
+    parser.add_argument(
+        "--profile-memory",
+        help="Also trace the memory allocated per member with --profile, this slows "
+        + "down the generation considerably",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--manifest",
+        help="Generate all palettes listed in a JSON or YAML manifest file in one "
+        + "process, ofile is the name of the summary (idir is ignored)",
+        default="",
+    )
+    parser.add_argument(
+        "--watch",
+        help="Regenerate the palette(s) whenever the sources change, a palette is "
+        + "only re-written if it changed (uses --incremental in module mode)",
         action="store_true",
         default=False,
     )
+    parser.add_argument(
+        "--ids",
+        help="How the node and field ids are generated, deterministic ids are "
+        + "derived from the node and field names (default: %(default)s)",
+        choices=ID_MODES,
+        default=DEFAULT_ID_MODE,
+    )
     if not args:
         if len(sys.argv) == 1:
             print("\x1b[31;20mInsufficient number of arguments provided!!!\n\x1b[0m")
@@ -160,6 +340,11 @@ def get_args(args=None):
     if args.module:
         args.idir = "."  # ignore whatever is provided as idir
         args.parse_all = True  # in module mode parse everything
+    if args.manifest:
+        args.idir = "."  # the inputs are listed in the manifest
+        if args.ofile == ".":
+            args.ofile = f"{os.path.splitext(args.manifest)[0]}.summary.json"
+        logger.info("Generating the palettes listed in manifest %s", args.manifest)
     if args.module and not args.split and args.ofile == ".":
         args.ofile = f"{args.module.replace('.','_')}.palette"
     if args.recursive:
@@ -177,17 +362,43 @@ def get_args(args=None):
         logger.info("Prevent_cyclic flag ON")
     else:
         args.prevent_cyclic = False
-    return (
-        args.idir,
-        args.tag,
-        args.ofile,
-        args.parse_all,
-        args.module,
-        args.recursive,
-        args.split,
-        args.prevent_cyclic,
-        language,
+    if args.jobs > 1:
+        logger.info("Using %d worker processes", args.jobs)
+    if args.incremental:
+        logger.info("Incremental flag ON")
+        if not args.cache_dir:
+            args.cache_dir = DEFAULT_CACHE_DIR
+    if args.static:
+        logger.info("Static flag ON")
+    configure_ids(args.ids)
+    configure_traversal(
+        args.max_depth,
+        args.max_modules,
+        lazy=args.lazy,
+        include=args.include,
+        exclude=args.exclude,
     )
+    configure_profiler(
+        args.profile or args.profile_memory,
+        top=args.profile_top,
+        memory=args.profile_memory,
+    )
+    configure_cache(args.cache_dir, max_size=args.cache_size * 1024**2)
+    if os.environ.get("GEMINI_API_KEY"):
+        # generated docstrings are always cached, since the requests are expensive
+        configure_llm(
+            concurrency=args.llm_concurrency,
+            rate=args.llm_rate,
+            batch_size=args.llm_batch,
+            cache_dir=os.path.join(args.cache_dir or DEFAULT_CACHE_DIR, "llm"),
+        )
+    configure_sandbox(
+        args.sandbox,
+        timeout=args.sandbox_timeout,
+        memory_limit=args.sandbox_memory * 1024**2,
+    )
+    args.language = language
+    return args
 
 
 def check_environment_variables() -> bool:
@@ -225,26 +436,16 @@ def main():  # pragma: no cover
     # read environment variables
     if not check_environment_variables():
         sys.exit(1)
-    (
-        inputdir,
-        tag,
-        outputfile,
-        allow_missing_eagle_start,
-        module_path,
-        recursive,
-        split,
-        prevent_cyclic,
-        language,
-    ) = get_args()
+    args = get_args()
     logger.info("PROJECT_NAME: %s", os.environ.get("PROJECT_NAME"))
     logger.info("PROJECT_VERSION: %s", os.environ.get("PROJECT_VERSION"))
     logger.info("GIT_REPO: %s", os.environ.get("GIT_REPO"))
 
-    logger.info("Input Directory: %s", inputdir)
-    logger.info("Tag: %s", tag)
-    logger.info("Output File: %s", outputfile)
-    logger.info("Allow missing EAGLE_START: %s", str(allow_missing_eagle_start))
-    logger.info("Module Path: %s", module_path)
+    logger.info("Input Directory: %s", args.idir)
+    logger.info("Tag: %s", args.tag)
+    logger.info("Output File: %s", args.ofile)
+    logger.info("Allow missing EAGLE_START: %s", str(args.parse_all))
+    logger.info("Module Path: %s", args.module)
     if os.environ.get("GEMINI_API_KEY"):
         logger.info(
             "GEMINI_API_KEY: provided, LLM docstring generation will be used for "
@@ -255,38 +456,84 @@ def main():  # pragma: no cover
             "GEMINI_API_KEY: not provided, LLM docstring generation will not work!"
         )
 
-    # create a temp directory for the output of doxygen
-    output_directory = tempfile.TemporaryDirectory()
-
-    if len(module_path) > 0:
-        outputfile = "" if outputfile == "." else outputfile
+    if args.manifest:
+        sys.argv = [sys.argv[0]]  # reset sys.argv to avoid issues with the module import
+        start = time.time()
+        results = run_manifest(
+            load_manifest(args.manifest),
+            jobs=args.jobs,
+            incremental=args.incremental,
+            compact=args.compact,
+            compression=args.compress,
+            streaming=args.stream,
+        )
+        summary = summarize(results, time.time() - start)
+        logger.info(
+            "\n\n>>>>>>> Manifest summary <<<<<<<<\n%s\n", format_summary(summary)
+        )
+        write_summary(summary, args.ofile)
+        if summary["failed"]:
+            sys.exit(1)
+    elif args.watch and len(args.module) > 0:
+        sys.argv = [sys.argv[0]]  # reset sys.argv to avoid issues with the module import
+        generate = module_generator(
+            args.module,
+            outfile="" if args.ofile == "." else args.ofile,
+            recursive=args.recursive,
+            split=args.split,
+            prevent_cyclic=args.prevent_cyclic,
+            jobs=args.jobs,
+            static=args.static,
+            compact=args.compact,
+            compression=args.compress,
+            streaming=args.stream,
+        )
+        watch(generate, Watcher(module_sources(args.module)))
+    elif args.watch:
+        generate = source_generator(
+            args.idir,
+            args.ofile,
+            tag=args.tag,
+            allow_missing_eagle_start=args.parse_all,
+            language=args.language,
+            recursive=args.recursive,
+            compact=args.compact,
+            compression=args.compress,
+        )
+        watch(generate, Watcher([args.idir], patterns=source_patterns(args.language)))
+    elif len(args.module) > 0:
+        args.ofile = "" if args.ofile == "." else args.ofile
         sys.argv = [sys.argv[0]]  # reset sys.argv to avoid issues with the module import
         palettes_from_module(
-            module_path,
-            outfile=outputfile,
-            recursive=recursive,
-            split=split,
-            prevent_cyclic=prevent_cyclic,
+            args.module,
+            outfile=args.ofile,
+            recursive=args.recursive,
+            split=args.split,
+            prevent_cyclic=args.prevent_cyclic,
+            jobs=args.jobs,
+            incremental=args.incremental,
+            static=args.static,
+            compact=args.compact,
+            compression=args.compress,
+            streaming=args.stream,
         )
     else:
-        # add extra doxygen setting for input and output locations
-        DOXYGEN_SETTINGS.update({"PROJECT_NAME": os.environ.get("PROJECT_NAME")})
-        DOXYGEN_SETTINGS.update({"INPUT": inputdir})
-        DOXYGEN_SETTINGS.update({"OUTPUT_DIRECTORY": output_directory.name})
-
-        process_doxygen(language=language)
-        output_xml_filename = process_xml()
-
-        # get environment variables
-        # gitrepo = os.environ.get("GIT_REPO")
-        # version = os.environ.get("PROJECT_VERSION")
-
-        nodes = process_compounddefs(
-            output_xml_filename, tag, allow_missing_eagle_start, language
+        palette_from_source(
+            args.idir,
+            args.ofile,
+            tag=args.tag,
+            allow_missing_eagle_start=args.parse_all,
+            language=args.language,
+            recursive=args.recursive,
+            incremental=args.incremental,
+            compact=args.compact,
+            compression=args.compress,
         )
-        _ = prepare_and_write_palette(nodes, outputfile)
-    # cleanup the output directory
-    output_directory.cleanup()
+        if profiling.PROFILER:
+            logger.info(profiling.PROFILER.summary())
+            profiling.PROFILER.write(
+                f"{args.ofile.rsplit('.palette', 1)[0]}.profile.json"
+            )
 
 
 # rc = 1
@@ -0,0 +1,489 @@
+"""
+Benchmark the palette generation in module and source mode.
+
+Every benchmark case is executed in a new process, thus the modules imported by
+one case don't affect the timing of the next one and the peak RSS is the one of
+the case alone. The results are printed as a table and saved as JSON, a previous
+result file can be compared with the current run.
+
+Run `python -m dlg_paletteGen.benchmark -h` or `dlg_paletteGen-benchmark -h`.
+"""
+
+import argparse
+import datetime
+import glob
+import importlib.util
+import json
+import math
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+from typing import Union
+
+from dlg_paletteGen import synthetic
+from dlg_paletteGen.module_base import palettes_from_module
+from dlg_paletteGen.settings import DOXYGEN_SETTINGS, Language
+from dlg_paletteGen.source_base import process_compounddefs
+from dlg_paletteGen.support_functions import (
+    NAME,
+    VERSION,
+    prepare_and_write_palette,
+    process_doxygen,
+    process_xml,
+    read_palette,
+)
+
+from . import logger
+
+try:
+    import resource
+except ImportError:  # pragma: no cover, not available on Windows
+    resource = None  # type: ignore
+
+DEFAULT_PACKAGES = ["json", "numpy"]
+DEFAULT_RESULTS = "benchmark_results.json"
+# growth exponent of the wall time above which the scaling is flagged
+SCALING_THRESHOLD = 1.2
+# the examples are part of the repository, not of the installed package
+EXAMPLES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "data"
+)
+
+
+def peak_rss() -> float:
+    """Return the peak resident set size of this process in MB."""
+    if resource is None:  # pragma: no cover
+        return 0.0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kB everywhere else
+    return rss / 1024**2 if sys.platform == "darwin" else rss / 1024
+
+
+def count_nodes(directory: str) -> int:
+    """Return the total number of nodes of the palettes in directory."""
+    nodes = 0
+    for filename in glob.glob(os.path.join(directory, "*.palette*")):
+        palette = read_palette(filename)
+        nodes += len(palette.get("nodeDataArray", [])) if palette else 0
+    return nodes
+
+
+def _run_module(target: str, workdir: str, search_path: str) -> dict:
+    """Generate the palette of module target and return the phase timings."""
+    if search_path:
+        sys.path.insert(0, search_path)
+    start = time.perf_counter()
+    palettes_from_module(target, outfile=os.path.join(workdir, "bench.palette"))
+    return {"module": time.perf_counter() - start}
+
+
+def _run_source(target: str, workdir: str, search_path: str) -> dict:
+    """Generate the palette of the source file(s) target using doxygen."""
+    phases = {}
+    DOXYGEN_SETTINGS.update(
+        {
+            "PROJECT_NAME": os.environ.get("PROJECT_NAME", "benchmark"),
+            "INPUT": target,
+            "OUTPUT_DIRECTORY": workdir,
+            "RECURSIVE": "YES" if os.path.isdir(target) else "NO",
+        }
+    )
+    start = time.perf_counter()
+    process_doxygen(language=Language.PYTHON)
+    phases["doxygen"] = time.perf_counter() - start
+    start = time.perf_counter()
+    output_xml_filename = process_xml()
+    phases["xml"] = time.perf_counter() - start
+    start = time.perf_counter()
+    nodes = process_compounddefs(output_xml_filename, "", True, Language.PYTHON)
+    phases["compounddefs"] = time.perf_counter() - start
+    start = time.perf_counter()
+    prepare_and_write_palette(nodes, os.path.join(workdir, "bench.palette"))
+    phases["write"] = time.perf_counter() - start
+    return phases
+
+
+RUNNERS = {"module": _run_module, "source": _run_source}
+
+
+def run_case(case: dict) -> dict:
+    """
+    Execute a single benchmark case, this is called in a new process.
+
+    :param case: dict, with the name, mode ("module" or "source") and target (a
+        module name or a file/directory) of the case and an optional search_path
+        added to sys.path
+
+    :returns: dict, the wall time and phase timings in seconds, the peak RSS in MB
+        and the number of nodes, or the error of a failed case
+    """
+    workdir = tempfile.mkdtemp(prefix="dlg_bench_")
+    cwd = os.getcwd()
+    # process_xml leaves a copy of the XML in the current directory
+    os.chdir(workdir)
+    result: dict = {}
+    try:
+        start = time.perf_counter()
+        result["phases"] = RUNNERS[case["mode"]](
+            case["target"], workdir, case.get("search_path", "")
+        )
+        result["wall"] = time.perf_counter() - start
+        result["peak_rss"] = peak_rss()
+        result["nodes"] = count_nodes(workdir)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.debug(
+            "Benchmark case %s failed:\n%s", case["name"], traceback.format_exc()
+        )
+        result = {"error": f"{type(e).__name__}: {e}"}
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def default_cases(
+    examples_dir: str = EXAMPLES_DIR,
+    packages: Union[list, None] = None,
+    modes: tuple = ("module", "source"),
+) -> list:
+    """
+    Return the benchmark cases of the bundled examples and installed packages.
+
+    :param examples_dir: str, directory containing the example_*.py files
+    :param packages: list, names of installed packages benchmarked in module mode,
+        packages which are not installed are skipped
+    :param modes: tuple, the modes of the cases
+
+    :returns: list of case dicts, see run_case
+    """
+    cases = []
+    examples = sorted(glob.glob(os.path.join(examples_dir, "example_*.py")))
+    for mode in modes:
+        for example in examples:
+            name = os.path.splitext(os.path.basename(example))[0]
+            cases.append(
+                {
+                    "name": f"{mode}:{name}",
+                    "mode": mode,
+                    "target": name if mode == "module" else example,
+                    "search_path": examples_dir,
+                }
+            )
+    if "module" in modes:
+        for package in DEFAULT_PACKAGES if packages is None else packages:
+            if importlib.util.find_spec(package) is None:
+                logger.warning("Package %s is not installed, skipped", package)
+                continue
+            cases.append(
+                {"name": f"module:{package}", "mode": "module", "target": package}
+            )
+    return cases
+
+
+def scaling_cases(
+    directory: str,
+    sizes: list,
+    modes: tuple = ("module", "source"),
+    **package_args,
+) -> list:
+    """
+    Write synthetic packages of increasing size and return their benchmark cases.
+
+    :param directory: str, the directory the packages are written to
+    :param sizes: list, the numbers of modules of the packages
+    :param modes: tuple, the modes of the cases
+    :param package_args: the other size arguments of synthetic.generate_package
+
+    :returns: list of case dicts, see run_case, with the number of members
+    """
+    cases = []
+    for size in sorted(sizes):
+        name = f"synthetic_{size}"
+        path, members = synthetic.generate_package(
+            directory, name, modules=size, **package_args
+        )
+        for mode in modes:
+            cases.append(
+                {
+                    "name": f"{mode}:{name}",
+                    "mode": mode,
+                    "target": name if mode == "module" else path,
+                    "search_path": directory,
+                    "members": members,
+                }
+            )
+    return cases
+
+
+def scaling_exponents(results: list, threshold: float = SCALING_THRESHOLD) -> list:
+    """
+    Return the growth exponents of the wall time between consecutive package sizes.
+
+    The exponent k of wall ~ members**k is about 1 for linear scaling, larger
+    exponents indicate super-linear behaviour.
+
+    :param results: list of result dicts of scaling_cases
+    :param threshold: float, exponents above this are flagged as super-linear
+
+    :returns: list of dicts with the mode, the two sizes, the exponent and
+        whether it is super-linear
+    """
+    exponents = []
+    for mode in RUNNERS:
+        runs = [r for r in results if r["mode"] == mode and "wall" in r]
+        runs.sort(key=lambda r: r["members"])
+        for small, large in zip(runs, runs[1:]):
+            if large["members"] <= small["members"] or not small["wall"]:
+                continue
+            exponent = math.log(large["wall"] / small["wall"]) / math.log(
+                large["members"] / small["members"]
+            )
+            exponents.append(
+                {
+                    "mode": mode,
+                    "members": [small["members"], large["members"]],
+                    "exponent": exponent,
+                    "super_linear": exponent > threshold,
+                }
+            )
+            if exponent > threshold:
+                logger.warning(
+                    "Super-linear scaling in %s mode from %d to %d members: "
+                    + "wall time ~ members**%.2f",
+                    mode,
+                    small["members"],
+                    large["members"],
+                    exponent,
+                )
+    return exponents
+
+
+def run_benchmarks(cases: list, repeat: int = 1) -> list:
+    """
+    Run the benchmark cases, each repetition in a new process.
+
+    :param cases: list of case dicts, see run_case
+    :param repeat: int, number of repetitions of every case, the median wall time
+        and maximum peak RSS are reported
+
+    :returns: list of result dicts
+    """
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for case in cases:
+        if case["mode"] == "source" and not shutil.which("doxygen"):
+            logger.warning("doxygen is not installed, skipping %s", case["name"])
+            results.append({"name": case["name"], "mode": case["mode"], "skipped": True})
+            continue
+        runs = []
+        for _ in range(max(1, repeat)):
+            with ctx.Pool(1) as pool:
+                runs.append(pool.apply(run_case, (case,)))
+        result = {k: v for k, v in case.items() if k != "search_path"}
+        errors = [run["error"] for run in runs if "error" in run]
+        if errors:
+            result["error"] = errors[0]
+        else:
+            wall = statistics.median(run["wall"] for run in runs)
+            result.update(
+                {
+                    "wall": wall,
+                    "peak_rss": max(run["peak_rss"] for run in runs),
+                    "nodes": runs[0]["nodes"],
+                    "nodes_per_second": runs[0]["nodes"] / wall if wall else 0.0,
+                    "phases": {
+                        phase: statistics.median(run["phases"][phase] for run in runs)
+                        for phase in runs[0]["phases"]
+                    },
+                }
+            )
+        logger.info("Benchmark %s: %s", case["name"], format_result(result))
+        results.append(result)
+    return results
+
+
+def format_result(result: dict) -> str:
+    """Return a one line summary of a benchmark result."""
+    if result.get("skipped"):
+        return "skipped"
+    if "error" in result:
+        return f"failed: {result['error']}"
+    return (
+        f"{result['wall']:8.3f} s {result['peak_rss']:8.1f} MB "
+        f"{result['nodes']:6d} nodes {result['nodes_per_second']:10.1f} nodes/s"
+    )
+
+
+def compare_results(results: list, previous: dict) -> str:
+    """
+    Return a table comparing the results with those of a previous run.
+
+    :param results: list of result dicts of this run
+    :param previous: dict, the content of a previous result file
+
+    :returns: str, the table with the ratios current/previous of the wall time
+        and peak RSS
+    """
+    old = {r["name"]: r for r in previous.get("results", []) if "wall" in r}
+    lines = [f"{'case':40s} {'wall':>8s} {'ratio':>7s} {'rss':>8s} {'ratio':>7s}"]
+    for result in results:
+        if "wall" not in result or result["name"] not in old:
+            continue
+        before = old[result["name"]]
+        lines.append(
+            f"{result['name']:40s} {result['wall']:8.3f} "
+            f"{result['wall'] / before['wall']:7.2f} {result['peak_rss']:8.1f} "
+            f"{result['peak_rss'] / before['peak_rss']:7.2f}"
+        )
+    return "\n".join(lines)
+
+
+def save_results(results: list, filename: str, **extra) -> dict:
+    """
+    Save the results together with a description of the environment as JSON.
+
+    :param results: list of result dicts
+    :param filename: str, the name of the JSON file
+    :param extra: additional entries of the JSON file
+
+    :returns: dict, the saved content
+    """
+    content = {
+        "generator": f"{NAME} {VERSION}",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+        **extra,
+    }
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(content, f, indent=4)
+    return content
+
+
+def get_args(args=None):
+    """Parse the command line arguments of the benchmark."""
+    parser = argparse.ArgumentParser(
+        prog="dlg_paletteGen-benchmark",
+        description="Benchmark the palette generation in module and source mode",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="JSON file the results are written to (default: %(default)s)",
+        default=DEFAULT_RESULTS,
+    )
+    parser.add_argument(
+        "-c", "--compare", help="JSON file of a previous run to compare with"
+    )
+    parser.add_argument(
+        "-e",
+        "--examples",
+        help="directory containing the example_*.py files (default: %(default)s)",
+        default=EXAMPLES_DIR,
+    )
+    parser.add_argument(
+        "-p",
+        "--packages",
+        help="installed packages benchmarked in module mode (default: %(default)s)",
+        nargs="*",
+        default=DEFAULT_PACKAGES,
+    )
+    parser.add_argument(
+        "--modes",
+        help="modes to benchmark (default: %(default)s)",
+        nargs="+",
+        choices=list(RUNNERS),
+        default=list(RUNNERS),
+    )
+    parser.add_argument(
+        "-k",
+        "--filter",
+        help="only run the cases whose name contains this string",
+        default="",
+    )
+    parser.add_argument(
+        "-n",
+        "--repeat",
+        help="number of repetitions of every case (default: %(default)s)",
+        type=int,
+        default=1,
+    )
+    scaling = parser.add_argument_group(
+        "scaling", "benchmark synthetic packages instead of the examples"
+    )
+    scaling.add_argument(
+        "--scaling",
+        help="numbers of modules of the synthetic packages, e.g. 10 100 1000",
+        nargs="+",
+        type=int,
+        metavar="MODULES",
+    )
+    for option, default, help_text in (
+        ("--functions", 5, "number of functions per module"),
+        ("--classes", 5, "number of classes per module"),
+        ("--methods", 5, "number of methods per class"),
+        ("--params", 3, "number of parameters per function or method"),
+    ):
+        scaling.add_argument(
+            option, help=f"{help_text} (default: %(default)s)", type=int, default=default
+        )
+    return parser.parse_args(args)
+
+
+def main(args=None):  # pragma: no cover
+    """Run the benchmarks, print and save the results."""
+    args = get_args(args)
+    # the run of a case must not depend on the network
+    os.environ.pop("GEMINI_API_KEY", None)
+    for variable, value in (
+        ("PROJECT_NAME", "benchmark"),
+        ("PROJECT_VERSION", "0.1"),
+        ("GIT_REPO", "benchmark"),
+    ):
+        os.environ.setdefault(variable, value)
+    package_dir = tempfile.TemporaryDirectory(prefix="dlg_synthetic_")
+    if args.scaling:
+        cases = scaling_cases(
+            package_dir.name,
+            args.scaling,
+            tuple(args.modes),
+            functions=args.functions,
+            classes=args.classes,
+            methods=args.methods,
+            params=args.params,
+        )
+    else:
+        cases = default_cases(args.examples, args.packages, tuple(args.modes))
+    cases = [case for case in cases if args.filter in case["name"]]
+    results = run_benchmarks(cases, repeat=args.repeat)
+    package_dir.cleanup()
+    print(f"{'case':40s} {'wall':>10s} {'peak RSS':>11s} {'nodes':>12s} {'rate':>18s}")
+    for result in results:
+        print(f"{result['name']:40s} {format_result(result)}")
+    extra = {}
+    if args.scaling:
+        extra["scaling"] = scaling_exponents(results)
+        for entry in extra["scaling"]:
+            small, large = entry["members"]
+            flag = " SUPER-LINEAR" if entry["super_linear"] else ""
+            print(
+                f"{entry['mode']:6s} {small:7d} -> {large:7d} members: "
+                f"wall ~ members**{entry['exponent']:.2f}{flag}"
+            )
+    save_results(results, args.output, **extra)
+    logger.info("Wrote benchmark results to %s", args.output)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print(compare_results(results, json.load(f)))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
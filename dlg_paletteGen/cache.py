@@ -0,0 +1,225 @@
+"""Persistent on-disk cache for the members extracted from modules."""
+
+import hashlib
+import inspect
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Union
+
+from dlg_paletteGen import traversal
+from dlg_paletteGen.support_functions import VERSION, get_mod_name
+
+from . import logger
+
+DEFAULT_CACHE_DIR = "~/.cache/dlg_paletteGen"
+DEFAULT_CACHE_SIZE = 512 * 1024**2  # bytes
+
+
+class ExtractionCache:
+    """
+    Size bounded on-disk cache of the members dictionaries produced by get_members.
+
+    Entries are keyed by the module name, the version of the package, the path,
+    modification time and size of the source files and the version of the palette
+    generator. Thus an entry is never invalidated explicitly, it just ceases to be
+    used once the module changes. The members of a module are often defined in
+    other modules and re-exported, thus every entry also records the path,
+    modification time and size of the files its members are defined in (see
+    origins), and an entry whose origins changed is a miss. The least recently
+    used entries are evicted once the total size of the cache exceeds max_size.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int = DEFAULT_CACHE_SIZE):
+        """
+        Initialize the cache.
+
+        :param cache_dir: str, directory used to store the cache entries
+        :param max_size: int, maximum total size of the cache in bytes
+        """
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.max_size = max_size
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self.size = sum(size for _, _, size in self._entries())
+
+    def _entries(self) -> list:
+        """Return (mtime, path, size) of all cache entries, oldest first."""
+        entries = []
+        for fname in os.listdir(self.cache_dir):
+            if not fname.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, fname)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:  # evicted by a concurrent process
+                continue
+            entries.append((stat.st_mtime_ns, path, stat.st_size))
+        return sorted(entries)
+
+    def key(self, module: Any, parent: Union[str, None] = None) -> Union[str, None]:
+        """
+        Construct the cache key of a module.
+
+        :param module: module object
+        :param parent: str, the parent name passed to get_members
+
+        :returns: str, the key or None if the module can't be cached
+        """
+        src = getattr(module, "__file__", None) if inspect.ismodule(module) else None
+        if not src or not os.path.exists(src):
+            # builtin modules and namespace packages are cheap or can't be tracked
+            return None
+        module_name = get_mod_name(module)
+        package = sys.modules.get(module_name.split(".", 1)[0])
+        sources = [src]
+        if os.path.basename(src).startswith("__init__."):
+            # the members of a package are usually imported from its modules
+            pdir = os.path.dirname(src)
+            sources += sorted(
+                os.path.join(pdir, f) for f in os.listdir(pdir) if f.endswith(".py")
+            )
+        files = _stat_files(sources)
+        key_data = [
+            module_name,
+            str(getattr(package, "__version__", "")),
+            parent,
+            files,
+            VERSION,
+        ]
+        if traversal.FILTER:
+            # the members pruned by the filters are missing from the entry
+            key_data.append(traversal.FILTER.patterns())
+        return hashlib.sha256(json.dumps(key_data).encode()).hexdigest()
+
+    @staticmethod
+    def origins(module: Any) -> list:
+        """
+        Return the files the public callables of a module are defined in.
+
+        :param module: module object
+
+        :returns: list of [path, mtime, size] of the source files, sorted by path
+        """
+        paths = set()
+        for name, member in list(vars(module).items()):
+            if name.startswith("_") or not callable(member):
+                continue
+            try:
+                path = inspect.getsourcefile(member)
+            except (TypeError, OSError):  # builtins and C extensions
+                continue
+            if path:
+                paths.add(os.path.abspath(path))
+        return [list(stat) for stat in _stat_files(sorted(paths))]
+
+    def get(self, key: str) -> Union[dict, None]:
+        """
+        Load the members stored under key.
+
+        :param key: str, the cache key
+
+        :returns: dict of members, or None if not cached
+        """
+        path = os.path.join(self.cache_dir, f"{key}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as cfile:
+                entry = json.load(cfile)
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError):
+            self.stats["misses"] += 1
+            return None
+        origins = entry.get("origins", [])
+        if _stat_files([path for path, _, _ in origins]) != [tuple(o) for o in origins]:
+            logger.debug("Extraction cache entry of %s is stale", entry["module"])
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        logger.debug("Extraction cache hit for %s", entry["module"])
+        return entry["members"]
+
+    def put(
+        self, key: str, module_name: str, members: dict, origins: Union[list, None] = None
+    ):
+        """
+        Store the members of a module under key.
+
+        :param key: str, the cache key
+        :param module_name: str, the name of the module (informational)
+        :param members: dict, the members dictionary returned by get_members
+        :param origins: list, the source files of the members, see origins
+        """
+        try:
+            content = json.dumps(
+                {"module": module_name, "members": members, "origins": origins or []}
+            )
+        except (TypeError, ValueError) as e:
+            logger.debug("Members of %s can't be cached: %s", module_name, e)
+            return
+        fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as cfile:
+            cfile.write(content)
+        os.replace(tmp_name, os.path.join(self.cache_dir, f"{key}.json"))
+        self.stats["writes"] += 1
+        self.size += len(content)
+        if self.size > self.max_size:
+            self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits max_size."""
+        entries = self._entries()
+        self.size = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if self.size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+                self.stats["evictions"] += 1
+            except FileNotFoundError:
+                pass
+            self.size -= size
+
+    def summary(self) -> str:
+        """Return a one line summary of the cache statistics."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        rate = 100.0 * self.stats["hits"] / lookups if lookups else 0.0
+        return (
+            f"Extraction cache {self.cache_dir}: {self.stats['hits']} hits, "
+            f"{self.stats['misses']} misses ({rate:.1f}% hit rate), "
+            f"{self.stats['writes']} writes, {self.stats['evictions']} evictions, "
+            f"{self.size / 1024**2:.1f} of {self.max_size / 1024**2:.1f} MB used"
+        )
+
+
+def _stat_files(paths: list) -> list:
+    """Return (path, mtime, size) of the files, a missing file has mtime and size -1."""
+    files = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            files.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            files.append((path, -1, -1))
+    return files
+
+
+EXTRACTION_CACHE: Union[ExtractionCache, None] = None
+
+
+def configure_cache(
+    cache_dir: Union[str, None], max_size: int = DEFAULT_CACHE_SIZE
+) -> Union[ExtractionCache, None]:
+    """
+    Enable (or disable) the extraction cache.
+
+    :param cache_dir: str, directory of the cache, None or "" disables the cache
+    :param max_size: int, maximum total size of the cache in bytes
+
+    :returns: the ExtractionCache or None
+    """
+    global EXTRACTION_CACHE  # pylint: disable=global-statement
+    EXTRACTION_CACHE = ExtractionCache(cache_dir, max_size) if cache_dir else None
+    if EXTRACTION_CACHE:
+        logger.info("Using extraction cache in %s", EXTRACTION_CACHE.cache_dir)
+    return EXTRACTION_CACHE
@@ -3,9 +3,12 @@
 
 from __future__ import annotations
 
+import copy
+import hashlib
 import inspect
 import re
 import xml.etree.ElementTree as ET
+from collections import OrderedDict
 from typing import Optional, Union
 
 from docstring_parser import parse
@@ -17,7 +20,7 @@ from dlg_paletteGen.support_functions import (
     typeFix,
 )
 
-from . import logger
+from . import logger, profiling
 
 
 class DummySig:
@@ -105,6 +108,83 @@ class DummyParam:  # no-eq: R0903
     default = inspect._empty
 
 
+DOCSTRING_CACHE_SIZE = 2048
+
+
+class DocstringCache:
+    """
+    Bounded LRU cache of parsed docstrings.
+
+    Inherited methods, overloads and wrappers often share the same docstring, thus
+    the parsed results are keyed by a hash of the text and its format. Copies are
+    stored and returned, since the callers modify the parameter dictionaries.
+    """
+
+    def __init__(self, max_size: int = DOCSTRING_CACHE_SIZE):
+        """
+        Initialize the cache.
+
+        :param max_size: int, maximum number of entries
+        """
+        self.max_size = max_size
+        self.entries: OrderedDict = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def key(text: str, doc_format: str) -> tuple:
+        """
+        Construct the cache key of a docstring.
+
+        :param text: str, the docstring
+        :param doc_format: str, the format identified for the docstring
+
+        :returns: tuple, the key
+        """
+        return (hashlib.sha1(text.encode(errors="replace")).hexdigest(), doc_format)
+
+    def get(self, key: tuple) -> Union[tuple, None]:
+        """
+        Return a copy of the parsed docstring stored under key.
+
+        :param key: tuple, the cache key
+
+        :returns: tuple, (description, main_descr, params, returns) or None
+        """
+        if key not in self.entries:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        self.entries.move_to_end(key)
+        return copy.deepcopy(self.entries[key])
+
+    def put(self, key: tuple, parsed: tuple):
+        """
+        Store a copy of a parsed docstring under key.
+
+        :param key: tuple, the cache key
+        :param parsed: tuple, (description, main_descr, params, returns)
+        """
+        self.entries[key] = copy.deepcopy(parsed)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def summary(self) -> str:
+        """Return a one line summary of the cache statistics."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        rate = 100.0 * self.stats["hits"] / lookups if lookups else 0.0
+        return (
+            f"Docstring cache: {self.stats['hits']} hits, "
+            f"{self.stats['misses']} misses ({rate:.1f}% hit rate), "
+            f"{self.stats['evictions']} evictions, "
+            f"{len(self.entries)} of {self.max_size} entries used"
+        )
+
+
+DOCSTRING_CACHE = DocstringCache()
+
+
 class DetailedDescription:
     """
     Class performs parsing of detailed description elements.
@@ -120,6 +200,7 @@ class DetailedDescription:
         "casa": r"\n-{2,20}? parameter",
     }
 
+    @profiling.profiled("docstrings")
     def __init__(self, descr: Optional[str] = None, name=None):
         """
         Initialize description object using a string.
@@ -130,7 +211,15 @@ class DetailedDescription:
         self.description = descr if descr else ""
         self.format = ""
         self._identify_format()
-        self.main_descr, self.params, self.returns = self.process_descr()
+        key = DOCSTRING_CACHE.key(self.description, self.format)
+        parsed = DOCSTRING_CACHE.get(key)
+        if parsed:
+            self.description, self.main_descr, self.params, self.returns = parsed
+        else:
+            self.main_descr, self.params, self.returns = self.process_descr()
+            DOCSTRING_CACHE.put(
+                key, (self.description, self.main_descr, self.params, self.returns)
+            )
         self.brief_descr = self.main_descr.split(".")[0] + "." if self.main_descr else ""
 
     def _process_rEST(self, dd="") -> Union[tuple | None]:
@@ -0,0 +1,101 @@
+"""Generate the ids of the palette nodes and their fields."""
+
+import itertools
+import os
+import uuid
+from typing import Union
+
+from . import logger
+
+ID_MODES = ("random", "counter", "deterministic")
+DEFAULT_ID_MODE = "random"
+
+# namespace of the ids derived from the node and field names
+ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "https://github.com/ICRAR/dlg_paletteGen")
+
+
+class IdGenerator:
+    """
+    Generator of the node and field ids.
+
+    In random mode every id is a random UUID. In counter mode the ids consist of
+    a random prefix, which is drawn once per process, followed by a counter, which
+    is the fastest way to get ids which are unique across runs. In deterministic
+    mode the ids are derived from the node and field names by assign_ids once the
+    nodes are complete, thus the same code always produces the same palette. The
+    ids issued before are just placeholders in this mode.
+    """
+
+    def __init__(self, mode: str = DEFAULT_ID_MODE):
+        """
+        Initialize the generator.
+
+        :param mode: str, one of ID_MODES
+        """
+        if mode not in ID_MODES:
+            raise ValueError(f"Unknown id mode '{mode}', use one of {ID_MODES}")
+        self.mode = mode
+        self._pid = -1
+        self._prefix = ""
+        self._counter = itertools.count()
+
+    def next_id(self) -> str:
+        """Return a new id."""
+        if self.mode == "random":
+            return str(uuid.uuid4())
+        if self._pid != os.getpid():
+            # a forked process must not continue the sequence of its parent
+            self._pid = os.getpid()
+            self._prefix = uuid.uuid4().hex[:24]
+            self._counter = itertools.count()
+        return f"{self._prefix}{next(self._counter):08x}"
+
+    @staticmethod
+    def derive_id(*names: str) -> str:
+        """Return the id derived from names."""
+        return str(uuid.uuid5(ID_NAMESPACE, "/".join(names)))
+
+    def assign_ids(self, nodes: list, seen: Union[dict, None] = None) -> list:
+        """
+        Replace the ids of the nodes and their fields by ids derived from the names.
+
+        Nodes with the same name are distinguished by the number of their
+        occurrence. Nothing is done unless the mode is deterministic.
+
+        :param nodes: list, the nodes of a palette, updated in place
+        :param seen: dict, the occurrences of the names, to be passed to the
+            following calls if the nodes of a palette are assigned in batches
+
+        :returns: list, the nodes
+        """
+        if self.mode != "deterministic":
+            return nodes
+        seen = {} if seen is None else seen
+        for node in nodes:
+            name = str(node.get("name") or node.get("text") or "")
+            seen[name] = seen.get(name, -1) + 1
+            key = f"{name}#{seen[name]}" if seen[name] else name
+            node["id"] = self.derive_id(key)
+            fields = node.get("fields", [])
+            for field in fields.values() if isinstance(fields, dict) else fields:
+                if isinstance(field, dict) and "id" in field:
+                    field["id"] = self.derive_id(key, str(field.get("name", "")))
+        return nodes
+
+
+ID_GENERATOR = IdGenerator()
+
+
+def configure_ids(mode: str = DEFAULT_ID_MODE) -> IdGenerator:
+    """
+    Set the mode of the ids of the palette nodes and fields.
+
+    :param mode: str, one of ID_MODES
+
+    :returns: the IdGenerator
+    """
+    global ID_GENERATOR  # pylint: disable=global-statement
+    ID_GENERATOR = IdGenerator(mode)
+    if mode != DEFAULT_ID_MODE:
+        logger.info("Using %s node and field ids", mode)
+    return ID_GENERATOR
@@ -0,0 +1,485 @@
+"""Concurrent and cached generation of docstrings using an LLM."""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from typing import Any, Union
+
+from . import logger
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE = 10.0  # requests per second
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0  # seconds
+DEFAULT_BATCH_BUDGET = 16000  # characters of source code per batch prompt
+
+
+def docstring_prompt(func_source: str) -> str:
+    """
+    Construct the prompt asking for the docstring of a function.
+
+    :param func_source: str, the source code of the function
+
+    :returns: str, the prompt
+    """
+    return (
+        "Produce the Google-style Python docstring for the function:\n\n"
+        f"{func_source}\n\nReturn parameter descriptions with types."
+        "Return only the docstring without any quotes. "
+        "Wrap lines at 90 characters"
+    )
+
+
+def batch_prompt(func_sources: list) -> str:
+    """
+    Construct the prompt asking for the docstrings of several functions.
+
+    :param func_sources: list of str, the source code of the functions
+
+    :returns: str, the prompt
+    """
+    functions = "\n\n".join(
+        f"### Function {i}\n{source}" for i, source in enumerate(func_sources)
+    )
+    return (
+        "Produce the Google-style Python docstrings for each of the following "
+        f"{len(func_sources)} functions. Return parameter descriptions with types. "
+        "Wrap lines at 90 characters. Return only a JSON object mapping the number "
+        "of each function to its docstring without any quotes.\n\n" + functions
+    )
+
+
+def parse_batch_response(text: str, count: int) -> dict:
+    """
+    Split the response to a batch prompt into the docstrings of the functions.
+
+    :param text: str, the response
+    :param count: int, the number of functions in the batch
+
+    :returns: dict, the docstrings keyed by the index of the function
+
+    :raises ValueError: if the response is not a JSON object
+    """
+    text = text.strip()
+    if text.startswith("```"):  # markdown code block
+        text = text.split("\n", 1)[-1].rsplit("```", 1)[0]
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("Batch response is not a JSON object")
+    docs = {}
+    for key, doc in data.items():
+        try:
+            index = int(str(key).rsplit(" ", 1)[-1])
+        except ValueError:
+            continue
+        if 0 <= index < count and isinstance(doc, str) and doc.strip():
+            docs[index] = doc
+    return docs
+
+
+def _batches(func_sources: list, max_count: int, budget: int) -> list:
+    """
+    Group sources into batches of at most max_count sources and budget characters.
+
+    :param func_sources: list of str, the source code of the functions
+    :param max_count: int, maximum number of functions per batch
+    :param budget: int, maximum number of characters per batch, a larger source
+        forms a batch on its own
+
+    :returns: list of lists of str
+    """
+    batches: list = []
+    batch: list = []
+    size = 0
+    for source in func_sources:
+        if batch and (len(batch) >= max_count or size + len(source) > budget):
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(source)
+        size += len(source)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class TokenBucket:
+    """Token bucket limiting the rate of the requests of an event loop."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        """
+        Initialize a full bucket.
+
+        :param rate: float, tokens added per second, 0 for no limit
+        :param capacity: float, maximum number of tokens, i.e. the burst size
+        """
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        if not self.rate:
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return
+            await asyncio.sleep((1.0 - self.tokens) / self.rate)
+
+
+class DocstringGenerator:
+    """
+    Generate docstrings using a single (async) genai client.
+
+    The requests are sent concurrently, limited by a semaphore and a token bucket
+    and retried with exponential backoff. The results are memoized and, if a
+    cache directory is given, stored on disk keyed by a hash of the model and the
+    prompt, thus re-runs don't send any requests for unchanged sources.
+
+    With a batch_size larger than 1 the docstrings of several functions are
+    requested with a single prompt. The docstrings of a batch response are cached
+    like the ones of single requests, which are still used for the functions
+    missing in a batch response or if it can't be parsed.
+    """
+
+    def __init__(
+        self,
+        client: Any = None,
+        model: str = DEFAULT_MODEL,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        rate: float = DEFAULT_RATE,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        cache_dir: Union[str, None] = None,
+        batch_size: int = 1,
+        batch_budget: int = DEFAULT_BATCH_BUDGET,
+    ):
+        """
+        Initialize the generator, the client is created on first use.
+
+        :param client: genai.Client or an object providing client.aio.models
+            .generate_content, e.g. a fake client for testing
+        :param model: str, the model used by default
+        :param concurrency: int, maximum number of concurrent requests
+        :param rate: float, maximum number of requests per second, 0 for no limit
+        :param retries: int, number of retries of a failed request
+        :param backoff: float, delay before the first retry in seconds
+        :param cache_dir: str, directory of the persistent cache, None for no cache
+        :param batch_size: int, maximum number of functions per prompt
+        :param batch_budget: int, maximum number of characters of source code per
+            batch prompt
+        """
+        self.model = model
+        self.batch_size = batch_size
+        self.batch_budget = batch_budget
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self.memo: dict = {}
+        self.store = None
+        if cache_dir:
+            # cache imports support_functions, which imports this module
+            from dlg_paletteGen.cache import (  # pylint: disable=import-outside-toplevel
+                ExtractionCache,
+            )
+
+            self.store = ExtractionCache(cache_dir)
+        self.stats = {
+            "requests": 0,
+            "retries": 0,
+            "failures": 0,
+            "hits": 0,
+            "batches": 0,
+            "batch_failures": 0,
+        }
+        self._client = client
+        self._own_client = False
+        self._loop: Union[asyncio.AbstractEventLoop, None] = None
+        self._semaphore: Union[asyncio.Semaphore, None] = None
+        self._bucket = TokenBucket(rate, capacity=min(rate, self.concurrency))
+        self._pid = os.getpid()
+
+    @property
+    def client(self) -> Any:
+        """Return the client, creating it on first use."""
+        if self._client is None:
+            # importing the client takes most of the startup time of the package
+            from google import genai  # pylint: disable=import-outside-toplevel
+
+            self._client = genai.Client()
+            self._own_client = True
+        return self._client
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        """Return the event loop of this process, the client is bound to it."""
+        if self._pid != os.getpid():
+            # the loop and client of the parent process can't be used after a fork
+            self._pid, self._loop = os.getpid(), None
+            if self._own_client:
+                self._client, self._own_client = None, False
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._semaphore = None  # bound to the loop on first use
+        return self._loop
+
+    def key(self, prompt: str, model: str) -> str:
+        """
+        Construct the cache key of a request.
+
+        :param prompt: str, the prompt
+        :param model: str, the model
+
+        :returns: str, the key
+        """
+        return hashlib.sha256(json.dumps([model, prompt]).encode()).hexdigest()
+
+    def cached(self, prompt: str, model: Union[str, None] = None) -> Union[str, None]:
+        """
+        Look up the response to a prompt in the memo and the persistent cache.
+
+        :param prompt: str, the prompt
+        :param model: str, the model, by default the one of the generator
+
+        :returns: str, the response or None if not cached
+        """
+        response = self._lookup(self.key(prompt, model or self.model))
+        if response is not None:
+            self.stats["hits"] += 1
+        return response
+
+    def _lookup(self, key: str) -> Union[str, None]:
+        """Look up a response in the memo and the persistent cache."""
+        if key not in self.memo and self.store:
+            entry = self.store.get(key)
+            if entry and entry.get("response"):
+                self.memo[key] = entry["response"]
+        return self.memo.get(key)
+
+    def _remember(self, prompt: str, model: str, response: str):
+        """Store a response in the memo and the persistent cache."""
+        if not response:
+            return
+        key = self.key(prompt, model)
+        self.memo[key] = response
+        if self.store:
+            self.store.put(key, model, {"response": response})
+
+    async def _request(self, prompt: str, model: str, **kwargs) -> str:
+        """Send a single request, retrying with exponential backoff."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        for attempt in range(self.retries + 1):
+            async with self._semaphore:
+                await self._bucket.acquire()
+                self.stats["requests"] += 1
+                try:
+                    response = await self.client.aio.models.generate_content(
+                        model=model, contents=prompt, **kwargs
+                    )
+                    if not (response.text or "").strip():
+                        # blocked or no candidates, never cached
+                        raise ValueError("Empty LLM response")
+                    return response.text
+                except Exception as e:  # pylint: disable=broad-except
+                    if attempt == self.retries:
+                        raise
+                    error = e
+            delay = self.backoff * 2**attempt * (0.5 + random.random())
+            self.stats["retries"] += 1
+            logger.debug("LLM request failed: %s, retrying in %.1f s", error, delay)
+            await asyncio.sleep(delay)
+        raise RuntimeError("unreachable")  # pragma: no cover
+
+    async def arespond(self, prompts: list, model: Union[str, None] = None) -> dict:
+        """
+        Get the responses to prompts, sending the uncached ones concurrently.
+
+        :param prompts: list of str, the prompts
+        :param model: str, the model, by default the one of the generator
+
+        :returns: dict, the responses keyed by prompt, failed prompts are missing
+        """
+        model = model or self.model
+        responses = {}
+        todo = []
+        for prompt in dict.fromkeys(prompts):
+            response = self.cached(prompt, model)
+            if response is None:
+                todo.append(prompt)
+            else:
+                responses[prompt] = response
+        if not todo:
+            return responses
+        results = await asyncio.gather(
+            *(self._request(p, model) for p in todo),
+            return_exceptions=True,
+        )
+        for prompt, result in zip(todo, results):
+            if isinstance(result, BaseException) or not result:
+                self.stats["failures"] += 1
+                logger.debug("LLM request failed: %s", result)
+                continue
+            self._remember(prompt, model, result)
+            responses[prompt] = result
+        return responses
+
+    def respond(self, prompts: list, model: Union[str, None] = None) -> dict:
+        """
+        Get the responses to prompts, see arespond.
+
+        :param prompts: list of str, the prompts
+        :param model: str, the model, by default the one of the generator
+
+        :returns: dict, the responses keyed by prompt, failed prompts are missing
+        """
+        return self._event_loop().run_until_complete(self.arespond(prompts, model))
+
+    async def _agenerate_batched(self, sources: list, model: str):
+        """
+        Request the docstrings of sources in batches and cache the parsed ones.
+
+        :param sources: list of str, the source code of the uncached functions
+        :param model: str, the model
+        """
+        batches = [
+            batch
+            for batch in _batches(sources, self.batch_size, self.batch_budget)
+            if len(batch) > 1
+        ]
+        if not batches:
+            return
+        results = await asyncio.gather(
+            *(
+                self._request(
+                    batch_prompt(batch),
+                    model,
+                    config={"response_mime_type": "application/json"},
+                )
+                for batch in batches
+            ),
+            return_exceptions=True,
+        )
+        for batch, result in zip(batches, results):
+            self.stats["batches"] += 1
+            try:
+                if isinstance(result, BaseException):
+                    raise result
+                docs = parse_batch_response(result, len(batch))
+            except Exception as e:  # pylint: disable=broad-except
+                self.stats["batch_failures"] += 1
+                logger.debug(
+                    "Batch of %d docstrings failed, using single requests: %s",
+                    len(batch),
+                    e,
+                )
+                continue
+            for i, doc in docs.items():
+                self._remember(docstring_prompt(batch[i]), model, doc)
+
+    async def agenerate_many(self, sources: list, model: Union[str, None] = None) -> dict:
+        """
+        Generate the docstrings of functions concurrently, see generate_many.
+
+        :param sources: list of str, the source code of the functions
+        :param model: str, the model, by default the one of the generator
+
+        :returns: dict, the docstrings keyed by source, failed sources are missing
+        """
+        model = model or self.model
+        prompts = {source: docstring_prompt(source) for source in sources}
+        if self.batch_size > 1:
+            uncached = [
+                source
+                for source, prompt in prompts.items()
+                if self._lookup(self.key(prompt, model)) is None
+            ]
+            await self._agenerate_batched(uncached, model)
+        responses = await self.arespond(list(prompts.values()), model)
+        return {
+            source: responses[prompt].replace('"""', "")
+            for source, prompt in prompts.items()
+            if prompt in responses
+        }
+
+    def generate_many(self, sources: list, model: Union[str, None] = None) -> dict:
+        """
+        Generate the docstrings of functions concurrently.
+
+        :param sources: list of str, the source code of the functions
+        :param model: str, the model, by default the one of the generator
+
+        :returns: dict, the docstrings keyed by source, failed sources are missing
+        """
+        return self._event_loop().run_until_complete(self.agenerate_many(sources, model))
+
+    def generate(self, source: str, model: Union[str, None] = None) -> str:
+        """
+        Generate the docstring of a function.
+
+        :param source: str, the source code of the function
+        :param model: str, the model, by default the one of the generator
+
+        :returns: str, the docstring
+
+        :raises RuntimeError: if the docstring can't be generated
+        """
+        docs = self.generate_many([source], model)
+        if source not in docs:
+            raise RuntimeError("LLM docstring generation failed")
+        return docs[source]
+
+    def summary(self) -> str:
+        """Return a one line summary of the statistics."""
+        return (
+            f"LLM docstrings: {self.stats['requests']} requests, "
+            f"{self.stats['retries']} retries, {self.stats['failures']} failures, "
+            f"{self.stats['hits']} cache hits, {self.stats['batches']} batches "
+            f"({self.stats['batch_failures']} failed)"
+        )
+
+
+GENERATOR = DocstringGenerator()
+
+
+def configure_llm(
+    client: Any = None,
+    model: str = DEFAULT_MODEL,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rate: float = DEFAULT_RATE,
+    retries: int = DEFAULT_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+    cache_dir: Union[str, None] = None,
+    batch_size: int = 1,
+    batch_budget: int = DEFAULT_BATCH_BUDGET,
+) -> DocstringGenerator:
+    """
+    Configure the generator used for undocumented members, see DocstringGenerator.
+
+    :returns: the DocstringGenerator
+    """
+    global GENERATOR  # pylint: disable=global-statement
+    GENERATOR = DocstringGenerator(
+        client=client,
+        model=model,
+        concurrency=concurrency,
+        rate=rate,
+        retries=retries,
+        backoff=backoff,
+        cache_dir=cache_dir,
+        batch_size=batch_size,
+        batch_budget=batch_budget,
+    )
+    if cache_dir:
+        logger.info("Using LLM docstring cache in %s", cache_dir)
+    return GENERATOR
@@ -0,0 +1,254 @@
+"""
+Generate many palettes in one process from a manifest file (--manifest).
+
+A manifest lists the modules and source directories to generate palettes from,
+each with its own options::
+
+    defaults:
+      recursive: true
+    palettes:
+      - module: numpy.fft
+      - module: astropy
+        split: true
+        output: astropy_
+      - source: path/to/sources
+        tag: daliuge
+        output: my_components.palette
+
+A manifest is a JSON or YAML (requires PyYAML) file. Instead of a mapping it
+may also be just the list of palettes, and an entry may just be the name of a
+module. All palettes are generated in the same process, thus the imported
+modules and the caches are shared, or spread across worker processes. The
+results of all entries are summarized at the end.
+"""
+
+import concurrent.futures
+import functools
+import json
+import os
+import time
+import traceback
+from typing import Union
+
+from dlg_paletteGen.classes import Language
+from dlg_paletteGen.module_base import palettes_from_module
+from dlg_paletteGen.source_base import palette_from_source
+
+from . import logger
+
+# options of a manifest entry, their types and defaults
+ENTRY_OPTIONS = {
+    "module": (str, ""),
+    "source": (str, ""),
+    "output": (str, ""),
+    "split": (bool, False),
+    "recursive": (bool, False),
+    "prevent_cyclic": (bool, False),
+    "static": (bool, False),
+    "tag": (str, ""),
+    "parse_all": (bool, False),
+    "c": (bool, False),
+}
+ENTRY_NAMES = ("module", "source")  # exactly one of them is required
+
+
+def _validate_entry(entry: Union[str, dict], defaults: dict, index: int) -> dict:
+    """Return the entry with the defaults applied, raise ValueError if invalid."""
+    if isinstance(entry, str):
+        entry = {"module": entry}
+    if not isinstance(entry, dict):
+        raise ValueError(f"Manifest entry {index} is neither a module name nor a mapping")
+    unknown = set(entry) - set(ENTRY_OPTIONS)
+    if unknown:
+        raise ValueError(
+            f"Unknown options {sorted(unknown)} in manifest entry {index}, "
+            f"use {list(ENTRY_OPTIONS)}"
+        )
+    result: dict = {k: v[1] for k, v in ENTRY_OPTIONS.items()}
+    result.update(defaults)
+    result.update(entry)
+    if sum(bool(result[name]) for name in ENTRY_NAMES) != 1:
+        raise ValueError(f"Manifest entry {index} needs either a module or a source")
+    for key, (otype, _) in ENTRY_OPTIONS.items():
+        if not isinstance(result[key], otype):
+            raise ValueError(
+                f"Option {key} of manifest entry {index} must be a {otype.__name__}"
+            )
+    if not result["output"]:
+        name = result["module"] or os.path.basename(os.path.normpath(result["source"]))
+        result["output"] = "" if result["split"] else f"{name.replace('.', '_')}.palette"
+    return result
+
+
+def load_manifest(filename: str) -> list:
+    """
+    Read and validate a manifest.
+
+    :param filename: str, the name of a JSON or YAML (.yaml, .yml) manifest
+
+    :returns: list of dict, the entries with all options in ENTRY_OPTIONS
+    """
+    with open(filename, "r", encoding="utf-8") as f:
+        if filename.endswith((".yaml", ".yml")):
+            try:  # optional, only imported for YAML manifests
+                import yaml  # pylint: disable=import-outside-toplevel
+            except ImportError as e:  # pragma: no cover
+                raise ValueError("Reading YAML manifests requires PyYAML") from e
+            content = yaml.safe_load(f)
+        else:
+            content = json.load(f)
+    defaults: dict = {}
+    if isinstance(content, dict):
+        defaults = content.get("defaults") or {}
+        invalid = [k for k in defaults if k not in ENTRY_OPTIONS or k in ENTRY_NAMES]
+        if invalid:
+            raise ValueError(f"Invalid manifest defaults {invalid}")
+        content = content.get("palettes")
+    if not isinstance(content, list) or not content:
+        raise ValueError(f"No palettes listed in manifest {filename}")
+    return [_validate_entry(entry, defaults, i) for i, entry in enumerate(content)]
+
+
+def run_entry(
+    entry: dict,
+    incremental: bool = False,
+    compact: bool = False,
+    compression: Union[str, None] = None,
+    streaming: bool = False,
+) -> dict:
+    """
+    Generate the palette(s) of a manifest entry.
+
+    A failure is logged and reported in the result, thus the other entries of
+    the manifest are still generated. Unless incremental, an entry which does not
+    write any palette failed.
+
+    :param entry: dict, an entry returned by load_manifest
+    :param incremental: bool, only re-write changed palettes
+    :param compact: bool, write the palettes as minified JSON
+    :param compression: str, compress the palettes using "gzip" or "zstd"
+    :param streaming: bool, assemble the palettes of modules from disk
+
+    :returns: dict, the entry name, palettes written, time taken and error, if any
+    """
+    result: dict = {
+        "entry": entry["module"] or entry["source"],
+        "palettes": {},
+        "time": 0.0,
+        "error": None,
+    }
+    start = time.perf_counter()
+    try:
+        if entry["module"]:
+            result["palettes"] = palettes_from_module(
+                entry["module"],
+                outfile=entry["output"],
+                split=entry["split"],
+                recursive=entry["recursive"],
+                prevent_cyclic=entry["prevent_cyclic"],
+                incremental=incremental,
+                static=entry["static"],
+                compact=compact,
+                compression=compression,
+                streaming=streaming,
+            )
+        else:
+            result["palettes"] = palette_from_source(
+                entry["source"],
+                entry["output"],
+                tag=entry["tag"],
+                allow_missing_eagle_start=entry["parse_all"],
+                language=Language.C if entry["c"] else Language.PYTHON,
+                recursive=entry["recursive"],
+                incremental=incremental,
+                compact=compact,
+                compression=compression,
+            )
+        if not result["palettes"] and not incremental:
+            # e.g. the module could not be imported, which is only logged
+            raise ValueError("no palette written")
+    except Exception as e:  # pylint: disable=broad-except
+        logger.error("Manifest entry %s failed: %s", result["entry"], e)
+        logger.debug(traceback.format_exc())
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["time"] = time.perf_counter() - start
+    return result
+
+
+def run_manifest(
+    entries: list,
+    jobs: int = 1,
+    incremental: bool = False,
+    compact: bool = False,
+    compression: Union[str, None] = None,
+    streaming: bool = False,
+) -> list:
+    """
+    Generate the palettes of all manifest entries.
+
+    :param entries: list of dict, the entries returned by load_manifest
+    :param jobs: int, number of worker processes the entries are spread across
+    :param incremental: bool, only re-write changed palettes
+    :param compact: bool, write the palettes as minified JSON
+    :param compression: str, compress the palettes using "gzip" or "zstd"
+    :param streaming: bool, assemble the palettes of modules from disk
+
+    :returns: list of dict, the results of run_entry in the order of the entries
+    """
+    run = functools.partial(
+        run_entry,
+        incremental=incremental,
+        compact=compact,
+        compression=compression,
+        streaming=streaming,
+    )
+    if jobs > 1 and len(entries) > 1:
+        logger.info(
+            "Generating %d manifest entries using %d worker processes", len(entries), jobs
+        )
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            return list(pool.map(run, entries))
+    return [run(entry) for entry in entries]
+
+
+def summarize(results: list, wall: float) -> dict:
+    """
+    Return the summary of a manifest run.
+
+    :param results: list of dict, the results returned by run_manifest
+    :param wall: float, the wall time of the run in seconds
+
+    :returns: dict, the totals and the results
+    """
+    return {
+        "entries": len(results),
+        "failed": sum(1 for r in results if r["error"]),
+        "palettes": sum(len(r["palettes"]) for r in results),
+        "components": sum(sum(r["palettes"].values()) for r in results),
+        "wall": wall,
+        "results": results,
+    }
+
+
+def format_summary(summary: dict) -> str:
+    """Return the summary as a table of the entries followed by the totals."""
+    lines = [f"  {'entry':40s} {'palettes':>8s} {'components':>10s} {'time [s]':>9s}"]
+    for r in summary["results"]:
+        lines.append(
+            f"  {r['entry'][-40:]:40s} {len(r['palettes']):8d} "
+            f"{sum(r['palettes'].values()):10d} {r['time']:9.2f}"
+            + (f"  FAILED {r['error']}" if r["error"] else "")
+        )
+    lines.append(
+        f"Wrote {summary['palettes']} palettes with {summary['components']} components "
+        f"from {summary['entries']} entries in {summary['wall']:.1f} s, "
+        f"{summary['failed']} failed"
+    )
+    return "\n".join(lines)
+
+
+def write_summary(summary: dict, filename: str):
+    """Write the summary as JSON to filename."""
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=4)
+    logger.info("Wrote manifest summary to %s", filename)
@@ -6,6 +6,7 @@
 # pylint: disable=eval-used
 """Provide base functionality for the treatment of installed modules."""
 
+import concurrent.futures
 import functools
 import inspect
 import re
@@ -14,10 +15,27 @@ import types
 import typing
 from typing import Any, Tuple, Union, _SpecialForm
 
-from dlg_paletteGen.classes import DetailedDescription, DummyParam, DummySig
+from dlg_paletteGen import (
+    cache,
+    llm,
+    profiling,
+    sandbox,
+    static_base,
+    stream,
+    support_functions,
+    traversal,
+)
+from dlg_paletteGen.classes import (
+    DOCSTRING_CACHE,
+    DetailedDescription,
+    DummyParam,
+    DummySig,
+)
 from dlg_paletteGen.source_base import FieldUsage
 from dlg_paletteGen.support_functions import (
     GEMINI_API_KEY,
+    RESOLUTION_CACHE,
+    TYPEFIX_STATS,
     constructNode,
     generate_google_docstring,
     get_mod_name,
@@ -50,13 +68,14 @@ def get_class_members(cls, parent=None):
             representations.
     """
     try:
-        content = inspect.getmembers(
-            cls,
-            lambda x: inspect.isfunction(x)
-            or inspect.ismethod(x)
-            or inspect.isbuiltin(x)
-            or inspect.ismethoddescriptor(x),
-        )
+        with profiling.phase("getmembers"):
+            content = inspect.getmembers(
+                cls,
+                lambda x: inspect.isfunction(x)
+                or inspect.ismethod(x)
+                or inspect.isbuiltin(x)
+                or inspect.ismethoddescriptor(x),
+            )
     except KeyError:
         logger.debug("Problem getting members of %s", cls)
         return {}
@@ -96,7 +115,7 @@ def get_class_members(cls, parent=None):
         if re.match(r"^[a-zA-Z]", n) or n in ["__init__", "__cls__"]
     ]
     logger.debug("Member functions of class %s: %s", cls, [n for (n, _, _) in content])
-    class_members = {}
+    selected = []
     for n, m, ann_fl in content:
         if isinstance(m, functools.cached_property):
             logger.error("Found cached_property object!")
@@ -112,17 +131,21 @@ def get_class_members(cls, parent=None):
             or mod_name.startswith("PyCapsule")
             or mod_name == "object.__init__"
         ):
-            node = construct_member_node(m, obj=cls, parent=parent, name=n)
-            if not node:
-                logger.debug("Inspection of '%s' failed.", mod_name)
-                continue
-            class_members.update({node["name"]: node})
+            selected.append((n, m, mod_name))
         else:
             logger.debug(
                 "class name %s not start of qualified name: %s",
                 cls.__name__,
                 mod_name,
             )
+    _prefetch_docstrings([(m, cls, n) for n, m, _ in selected])
+    class_members = {}
+    for n, m, mod_name in selected:
+        node = construct_member_node(m, obj=cls, parent=parent, name=n)
+        if not node:
+            logger.debug("Inspection of '%s' failed.", mod_name)
+            continue
+        class_members.update({node["name"]: node})
     return class_members
 
 
@@ -172,7 +195,21 @@ def _format_src_as_doc(member: Any) -> tuple[str, str]:
     Returns:
         str: A formatted documentation string containing the source code of the member.
     """
-    doc = inspect.getsource(member)
+    with profiling.phase("getsource"):
+        source = inspect.getsource(member)
+    return _format_source_as_doc(source)
+
+
+def _format_source_as_doc(doc: str) -> tuple[str, str]:
+    """
+    Format a source code string as a documentation string.
+
+    Args:
+        doc (str): The source code of the member.
+
+    Returns:
+        str: A formatted documentation string containing the source code of the member.
+    """
     try:
         if GEMINI_API_KEY is None:
             raise ValueError("No API key found for LLM docstring generation.")
@@ -202,6 +239,58 @@ def _format_src_as_doc(member: Any) -> tuple[str, str]:
     return (disclaimer.format(doc=doc), doc)
 
 
+def _undocumented_source(member, module, name: str) -> Union[str, None]:
+    """
+    Return the source of a member whose docstring would be generated by _get_docs.
+
+    Args:
+        member: The member object.
+        module: The module or class containing the member, as passed to _get_docs.
+        name (str): The name of the member.
+
+    Returns:
+        str: The source code of the member, or None if it is documented.
+    """
+    doc = inspect.getdoc(member)
+    if doc and not doc.startswith(
+        "Initialize self.  See help(type(self)) for accurate signature."
+    ):
+        return None
+    if (
+        name.split(".")[-1] in ["__init__", "__cls__"]
+        and inspect.isclass(module)
+        and inspect.getdoc(module)
+    ):
+        return None
+    try:
+        return inspect.getsource(member)
+    except (OSError, TypeError):
+        return None
+
+
+def _prefetch_docstrings(candidates: list):
+    """
+    Generate the docstrings of the undocumented members concurrently.
+
+    The docstrings are cached by llm.GENERATOR, thus the requests sent while
+    constructing the nodes one by one are answered from the cache.
+
+    Args:
+        candidates (list): Tuples (member, module, name) as passed to _get_docs.
+    """
+    if GEMINI_API_KEY is None or len(candidates) < 2:
+        return
+    sources = [_undocumented_source(*candidate) for candidate in candidates]
+    sources = [source for source in sources if source]
+    if len(sources) > 1:
+        logger.info("Generating %d docstrings using LLM", len(sources))
+        try:
+            llm.GENERATOR.generate_many(sources)
+        except Exception as e:  # pylint: disable=broad-except
+            # the members keep their existing docstrings
+            logger.warning("LLM docstring generation failed: %s", e)
+
+
 def _get_docs(member, module, node) -> tuple:
     """
     Extract and processes documentation and signature information for a given member.
@@ -266,11 +355,13 @@ def _get_docs(member, module, node) -> tuple:
             "Trying to generate or using source.",
             node["name"],
         )
+        profiling.note("undocumented")
         try:
             description, doc = _format_src_as_doc(member)
             node["description"] += description
             dd = DetailedDescription(doc)
         except Exception as e:
+            profiling.note(f"no source ({type(e).__name__})")
             logger.debug(
                 "Unable to get source of %s: %s, %s", node["name"], type(member), e
             )
@@ -286,6 +377,7 @@ def _get_docs(member, module, node) -> tuple:
             return (sig, dd)
         except (ValueError, TypeError):
             logger.debug("Unable to get signature of %s: ", node["name"])
+            profiling.note("no signature, DummySig")
             dsig = DummySig(member)  # type: ignore
             node["description"] = dsig.docstring
             return (dsig, dd)
@@ -300,6 +392,7 @@ def _get_docs(member, module, node) -> tuple:
                 node["name"],
                 type(member).__name__,
             )
+            profiling.note("no signature, DummySig")
             dsig = DummySig(member)  # type: ignore
             if dsig.docstring:
                 node["description"] = dsig.docstring
@@ -329,6 +422,7 @@ def construct_func_name(load_name: str, module_name: str) -> str:
     return func_name
 
 
+@profiling.per_member
 def construct_member_node(member, obj=None, parent=None, name=None) -> dict:
     """
     Construct a node dictionary representing a Python member.
@@ -369,26 +463,59 @@ def construct_member_node(member, obj=None, parent=None, name=None) -> dict:
     sig, dd = _get_docs(member, obj, node)
     # fill custom ApplicationArguments first
     fields = populateFields(sig, "" if isinstance(dd, str) else dd)
-    ind = -1
     load_name = node["name"]
 
     if not parent and not hasattr(parent, load_name):
         try:
             import_using_name(load_name, traverse=True)
         except (ModuleNotFoundError, AttributeError, ValueError):
+            profiling.note("import failed")
             logger.critical("Cannot load %s, this method will likely fail", load_name)
 
+    self_usage: Union[FieldUsage, str] = ""
+    if next(iter(fields), None) == "self":
+        if member.__name__ in ["__init__", "__cls__"]:
+            self_usage = FieldUsage.OutputPort
+        elif inspect.ismethoddescriptor(member):
+            self_usage = "InputOutput"
+        else:
+            self_usage = "InputPort"
+    node = _add_member_fields(node, fields, load_name, parent, self_usage)
+    if hasattr(sig, "ret"):
+        logger.debug("Return type: %s", sig.ret)
+    logger.debug("Constructed node for member %s", node["name"])
+    # logger.debug("Constructed node for member %s: %s", node["name"], node)
+    return node
+
+
+def _add_member_fields(
+    node: dict,
+    fields: dict,
+    load_name: str,
+    parent: Any,
+    self_usage: Union[FieldUsage, str] = "",
+) -> dict:
+    """
+    Add the fields of a member and the default fields to a node.
+
+    Args:
+        node (dict): The node constructed for the member.
+        fields (dict): The fields produced by populateFields.
+        load_name (str): The fully qualified name of the member.
+        parent (str, optional): The name of the module containing the member.
+        self_usage (FieldUsage or str, optional): The usage of a leading 'self'
+            parameter, which turns the node into a PythonMemberFunction.
+
+    Returns:
+        dict: The updated node.
+    """
+    ind = -1
     for k, field in fields.items():
         ind += 1
         if k == "self" and ind == 0:
             node["category"] = "PythonMemberFunction"
             fields["self"]["parameterType"] = "ComponentParameter"
-            if member.__name__ in ["__init__", "__cls__"]:
-                fields["self"]["usage"] = FieldUsage.OutputPort
-            elif inspect.ismethoddescriptor(member):
-                fields["self"]["usage"] = "InputOutput"
-            else:
-                fields["self"]["usage"] = "InputPort"
+            fields["self"]["usage"] = self_usage
             fields["self"]["type"] = "Object:" + ".".join(load_name.split(".")[:-1])
             if fields["self"]["type"] == "numpy.ndarray":
                 # just to make sure the type hints match the object type
@@ -402,10 +529,6 @@ def construct_member_node(member, obj=None, parent=None, name=None) -> dict:
     node["fields"]["func_name"]["value"] = node["fields"]["func_name"]["defaultValue"]
     node["fields"]["base_name"]["value"] = ".".join(load_name.split(".")[:-1])
     node["fields"]["base_name"]["defaultValue"] = node["fields"]["base_name"]["value"]
-    if hasattr(sig, "ret"):
-        logger.debug("Return type: %s", sig.ret)
-    logger.debug("Constructed node for member %s", node["name"])
-    # logger.debug("Constructed node for member %s: %s", node["name"], node)
     return node
 
 
@@ -444,7 +567,8 @@ def get_members(
         content: list[tuple[str, Any]] = [(get_mod_name(obj), obj)]
     else:
         try:
-            content = inspect.getmembers(obj)
+            with profiling.phase("getmembers"):
+                content = inspect.getmembers(obj)
             # we only want to deal with the ones that are 'officially' exposed
             all_keys = [ak for k, ak in content if k == "__all__"]
             if all_keys:
@@ -463,7 +587,14 @@ def get_members(
     members = {}
     i = 0
     member = obj
+    selected = []
+    # the members are pruned before they are inspected, a function requested
+    # directly is always kept
+    name_filter = traversal.FILTER if inspect.ismodule(obj) else None
     for name, _ in content:
+        if name_filter and not name_filter.member(f"{module_name}.{name}"):
+            traversal.STATS.counts["members_pruned"] += 1
+            continue
         if name in modules.keys():
             logger.debug(
                 "Skipping already existing member: %s of module: %s", name, module_name
@@ -485,9 +616,12 @@ def get_members(
             # not sure what to do with these. Usually they
             # are class parameters.
             continue
+        if inspect.isclass(member) and member.__module__.find(module_name) < 0:
+            continue
+        selected.append((name, member))
+    _prefetch_docstrings([(m, m, n) for n, m in selected if not inspect.isclass(m)])
+    for name, member in selected:
         if inspect.isclass(member):
-            if member.__module__.find(module_name) < 0:
-                continue
             logger.debug("Processing class '%s'", name)
             nodes = get_class_members(member, parent=parent)
             logger.debug("Class members: %s", nodes.keys())
@@ -523,6 +657,34 @@ def get_members(
     return members
 
 
+def _get_module_members(obj: types.ModuleType, modules={}, parent=None) -> dict:
+    """
+    Get the members of a module, using the extraction cache if enabled.
+
+    Parameters
+    ----------
+        obj (types.ModuleType): The module to analyze.
+        modules (dict, optional): A dictionary of already processed members
+        parent (Any, optional): The parent object, used for recursive member extraction.
+
+    Returns
+    -------
+        dict: A dictionary mapping short member names to their corresponding member
+            node representations.
+    """
+    extraction_cache = cache.EXTRACTION_CACHE
+    key = extraction_cache.key(obj, parent) if extraction_cache else None
+    if key:
+        members = extraction_cache.get(key)  # type: ignore[union-attr]
+        if members is not None:
+            return members
+    members = get_members(obj, modules=modules, parent=parent)
+    if key:
+        origins = extraction_cache.origins(obj)  # type: ignore[union-attr]
+        extraction_cache.put(key, get_mod_name(obj), members, origins)  # type: ignore
+    return members
+
+
 def module_hook(
     import_name: str,
     modules: dict = {},
@@ -539,6 +701,11 @@ def module_hook(
     will also traverse and process submodules, updating the dictionary
     accordingly.
 
+    The sub-modules are traversed breadth-first (see traversal.ModuleTraversal),
+    every module is extracted once, even if it is reached along several paths
+    or by an alias. The depth and the number of modules of the traversal are
+    limited by traversal.configure_traversal.
+
     Special handling is included to avoid cyclic references when running on the
     `dlg_paletteGen.module_base` module.
 
@@ -549,8 +716,9 @@ def module_hook(
             submodules. Defaults to an empty dict.
         recursive (bool, optional): Whether to recursively process submodules.
             Defaults to True.
-        prebent_cyclic (bool, optional): Some modules have a structure, which.
-            causes a cyclic import. Should usually be off. Defaults to False.
+        prevent_cyclic (bool, optional): Only process the direct submodules, i.e.
+            limit the depth of the traversal to 1. Cyclic imports are handled by
+            the traversal, thus this is no longer needed. Defaults to False.
 
     Returns:
         tuple: A tuple containing:
@@ -559,81 +727,232 @@ def module_hook(
             - doc (str or None): The docstring of the loaded object/module, if
                 available.
 
-    Raises:
-        ImportError: If the module or object cannot be imported.
-        NameError: If the object name cannot be resolved.
-
     Logging:
         Uses the `logger` to provide debug and info messages about the loading
         process and discovered members.
     """
+    max_depth = traversal.MAX_DEPTH
+    if prevent_cyclic:
+        max_depth = 1 if max_depth is None else min(max_depth, 1)
+    walk = traversal.ModuleTraversal(
+        max_depth, traversal.MAX_MODULES, name_filter=traversal.FILTER
+    )
+    hook = _sandboxed_hook_module if sandbox.SANDBOX else _hook_module
+    result = walk.run(
+        import_name, functools.partial(hook, modules=modules), recursive=recursive
+    )
+    if result is None:
+        return ({}, None)
+    return modules, result["doc"]
+
+
+@profiling.per_module
+def _hook_module(
+    import_name: str, walk: traversal.ModuleTraversal, modules: dict
+) -> Union[tuple, None]:
+    """
+    Load a single object or module of a module_hook traversal and extract it.
+
+    Args:
+        import_name (str): The dotted import path of the object or module.
+        walk (traversal.ModuleTraversal): The traversal, used to detect modules
+            reached by an alias which were already extracted.
+        modules (dict): A dictionary to store discovered members and submodules.
+
+    Returns:
+        tuple: The sub-modules and {"doc": docstring} of the object, None if it
+            can't be loaded.
+    """
     obj_name = obj = None
+    sub_modules: list = []
+    # the name is never evaluated, it may come from an untrusted source (server)
     try:
-        logger.debug("Trying to use eval to load object %s", import_name)
-        obj = eval(import_name)
-        members = get_members(obj, modules=modules)
-        modules.update({import_name: members})
-        logger.info("Found %d members in %s", len(members), import_name)
-    except NameError:
-        try:
-            logger.debug("Trying alternative load of %s", import_name)
-            # Need to check this again:
-            # traverse = True if len(modules) == 0 else False
-            obj = import_using_name(import_name, traverse=True)
-            obj_name = get_mod_name(obj)
-            if inspect.isfunction(obj) or inspect.ismethod(obj) or inspect.isbuiltin(obj):
-                # the specified item is a function or method
-                obj_name = obj_name.rsplit(".", 1)[0]
-                members = {obj_name: obj}
-                members = get_members(
-                    obj,
-                    parent=import_name.rsplit(".", 1)[0],
-                    modules=modules,
-                )
-                modules.update({obj_name: members})
-            else:
-                members = get_members(
-                    obj,
-                    parent=import_name.rsplit(".", 1)[0],
-                    modules=modules,
-                )
-                modules.update({obj_name: members})
-                logger.debug("Found %d members in %s", len(members), obj_name)
-                sub_modules, _ = get_submodules(obj)
-                if sub_modules:
-                    logger.info("Found %d sub-modules in %s", len(sub_modules), obj_name)
-                if sub_modules and recursive:
-                    # !switch to the next line if you want to process tensorflow!
-                    if (
-                        len(modules) == 1
-                        or not prevent_cyclic
-                        or (obj and obj_name not in modules)
-                    ):
-                        logger.debug("Iterating over sub_modules of %s", obj_name)
-                        for sub_mod in sub_modules:
-                            logger.debug(
-                                "Treating sub-module: %s of %s", sub_mod, obj_name
-                            )
-                            submod_dict, _ = module_hook(
-                                sub_mod,
-                                modules=modules,
-                                recursive=recursive,
-                                prevent_cyclic=prevent_cyclic,
-                            )
-        except (ImportError, NameError):
-            logger.error("Module %s can't be loaded!", obj_name)
-            return ({}, None)
-
-        # If we run paletteGen over paletteGen we would produce a cyclic reference
-        # here and the next few lines just fix that.
-        if obj_name == "dlg_paletteGen.module_base":
-            modules[obj_name]["module_base.module_hook"]["fields"]["modules"][
-                "value"
-            ] = None
-            modules[obj_name]["module_base.module_hook"]["fields"]["modules"][
-                "defaultValue"
-            ] = None
-    return modules, obj.__doc__
+        logger.debug("Loading %s", import_name)
+        obj = import_using_name(import_name, traverse=True)
+        obj_name = get_mod_name(obj)
+        if inspect.isfunction(obj) or inspect.ismethod(obj) or inspect.isbuiltin(obj):
+            # the specified item is a function or method
+            obj_name = obj_name.rsplit(".", 1)[0]
+            members = get_members(
+                obj,
+                parent=import_name.rsplit(".", 1)[0],
+                modules=modules,
+            )
+            _fix_cyclic_reference(members, obj_name)
+            modules.update({obj_name: members})
+        elif obj_name != import_name and not walk.visit(obj_name):
+            logger.debug("Module %s already extracted as %s", import_name, obj_name)
+            return [], {"doc": obj.__doc__}
+        else:
+            members = _get_module_members(
+                obj,
+                parent=import_name.rsplit(".", 1)[0],
+                modules=modules,
+            )
+            _fix_cyclic_reference(members, obj_name)
+            modules.update({obj_name: members})
+            logger.debug("Found %d members in %s", len(members), obj_name)
+            sub_modules = list(
+                get_submodules(obj, lazy=traversal.LAZY, prune=traversal.prune_module)[0]
+            )
+            if sub_modules:
+                logger.info("Found %d sub-modules in %s", len(sub_modules), obj_name)
+    except (ImportError, NameError):
+        logger.error("Module %s can't be loaded!", obj_name)
+        return None
+    return sub_modules, {"doc": obj.__doc__}
+
+
+def _fix_cyclic_reference(members: dict, obj_name: Union[str, None]):
+    """
+    Fix the cyclic reference produced by running paletteGen over paletteGen.
+
+    The members are fixed before they are added to the modules dictionary, which
+    may write them out right away (see stream.NodeSpool).
+
+    Args:
+        members (dict): The members of the module just extracted.
+        obj_name (str): The name of the module just extracted.
+    """
+    if obj_name == "dlg_paletteGen.module_base" and "module_base.module_hook" in members:
+        members["module_base.module_hook"]["fields"]["modules"]["value"] = None
+        members["module_base.module_hook"]["fields"]["modules"]["defaultValue"] = None
+
+
+def _merge_cache_stats(stats: dict):
+    """
+    Add the extraction cache statistics of another process to the ones of this one.
+
+    Args:
+        stats (dict): The statistics returned by the other process.
+    """
+    if stats and cache.EXTRACTION_CACHE:
+        for k, v in stats.items():
+            cache.EXTRACTION_CACHE.stats[k] += v
+
+
+@profiling.per_module
+def _extract_module(import_name: str, known: list = [], visited: list = []) -> tuple:
+    """
+    Import a module or function and extract its members and sub-modules.
+
+    This is the unit of work executed by the sandbox processes.
+
+    Args:
+        import_name (str): The dotted import path of the module or function.
+        known (list, optional): The names already in the modules dictionary.
+        visited (list, optional): The modules already visited by the traversal,
+            a module reached by an alias of one of them is not extracted again.
+
+    Returns:
+        tuple: The name of the object, its members (None if already visited), its
+            sub-modules, its docstring, the extraction cache statistics, the
+            profile and the traversal statistics of this call.
+    """
+    extraction_cache = cache.EXTRACTION_CACHE
+    stats = dict(extraction_cache.stats) if extraction_cache else {}
+    profile = profiling.snapshot()
+    walked = traversal.STATS.snapshot()
+    obj = import_using_name(import_name, traverse=True)
+    obj_name = get_mod_name(obj)
+    parent = import_name.rsplit(".", 1)[0]
+    modules = dict.fromkeys(known)
+    members: Union[dict, None] = None
+    sub_modules: list = []
+    if inspect.isfunction(obj) or inspect.ismethod(obj) or inspect.isbuiltin(obj):
+        obj_name = obj_name.rsplit(".", 1)[0]
+        members = get_members(obj, parent=parent, modules=modules)
+    elif obj_name == import_name or obj_name not in visited:
+        members = _get_module_members(obj, parent=parent, modules=modules)
+        # the sub-modules are imported by their own sandboxed calls, and pruned
+        # (and counted) by the traversal
+        sub_modules = list(
+            get_submodules(
+                obj,
+                check_import=False,
+                lazy=traversal.LAZY,
+            )[0]
+        )
+    if extraction_cache:
+        stats = {k: v - stats[k] for k, v in extraction_cache.stats.items()}
+    return (
+        obj_name,
+        members,
+        sub_modules,
+        obj.__doc__,
+        stats,
+        profiling.since(profile),
+        traversal.STATS.since(walked),
+    )
+
+
+def _sandboxed_hook_module(
+    import_name: str, walk: traversal.ModuleTraversal, modules: dict
+) -> Union[tuple, None]:
+    """
+    Run _hook_module with the import and inspection steps executed in the sandbox.
+
+    A module which fails, times out or crashes the sandbox process is reported and
+    skipped.
+
+    Args:
+        import_name (str): The dotted import path of the object or module to load.
+        walk (traversal.ModuleTraversal): The traversal of the module.
+        modules (dict): A dictionary to store discovered members and submodules.
+
+    Returns:
+        tuple: The sub-modules and {"doc": docstring} of the object, None if it
+            failed.
+    """
+    try:
+        obj_name, members, sub_modules, doc, stats, profile, walked = (
+            sandbox.SANDBOX.run(  # type: ignore
+                _extract_module,
+                import_name,
+                list(modules),
+                sorted(walk.visited),
+                name=import_name,
+            )
+        )
+    except sandbox.SandboxError as e:
+        logger.error("Module %s skipped: %s", import_name, e)
+        return None
+    _merge_cache_stats(stats)
+    profiling.merge(profile)
+    traversal.STATS.merge(walked)
+    if members is None:
+        walk.visit(obj_name)  # counts the duplicate visit
+        logger.debug("Module %s already extracted as %s", import_name, obj_name)
+        return [], {"doc": doc}
+    if obj_name != import_name:
+        walk.visit(obj_name)
+    _fix_cyclic_reference(members, obj_name)
+    modules.update({obj_name: members})
+    logger.debug("Found %d members in %s", len(members), obj_name)
+    if sub_modules:
+        logger.info("Found %d sub-modules in %s", len(sub_modules), obj_name)
+    return sub_modules, {"doc": doc}
+
+
+def _nodes_from_modules(modules: dict) -> list:
+    """
+    Collect the nodes of all members in a modules dictionary produced by module_hook.
+
+    Nodes with 'fields' as a dictionary are converted to a list of field values and
+    returned. Nodes with 'fields' as a list have been returned by an earlier call
+    and are skipped, but their names are still used to skip duplicates.
+
+    Args:
+        modules (dict): The dictionary of modules and their members.
+
+    Returns:
+        list: The list of processed node dictionaries.
+    """
+    nodes: list = []
+    node_names: set = set()
+    for members in modules.values():
+        nodes.extend(stream.module_nodes(members, node_names))
+    return nodes
 
 
 def nodes_from_module(
@@ -651,8 +970,8 @@ def nodes_from_module(
     Args:
         module_path (str): The path to the module to process.
         recursive (bool, optional): Whether to process modules recursively.
-        prevent_cyclic (bool, optional): If True, prevents cyclic imports in module
-            mode. Defaults to False.
+        prevent_cyclic (bool, optional): If True, only the direct sub-modules are
+            processed (see module_hook). Defaults to False.
 
     Returns:
         Tuple[list, Any]: A tuple containing:
@@ -670,29 +989,55 @@ def nodes_from_module(
     #     # modules
     #     {m: list(v.keys()) for m, v in modules.items() if v},
     # )
-    nodes = []
-    node_names = set()
-    for members in modules.values():
-        for member, node in members.items():
-            # TODO: remove once EAGLE can deal with dict fields pylint: disable=fixme
-            if node is None or not node:
-                continue
-            node_name = ".".join(node["name"].rsplit(".", 2)[-2:])
-            if node_name in node_names:
-                continue
-            node_names.add(node_name)
-            try:
-                if isinstance(node["fields"], list):
-                    continue
-                node["fields"] = list(node["fields"].values())
-                nodes.append(node)
-            except TypeError:
-                # logger.critical("Node has wrong type: %s", node)
-                continue
-            except KeyError:
-                # logger.critical("Key 'fields' does not exist: %s: %s", member, node)
-                continue
-    return nodes, module_doc
+    return _nodes_from_modules(modules), module_doc
+
+
+def _modules_from_sub_module(
+    sub_mod: str, recursive: bool = True, prevent_cyclic: bool = False, static=False
+) -> typing.Optional[tuple]:
+    """
+    Run module_hook on a single sub-module using a fresh modules dictionary.
+
+    This is the unit of work executed by the worker processes in split mode.
+
+    Args:
+        sub_mod (str): Import path of the sub-module.
+        recursive (bool, optional): Whether to process modules recursively.
+        prevent_cyclic (bool, optional): If True, only the direct sub-modules are
+            processed (see module_hook). Defaults to False.
+        static (bool, optional): If True, use static_module_hook. Defaults to False.
+
+    Returns:
+        tuple: The modules dictionary, the docstring of the sub-module, the
+            extraction cache statistics, the profile and the traversal
+            statistics of this call, None if the extraction failed.
+    """
+    extraction_cache = cache.EXTRACTION_CACHE
+    stats = dict(extraction_cache.stats) if extraction_cache else {}
+    profile = profiling.snapshot()
+    walked = traversal.STATS.snapshot()
+    try:
+        if static:
+            modules, module_doc = static_base.static_module_hook(
+                sub_mod, modules={}, recursive=recursive
+            )
+        else:
+            modules, module_doc = module_hook(
+                sub_mod, modules={}, recursive=recursive, prevent_cyclic=prevent_cyclic
+            )
+    except Exception:  # pylint: disable=broad-except
+        # a failing sub-module must not stop the other workers (pool.map)
+        logger.exception("Extraction of sub-module %s failed", sub_mod)
+        return None
+    if extraction_cache:
+        stats = {k: v - stats[k] for k, v in extraction_cache.stats.items()}
+    return (
+        modules,
+        module_doc,
+        stats,
+        profiling.since(profile),
+        traversal.STATS.since(walked),
+    )
 
 
 def palettes_from_module(
@@ -701,7 +1046,13 @@ def palettes_from_module(
     split: bool = False,
     recursive: bool = True,
     prevent_cyclic: bool = False,
-) -> None:
+    jobs: int = 1,
+    incremental: bool = False,
+    static: bool = False,
+    compact: bool = False,
+    compression: Union[str, None] = None,
+    streaming: bool = False,
+) -> dict:
     """
     Extract node components from a Python module and writes them to palette files.
 
@@ -717,50 +1068,159 @@ def palettes_from_module(
         recursive (bool, optional): If True, recursively extracts nodes from
             submodules. Defaults to True.
 
-        prevent_cyclic (bool, optional): If True, prevents cyclic imports in module
-            mode. This should usually be off for most modules. Defaults to False.
+        prevent_cyclic (bool, optional): If True, only the direct sub-modules are
+            extracted, same as a traversal depth of 1 (see module_hook). Defaults to
+            False.
+
+        jobs (int, optional): Number of worker processes used to extract the
+            sub-modules in split mode. Defaults to 1 (serial).
+
+        incremental (bool, optional): If True, existing palette files are only
+            re-written if their content changed. Unchanged sub-modules are read from
+            the extraction cache, which is enabled in its default location if not
+            configured. Defaults to False.
+
+        static (bool, optional): If True, the members are extracted from the source
+            files without importing the modules (see static_base). Defaults to False.
+
+        compact (bool, optional): If True, the palettes are written as minified JSON.
+            Defaults to False.
+
+        compression (str, optional): Compress the palettes using "gzip" or "zstd",
+            the corresponding extension is appended to the file names. Defaults to
+            None.
+
+        streaming (bool, optional): If True, the nodes of every module are written
+            to a temporary file once the module is extracted and the palettes are
+            assembled from disk, thus the memory used does not grow with the size
+            of the package (see stream). Defaults to False.
 
     Returns:
-        None
+        dict: The file names of the palettes written and their number of components.
 
     Side Effects:
         Writes palette files containing extracted node components and logs extraction
         details.
     """
-    module_doc = ""
     files = {}
+    if incremental and not cache.EXTRACTION_CACHE:
+        # the node ids are only stable if unchanged modules are not re-extracted
+        cache.configure_cache(cache.DEFAULT_CACHE_DIR)
     sub_modules = [module_path]
-    if split:
+    if split and static:
+        sub_modules = [module_path] + static_base.static_submodules(
+            module_path, prune=traversal.prune_module
+        )
+    elif split:
         mod = import_using_name(module_path)
-        sub_modules = [module_path] + list(get_submodules(mod)[0])
+        sub_modules = [module_path] + list(
+            get_submodules(mod, lazy=traversal.LAZY, prune=traversal.prune_module)[0]
+        )
         # sub_modules, _ = [module_path, module_hook(module_path)]
         logger.info(
             "Splitting module %s into sub-module palettes: %s",
             module_path,
             sub_modules,
         )
-    tot_nodes = 0
-    for i, sub_mod in enumerate(sub_modules):
-        logger.debug("Extracting nodes from sub-module: %s, %d", sub_mod, i)
-        if split:
-            recursive = i != 0
-        nodes, module_doc = nodes_from_module(
-            sub_mod, recursive=recursive, prevent_cyclic=prevent_cyclic
+    # in split mode only the top-level module is extracted non-recursively
+    recursion = [recursive if not split else i != 0 for i in range(len(sub_modules))]
+    # Members found in a sub-module are not repeated in the palettes of the
+    # following sub-modules, thus all extractions are merged into one dictionary.
+    modules: dict = stream.NodeSpool() if streaming else {}
+    if jobs > 1 and len(sub_modules) > 1:
+        logger.info(
+            "Extracting %d sub-modules using %d worker processes", len(sub_modules), jobs
         )
-        if len(nodes) == 0:
-            continue
-        filename = (
-            f"{outfile}{sub_mod.replace('.','_')}.palette" if not outfile else outfile
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+        # map yields the results in the order of the sub-modules, thus the
+        # palettes are identical to the ones of a serial run.
+        results = pool.map(
+            _modules_from_sub_module,
+            sub_modules,
+            recursion,
+            [prevent_cyclic] * len(sub_modules),
+            [static] * len(sub_modules),
         )
-        status = prepare_and_write_palette(nodes, filename, module_doc=module_doc)
-        if status:
-            files[filename] = len(nodes)
-            tot_nodes += len(nodes)
-            logger.info(
-                ">>>>>>>> %s palette file written with %s components",
-                filename,
-                len(nodes),
+    elif static:
+        pool = None
+        results = (
+            static_base.static_module_hook(
+                sub_mod, modules=modules, recursive=recursion[i]
             )
+            + ({}, None, None)
+            for i, sub_mod in enumerate(sub_modules)
+        )
+    else:
+        pool = None
+        results = (
+            module_hook(
+                sub_mod,
+                modules=modules,
+                recursive=recursion[i],
+                prevent_cyclic=prevent_cyclic,
+            )
+            + ({}, None, None)
+            for i, sub_mod in enumerate(sub_modules)
+        )
+    tot_nodes = 0
+    try:
+        for sub_mod, result in zip(sub_modules, results):
+            if result is None:
+                logger.error("Sub-module %s skipped", sub_mod)
+                continue
+            sub_modules_dict, module_doc, stats, profile, walked = result
+            logger.debug("Extracted nodes from sub-module: %s", sub_mod)
+            # add the statistics of the worker processes
+            _merge_cache_stats(stats)
+            profiling.merge(profile)
+            traversal.STATS.merge(walked)
+            modules.update(sub_modules_dict)
+            if streaming:
+                spill, count = modules.take()  # type: ignore[attr-defined]
+            else:
+                nodes = _nodes_from_modules(modules)
+                count = len(nodes)
+            if count == 0:
+                continue
+            # in split mode outfile is the prefix of the file names
+            filename = (
+                f"{outfile}{sub_mod.replace('.','_')}.palette"
+                if split or not outfile
+                else outfile
+            )
+            filename = support_functions.palette_filename(filename, compression)
+            with profiling.module(sub_mod):
+                if streaming:
+                    status = stream.write_spooled_palette(
+                        spill,
+                        filename,
+                        module_doc=module_doc,
+                        incremental=incremental,
+                        indent=None if compact else 4,
+                        compression=compression,
+                    )
+                else:
+                    status = prepare_and_write_palette(
+                        nodes,
+                        filename,
+                        module_doc=module_doc,
+                        incremental=incremental,
+                        indent=None if compact else 4,
+                        compression=compression,
+                    )
+            if status:
+                files[filename] = count
+                tot_nodes += count
+                logger.info(
+                    ">>>>>>>> %s palette file written with %s components",
+                    filename,
+                    count,
+                )
+    finally:
+        if pool:
+            pool.shutdown()
+        if streaming:
+            modules.close()  # type: ignore[attr-defined]
     logger.info(
         "\n\n>>>>>>> Extraction summary <<<<<<<<\n%s\n",
         "\n".join([f"Wrote {k} with {v} components" for k, v in files.items()]),
@@ -770,3 +1230,22 @@ def palettes_from_module(
         tot_nodes,
         len(sub_modules),
     )
+    if cache.EXTRACTION_CACHE:
+        logger.info(cache.EXTRACTION_CACHE.summary())
+    if not static:
+        logger.info(traversal.STATS.summary())
+    logger.info(RESOLUTION_CACHE.summary())
+    logger.info(DOCSTRING_CACHE.summary())
+    logger.info(TYPEFIX_STATS.summary())
+    if llm.GENERATOR.stats["requests"] or llm.GENERATOR.stats["hits"]:
+        logger.info(llm.GENERATOR.summary())
+    if sandbox.SANDBOX and sandbox.SANDBOX.failures:
+        logger.warning(sandbox.SANDBOX.summary())
+    if profiling.PROFILER:
+        # the report is written next to the (first) palette
+        report = (
+            outfile if outfile and not split else outfile + module_path.replace(".", "_")
+        )
+        logger.info(profiling.PROFILER.summary())
+        profiling.PROFILER.write(f"{report.rsplit('.palette', 1)[0]}.profile.json")
+    return files
@@ -0,0 +1,336 @@
+"""Record the time spent in the phases of palette generation (--profile)."""
+
+import contextlib
+import functools
+import heapq
+import json
+import time
+import tracemalloc
+from typing import Callable, Union
+
+from . import logger
+
+# the module the phases are attributed to outside of any (sub-)module
+NO_MODULE = "<palette>"
+DEFAULT_TOP = 10  # number of slowest members reported
+
+
+class Profiler:
+    """
+    Cumulative wall time and number of calls per phase and per (sub-)module.
+
+    A phase which is re-entered, e.g. by a recursive call, is only timed once
+    for the outermost call, but every call is counted. Phases are attributed to
+    the innermost (sub-)module being extracted. The profiler is not thread safe,
+    phases are expected to run in the main thread.
+
+    In addition the duration, allocated memory and failure path (the fallbacks
+    taken, see note) of the top slowest member node constructions are recorded,
+    the others are only counted.
+    """
+
+    def __init__(self, top: int = DEFAULT_TOP, memory: bool = False):
+        """
+        Initialize an empty profile.
+
+        :param top: int, the number of slowest members reported
+        :param memory: bool, trace the memory allocated per member, which slows
+            down the generation considerably
+        """
+        self.start = time.perf_counter()
+        self.top = top
+        self.memory = memory
+        self.phases: dict = {}
+        self.modules: dict = {}
+        # min-heap of (time, number, member) of the top slowest members
+        self.members: list = []
+        self.recorded = 0  # number of members recorded, see since
+        self._active: dict = {}
+        self._stack: list = [NO_MODULE]
+        self._path: Union[list, None] = None
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _record(self, phase: str, elapsed: float, calls: int = 1):
+        """Add a call of phase to the totals and those of the current module."""
+        for totals in (self.phases, self.modules.setdefault(self._stack[-1], {})):
+            entry = totals.setdefault(phase, [0.0, 0])
+            entry[0] += elapsed
+            entry[1] += calls
+
+    def call(self, phase: str, func: Callable, args: tuple, kwargs: dict):
+        """Call func(*args, **kwargs) and record its duration as phase."""
+        if self._active.get(phase):
+            self._active[phase] += 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._active[phase] -= 1
+                self._record(phase, 0.0)
+        self._active[phase] = 1
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._active[phase] = 0
+            self._record(phase, time.perf_counter() - start)
+
+    @contextlib.contextmanager
+    def phase(self, phase: str):
+        """Record the duration of the with block as a call of phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(phase, time.perf_counter() - start)
+
+    @contextlib.contextmanager
+    def module(self, name: str):
+        """Attribute the phases of the with block to the (sub-)module name."""
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+
+    def member(self, func: Callable, member, args: tuple, kwargs: dict):
+        """
+        Call func(member, *args, **kwargs) and record it as a member construction.
+
+        The name of the member is taken from the returned node, if any.
+        """
+        outer, self._path = self._path, []
+        if self.memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        node = None
+        try:
+            node = func(member, *args, **kwargs)
+            return node
+        except Exception as e:
+            self._path.append(f"raised {type(e).__name__}")
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            name = node.get("name") if isinstance(node, dict) else None
+            self._keep(
+                {
+                    "name": name or getattr(member, "__qualname__", str(member)),
+                    "module": self._stack[-1],
+                    "type": type(member).__name__,
+                    "time": elapsed,
+                    "memory": (
+                        tracemalloc.get_traced_memory()[1] - base if self.memory else None
+                    ),
+                    "path": self._path,
+                }
+            )
+            self._path = outer
+
+    def _keep(self, entry: dict):
+        """Count a member and keep it if it is one of the top slowest."""
+        item = (entry["time"], self.recorded, entry)
+        self.recorded += 1
+        if len(self.members) < self.top:
+            heapq.heappush(self.members, item)
+        else:
+            heapq.heappushpop(self.members, item)
+
+    def note(self, event: str):
+        """Add event to the failure path of the member being constructed."""
+        if self._path is not None:
+            self._path.append(event)
+
+    def slowest(self, top: Union[int, None] = None) -> list:
+        """Return the top slowest member constructions."""
+        return [m for _, _, m in heapq.nlargest(top or self.top, self.members)]
+
+    def snapshot(self) -> dict:
+        """Return a copy of the current totals."""
+        return {
+            "phases": {k: list(v) for k, v in self.phases.items()},
+            "modules": {
+                m: {k: list(v) for k, v in phases.items()}
+                for m, phases in self.modules.items()
+            },
+            "members": self.recorded,
+        }
+
+    def merge(self, profile: dict):
+        """Add the totals of a profile recorded by another process."""
+        for name, phases in profile.get("modules", {}).items():
+            self._stack.append(name)
+            for phase, (elapsed, calls) in phases.items():
+                self._record(phase, elapsed, calls)
+            self._stack.pop()
+        for entry in profile.get("members", []):
+            self._keep(entry)
+
+    def report(self) -> dict:
+        """Return the profile as a JSON serializable dictionary."""
+        return {
+            "wall": time.perf_counter() - self.start,
+            "phases": {
+                k: {"time": v[0], "calls": v[1]}
+                for k, v in sorted(self.phases.items(), key=lambda x: -x[1][0])
+            },
+            "modules": {
+                m: {k: {"time": v[0], "calls": v[1]} for k, v in phases.items()}
+                for m, phases in sorted(
+                    self.modules.items(),
+                    key=lambda x: -sum(v[0] for v in x[1].values()),
+                )
+            },
+            "slowest_members": self.slowest(),
+        }
+
+    def summary(self, max_modules: int = 10) -> str:
+        """
+        Return tables of the time per phase and of the slowest (sub-)modules and members.
+
+        :param max_modules: int, the number of (sub-)modules listed
+        """
+        report = self.report()
+        lines = [
+            f"Profile of {report['wall']:.3f} s of palette generation",
+            f"  {'phase':24s} {'time [s]':>10s} {'calls':>10s} {'per call':>10s}",
+        ]
+        for phase, entry in report["phases"].items():
+            per_call = entry["time"] / entry["calls"] * 1e3 if entry["calls"] else 0
+            lines.append(
+                f"  {phase:24s} {entry['time']:10.3f} {entry['calls']:10d} "
+                f"{per_call:8.3f}ms"
+            )
+        lines.append(f"  {'(sub-)module':50s} {'time [s]':>10s}  slowest phase")
+        for name, phases in list(report["modules"].items())[:max_modules]:
+            slowest = max(phases, key=lambda k: phases[k]["time"])
+            total = sum(v["time"] for v in phases.values())
+            lines.append(f"  {name[-50:]:50s} {total:10.3f}  {slowest}")
+        lines.append(f"  {'member':50s} {'time [s]':>10s} {'memory':>10s}  type, path")
+        for entry in report["slowest_members"]:
+            memory = (
+                f"{entry['memory'] / 1024:8.0f}kB" if entry["memory"] is not None else ""
+            )
+            lines.append(
+                f"  {entry['name'][-50:]:50s} {entry['time']:10.3f} {memory:>10s}  "
+                f"{entry['type']} in {entry['module']}"
+                + (f": {' -> '.join(entry['path'])}" if entry["path"] else "")
+            )
+        return "\n".join(lines)
+
+    def write(self, filename: str):
+        """Write the profile as JSON to filename."""
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=4)
+        logger.info("Wrote profile to %s", filename)
+
+
+PROFILER: Union[Profiler, None] = None
+
+
+def configure_profiler(
+    enabled: bool, top: int = DEFAULT_TOP, memory: bool = False
+) -> Union[Profiler, None]:
+    """
+    Enable (or disable) the profiling of the phases of palette generation.
+
+    :param enabled: bool, whether to record the profile
+    :param top: int, the number of slowest members reported
+    :param memory: bool, trace the memory allocated per member
+
+    :returns: the Profiler or None
+    """
+    global PROFILER  # pylint: disable=global-statement
+    if PROFILER and PROFILER.memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    PROFILER = Profiler(top=top, memory=memory) if enabled else None
+    return PROFILER
+
+
+def profiled(phase: str) -> Callable:
+    """
+    Return a decorator recording the calls of a function as phase.
+
+    Without an enabled profiler the overhead is a single check per call.
+
+    :param phase: str, the name of the phase
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if PROFILER is None:
+                return func(*args, **kwargs)
+            return PROFILER.call(phase, func, args, kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def per_module(func: Callable) -> Callable:
+    """Attribute the phases of a function to the module named by its first argument."""
+
+    @functools.wraps(func)
+    def wrapper(name, *args, **kwargs):
+        if PROFILER is None:
+            return func(name, *args, **kwargs)
+        with PROFILER.module(name):
+            return func(name, *args, **kwargs)
+
+    return wrapper
+
+
+def per_member(func: Callable) -> Callable:
+    """Record the calls of a function constructing the node of its first argument."""
+
+    @functools.wraps(func)
+    def wrapper(member, *args, **kwargs):
+        if PROFILER is None:
+            return func(member, *args, **kwargs)
+        return PROFILER.member(func, member, args, kwargs)
+
+    return wrapper
+
+
+def note(event: str):
+    """Add event to the failure path of the member being constructed, if profiling."""
+    if PROFILER:
+        PROFILER.note(event)
+
+
+def phase(name: str):
+    """Return a context manager recording its with block as a call of phase name."""
+    return PROFILER.phase(name) if PROFILER else contextlib.nullcontext()
+
+
+def module(name: str):
+    """Return a context manager attributing its with block to (sub-)module name."""
+    return PROFILER.module(name) if PROFILER else contextlib.nullcontext()
+
+
+def snapshot() -> Union[dict, None]:
+    """Return a copy of the totals of the profiler, None if it is disabled."""
+    return PROFILER.snapshot() if PROFILER else None
+
+
+def since(before: Union[dict, None]) -> Union[dict, None]:
+    """Return the totals per module recorded since the snapshot before was taken."""
+    if not PROFILER or before is None:
+        return None
+    modules: dict = {}
+    for name, phases in PROFILER.snapshot()["modules"].items():
+        for k, (elapsed, calls) in phases.items():
+            old = before["modules"].get(name, {}).get(k, [0.0, 0])
+            if calls > old[1]:
+                modules.setdefault(name, {})[k] = [elapsed - old[0], calls - old[1]]
+    # the members recorded since and dropped are not among the slowest in any case
+    members = [m for _, n, m in PROFILER.members if n >= before["members"]]
+    return {"modules": modules, "members": members}
+
+
+def merge(profile: Union[dict, None]):
+    """Add the totals recorded by another process, see since."""
+    if PROFILER and profile:
+        PROFILER.merge(profile)
@@ -0,0 +1,303 @@
+"""Run import and inspection steps in reusable, isolated worker processes."""
+
+import multiprocessing
+import os
+import threading
+import traceback
+from typing import Any, Callable, Union
+
+from dlg_paletteGen import cache, traversal
+
+from . import logger
+
+try:
+    import resource
+except ImportError:  # pragma: no cover, not available on Windows
+    resource = None  # type: ignore
+
+DEFAULT_TIMEOUT = 60.0  # seconds
+
+
+class SandboxError(Exception):
+    """The sandboxed call failed."""
+
+
+class SandboxTimeout(SandboxError):
+    """The sandboxed call did not finish in time."""
+
+
+class SandboxCrash(SandboxError):
+    """The worker process died during the sandboxed call."""
+
+
+def _init_worker(
+    cache_dir: Union[str, None],
+    cache_size: int,
+    log_level: int,
+    include: Union[list, tuple] = (),
+    exclude: Union[list, tuple] = (),
+    lazy: bool = False,
+):
+    """Apply the configuration of the parent process in a worker process."""
+    logger.setLevel(log_level)
+    cache.configure_cache(cache_dir, max_size=cache_size)
+    # not inherited with the spawn start method (the default on macOS)
+    traversal.FILTER = traversal.NameFilter(include, exclude)
+    traversal.LAZY = lazy
+
+
+def _worker_main(conn, memory_limit: int, initializer, initargs: tuple):
+    """
+    Execute the calls received through conn until None is received.
+
+    :param conn: Connection, the worker end of the pipe
+    :param memory_limit: int, maximum address space of the worker in bytes
+    :param initializer: callable, called once at the start of the worker
+    :param initargs: tuple, arguments of the initializer
+    """
+    if memory_limit and resource:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    if initializer:
+        initializer(*initargs)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        func, args, kwargs = task
+        try:
+            result: tuple = ("ok", func(*args, **kwargs))
+        except BaseException as e:  # pylint: disable=broad-except
+            result = ("error", f"{type(e).__name__}: {e}", traceback.format_exc())
+        try:
+            conn.send(result)
+        except Exception as e:  # pylint: disable=broad-except
+            conn.send(("error", f"Result can't be returned: {e}", ""))
+
+
+class _Worker:
+    """A worker process and the parent end of its pipe."""
+
+    def __init__(self, ctx, memory_limit: int, initializer, initargs: tuple):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, memory_limit, initializer, initargs),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def kill(self):
+        """Terminate the worker process."""
+        self.conn.close()
+        if self.process.exitcode is None:
+            self.process.kill()
+            self.process.join()
+
+    def stop(self):
+        """Ask the worker process to exit and terminate it if it doesn't."""
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    Pool of reusable worker processes running calls with a timeout and memory limit.
+
+    A worker which times out or crashes is replaced by a new one and the call
+    raises a SandboxError, which allows the caller to skip the item and continue.
+    A pool inherited by a forked process starts its own workers.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        timeout: float = DEFAULT_TIMEOUT,
+        memory_limit: int = 0,
+        initializer: Union[Callable, None] = None,
+        initargs: tuple = (),
+    ):
+        """
+        Initialize the pool, the workers are started on demand.
+
+        :param workers: int, maximum number of worker processes
+        :param timeout: float, maximum duration of a call in seconds, 0 for no limit
+        :param memory_limit: int, maximum address space of a worker in bytes, 0 for
+            no limit
+        :param initializer: callable, called at the start of every worker
+        :param initargs: tuple, arguments of the initializer
+        """
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.initializer = initializer
+        self.initargs = initargs
+        self.failures: dict = {}
+        self._ctx = multiprocessing.get_context()
+        self._pid = os.getpid()
+        self._idle: list = []
+        self._count = 0
+        self._lock = threading.Condition()
+
+    def _acquire(self) -> _Worker:
+        """Return an idle worker, starting a new one if possible."""
+        with self._lock:
+            if self._pid != os.getpid():
+                # the workers belong to the parent process
+                self._pid, self._idle, self._count = os.getpid(), [], 0
+            while not self._idle and self._count >= self.workers:
+                self._lock.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._count += 1
+        return _Worker(self._ctx, self.memory_limit, self.initializer, self.initargs)
+
+    def _release(self, worker: Union[_Worker, None]):
+        """Return a worker to the pool, None if it has been killed."""
+        with self._lock:
+            if worker is None:
+                self._count -= 1
+            else:
+                self._idle.append(worker)
+            self._lock.notify()
+
+    def run(self, func: Callable, *args, name: str = "", **kwargs) -> Any:
+        """
+        Call func(*args, **kwargs) in a worker process and return the result.
+
+        func and its arguments and result need to be picklable. A call failing with
+        a MemoryError in a worker which has been used before is retried once in a
+        new worker, since the memory limit applies to everything loaded by a worker.
+
+        :param func: callable, a module level function
+        :param name: str, the name of the item reported in case of failure
+
+        :returns: the result of the call
+
+        :raises SandboxError: if the call raised an exception, timed out or crashed
+        """
+        name = name or str(args[0] if args else func.__name__)
+        for attempt in range(2):
+            worker = self._acquire()
+            try:
+                result = self._call(worker, func, args, kwargs)
+            except BaseException as e:
+                worker.kill()
+                self._release(None)
+                if isinstance(e, SandboxError):
+                    self.failures[name] = str(e)
+                raise
+            self._release(worker)
+            if result[0] == "ok":
+                return result[1]
+            if result[1].startswith("MemoryError"):
+                self._recycle(worker)
+                if attempt == 0 and worker.tasks > 1:
+                    logger.info("Retrying %s in a new sandbox process", name)
+                    continue
+            break
+        logger.debug("Sandboxed call for %s failed:\n%s", name, result[2])
+        self.failures[name] = result[1]
+        raise SandboxError(result[1])
+
+    def _call(self, worker: _Worker, func: Callable, args: tuple, kwargs: dict):
+        """Execute a call in worker, raises a SandboxError on timeout or crash."""
+        worker.tasks += 1
+        try:
+            worker.conn.send((func, args, kwargs))
+            if not worker.conn.poll(self.timeout or None):
+                raise SandboxTimeout(f"no result after {self.timeout} seconds")
+            return worker.conn.recv()
+        except (EOFError, OSError) as e:
+            worker.kill()
+            raise SandboxCrash(
+                f"worker died with exit code {worker.process.exitcode}"
+            ) from e
+
+    def _recycle(self, worker: _Worker):
+        """Replace an idle worker by a new one, which is started on demand."""
+        with self._lock:
+            if worker in self._idle:
+                self._idle.remove(worker)
+                self._count -= 1
+        worker.stop()
+
+    def shutdown(self):
+        """Stop all idle worker processes."""
+        with self._lock:
+            if self._pid == os.getpid():
+                for worker in self._idle:
+                    worker.stop()
+            self._idle, self._count = [], 0
+
+    def summary(self) -> str:
+        """Return a summary of the failed items."""
+        lines = [f"{len(self.failures)} items failed in the sandbox"]
+        lines += [f"  {name}: {reason}" for name, reason in self.failures.items()]
+        return "\n".join(lines)
+
+
+SANDBOX: Union[SandboxPool, None] = None
+
+
+def configure_sandbox(
+    enabled: bool,
+    timeout: float = DEFAULT_TIMEOUT,
+    memory_limit: int = 0,
+    initializer: Union[Callable, None] = None,
+    initargs: tuple = (),
+) -> Union[SandboxPool, None]:
+    """
+    Enable (or disable) the sandbox used in module mode.
+
+    :param enabled: bool, whether to use the sandbox
+    :param timeout: float, maximum duration of the extraction of a module in seconds
+    :param memory_limit: int, maximum address space of a worker process in bytes
+    :param initializer: callable, called at the start of every worker, by default
+        the extraction cache, log level, name filters and lazy mode of this process
+        are applied, thus configure_traversal needs to be called first
+    :param initargs: tuple, arguments of the initializer
+
+    :returns: the SandboxPool or None
+    """
+    global SANDBOX  # pylint: disable=global-statement
+    if SANDBOX:
+        SANDBOX.shutdown()
+    if enabled and initializer is None:
+        extraction_cache = cache.EXTRACTION_CACHE
+        initializer = _init_worker
+        initargs = (
+            extraction_cache.cache_dir if extraction_cache else None,
+            extraction_cache.max_size if extraction_cache else cache.DEFAULT_CACHE_SIZE,
+            logger.level,
+            traversal.FILTER.include,
+            traversal.FILTER.exclude,
+            traversal.LAZY,
+        )
+    SANDBOX = (
+        SandboxPool(
+            timeout=timeout,
+            memory_limit=memory_limit,
+            initializer=initializer,
+            initargs=initargs,
+        )
+        if enabled
+        else None
+    )
+    if SANDBOX:
+        logger.info(
+            "Using sandbox processes with a timeout of %.1f s and a memory limit of %s",
+            timeout,
+            f"{memory_limit / 1024**2:.0f} MB" if memory_limit else "none",
+        )
+    return SANDBOX
@@ -0,0 +1,347 @@
+"""
+Serve palettes over HTTP, keeping the imported modules and caches warm.
+
+Importing large packages (numpy, astropy, ...) usually dominates the time to
+generate a palette from the command line. The palette server imports them once
+and answers every following request for the same modules from the already
+imported modules and the warm in-memory caches (type resolution, docstrings
+and, if configured, the extraction cache).
+
+Palettes are requested using GET /palette?module=<name>&<option>=<value> or by
+POSTing a JSON object {"module": <name>, <option>: <value>} to /palette, the
+options are those in REQUEST_OPTIONS. The response is the palette, or in split
+mode {"palettes": {<file name>: <palette>}}. GET /status reports the uptime and
+statistics of the server. The generation is not thread safe, thus concurrent
+requests are served one after the other, but identical concurrent requests
+share a single generation.
+
+Note that modules changed after they were imported are only picked up after a
+restart of the server.
+
+Run `python -m dlg_paletteGen.server -h` or `dlg_paletteGen-server -h`.
+"""
+
+import argparse
+import concurrent.futures
+import glob
+import json
+import logging
+import os
+import re
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Union
+from urllib.parse import parse_qs, urlsplit
+
+from dlg_paletteGen import cache, ids
+from dlg_paletteGen.module_base import palettes_from_module
+from dlg_paletteGen.support_functions import NAME, VERSION, read_palette
+
+from . import logger
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# options of a palette request and their types, see palettes_from_module
+REQUEST_OPTIONS = {
+    "split": bool,
+    "recursive": bool,
+    "prevent_cyclic": bool,
+    "static": bool,
+    "ids": str,
+}
+TRUE_VALUES = ("1", "true", "yes", "on")
+# a dotted import path, anything else is rejected before it reaches the import
+MODULE_NAME = re.compile(r"^[A-Za-z_]\w*(\.[A-Za-z_]\w*)*$")
+
+
+class RequestError(ValueError):
+    """A palette request which can not be served, with its HTTP status."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class PaletteService:
+    """
+    Generate palettes in the server process, one request at a time.
+
+    The palettes are written to a temporary directory and read back, thus the
+    result is identical to the palettes written by the command line tool.
+    """
+
+    def __init__(self):
+        """Initialize the statistics of the service."""
+        self.start = time.time()
+        self.stats = {"requests": 0, "generated": 0, "shared": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._pending: dict = {}
+        self._pending_lock = threading.Lock()
+
+    @staticmethod
+    def parse_request(request: dict) -> tuple:
+        """
+        Validate a palette request.
+
+        :param request: dict, the module name and options, the values may be
+            strings, as in a query string
+
+        :returns: tuple, the module name and a dictionary of the options
+        """
+        request = dict(request)
+        module = request.pop("module", None)
+        if not module or not isinstance(module, str):
+            raise RequestError("The name of the module is required")
+        if not MODULE_NAME.fullmatch(module):
+            raise RequestError(f"Invalid module name {module!r}")
+        options = {}
+        for key, value in request.items():
+            option = key.replace("-", "_")
+            if option not in REQUEST_OPTIONS:
+                raise RequestError(
+                    f"Unknown option '{key}', use one of {list(REQUEST_OPTIONS)}"
+                )
+            if REQUEST_OPTIONS[option] is bool and isinstance(value, str):
+                value = value.lower() in TRUE_VALUES
+            options[option] = REQUEST_OPTIONS[option](value)
+        if options.get("ids", ids.DEFAULT_ID_MODE) not in ids.ID_MODES:
+            raise RequestError(f"Unknown id mode, use one of {ids.ID_MODES}")
+        return module, options
+
+    def generate(self, module: str, **options) -> dict:
+        """
+        Return the palette(s) of module, sharing the result of an identical request.
+
+        :param module: str, the import path of the module
+        :param options: the options in REQUEST_OPTIONS
+
+        :returns: dict, the palette or {"palettes": {file name: palette}} in split mode
+        """
+        key = json.dumps([module, options], sort_keys=True)
+        with self._pending_lock:
+            self.stats["requests"] += 1
+            if key in self._pending:
+                self.stats["shared"] += 1
+                future, owner = self._pending[key], False
+            else:
+                future = self._pending[key] = concurrent.futures.Future()
+                owner = True
+        if not owner:
+            return future.result()
+        try:
+            result = self._generate(module, options)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            self.stats["errors"] += 1
+            future.set_exception(e)
+            raise
+        finally:
+            with self._pending_lock:
+                del self._pending[key]
+
+    def _generate(self, module: str, options: dict) -> dict:
+        """Generate the palette(s) of module in a temporary directory."""
+        split = options.get("split", False)
+        with self._lock, tempfile.TemporaryDirectory(prefix="dlg_paletteGen") as tmp:
+            generator = ids.ID_GENERATOR
+            if options.get("ids"):
+                ids.configure_ids(options["ids"])
+            try:
+                palettes_from_module(
+                    module,
+                    outfile=os.path.join(tmp, "" if split else "palette.palette"),
+                    split=split,
+                    recursive=options.get("recursive", True),
+                    prevent_cyclic=options.get("prevent_cyclic", False),
+                    static=options.get("static", False),
+                )
+            except ImportError as e:
+                raise RequestError(f"Unable to import {module}: {e}", 404) from e
+            finally:
+                ids.ID_GENERATOR = generator
+            palettes: dict = {
+                os.path.basename(filename): read_palette(filename)
+                for filename in sorted(glob.glob(os.path.join(tmp, "*.palette")))
+            }
+        self.stats["generated"] += 1
+        if not palettes:
+            raise RequestError(f"No components found in {module}", 404)
+        if split:
+            return {"palettes": palettes}
+        return palettes["palette.palette"]
+
+    def status(self) -> dict:
+        """Return the uptime and statistics of the service."""
+        return {
+            "name": NAME,
+            "version": VERSION,
+            "uptime": time.time() - self.start,
+            "busy": self._lock.locked(),
+            "imported_modules": len(sys.modules),
+            "extraction_cache": (
+                cache.EXTRACTION_CACHE.summary() if cache.EXTRACTION_CACHE else None
+            ),
+            **self.stats,
+        }
+
+
+class PaletteRequestHandler(BaseHTTPRequestHandler):
+    """Answer the palette and status requests of the PaletteService of the server."""
+
+    server_version = f"{NAME}/{VERSION}"
+
+    def _send_json(self, content: dict, status: int = 200):
+        body = json.dumps(content).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _palette(self, request: dict):
+        service = self.server.service  # type: ignore[attr-defined]
+        try:
+            module, options = service.parse_request(request)
+            self._send_json(service.generate(module, **options))
+        except RequestError as e:
+            self._send_json({"error": str(e)}, e.status)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.exception("Failed to generate the palette of %s", request)
+            self._send_json({"error": f"{type(e).__name__}: {e}"}, 500)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve GET /palette?module=<name>&... and GET /status."""
+        url = urlsplit(self.path)
+        if url.path == "/status":
+            self._send_json(self.server.service.status())  # type: ignore[attr-defined]
+        elif url.path == "/palette":
+            self._palette({k: v[-1] for k, v in parse_qs(url.query).items()})
+        else:
+            self._send_json({"error": f"Unknown path {url.path}"}, 404)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Serve POST /palette with a JSON object of the module name and options."""
+        if urlsplit(self.path).path != "/palette":
+            self._send_json({"error": f"Unknown path {self.path}"}, 404)
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            self._send_json({"error": f"Invalid request: {e}"}, 400)
+            return
+        self._palette(request)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Log the requests using the logger of the package."""
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+class PaletteServer(ThreadingHTTPServer):
+    """HTTP palette server listening on a TCP port."""
+
+    daemon_threads = True
+    service: PaletteService
+
+
+class UnixPaletteServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP palette server listening on a Unix domain socket."""
+
+    daemon_threads = True
+    service: PaletteService
+
+    def get_request(self):
+        """Return the connection with a client address usable by the handler."""
+        request, _ = super().get_request()
+        return request, ("local", 0)
+
+
+def create_server(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: Union[str, None] = None,
+) -> Union[PaletteServer, UnixPaletteServer]:
+    """
+    Create (but not start) a palette server.
+
+    :param host: str, the address the server listens on
+    :param port: int, the TCP port, 0 selects a free port
+    :param socket_path: str, listen on this Unix domain socket instead of TCP
+
+    :returns: the server, call serve_forever to start it
+    """
+    server: Union[PaletteServer, UnixPaletteServer]
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixPaletteServer(socket_path, PaletteRequestHandler)
+    else:
+        server = PaletteServer((host, port), PaletteRequestHandler)
+    server.service = PaletteService()
+    return server
+
+
+def main(args=None):  # pragma: no cover
+    """Run the palette server using the command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="dlg_paletteGen-server",
+        description="Serve palettes over HTTP, keeping the imported modules warm",
+    )
+    parser.add_argument(
+        "--host",
+        help="address the server listens on (default: %(default)s)",
+        default=DEFAULT_HOST,
+    )
+    parser.add_argument(
+        "--port",
+        help="TCP port of the server (default: %(default)s)",
+        type=int,
+        default=DEFAULT_PORT,
+    )
+    parser.add_argument(
+        "--socket",
+        help="listen on this Unix domain socket instead of TCP",
+        default=None,
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="directory of the persistent extraction cache (default: no cache)",
+        default="",
+    )
+    parser.add_argument(
+        "--cache-size",
+        help="maximum size of the extraction cache in MB (default: %(default)s)",
+        type=int,
+        default=cache.DEFAULT_CACHE_SIZE // 1024**2,
+    )
+    parser.add_argument(
+        "-v", "--verbose", help="DEBUG level logging", action="store_true"
+    )
+    parsed = parser.parse_args(args)
+    logger.setLevel(logging.DEBUG if parsed.verbose else logging.INFO)
+    cache.configure_cache(parsed.cache_dir, max_size=parsed.cache_size * 1024**2)
+    server = create_server(parsed.host, parsed.port, parsed.socket)
+    logger.info(
+        "Serving palettes on %s",
+        parsed.socket or f"http://{parsed.host}:{server.server_address[1]}",
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping the palette server")
+    finally:
+        server.server_close()
+        if parsed.socket and os.path.exists(parsed.socket):
+            os.remove(parsed.socket)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -1,32 +1,31 @@
 """Set global values."""
 
+import sys
 from enum import Enum
 
-import numpy
-
 from . import logger, silence_module_logger
 
 logger.debug("Number of enabled loggers: %d", silence_module_logger())
 
 # these are our supported base types
-VALUE_TYPES = {
+VALUE_TYPES: dict = {
     str: "String",
     int: "Integer",
     float: "Float",
     bool: "Boolean",
     list: "List",
     dict: "Dict",
-    numpy.array: "numpy.array",
-    numpy.ndarray: "numpy.array",
 }
 
 SVALUE_TYPES = {k.__name__: v for k, v in VALUE_TYPES.items() if hasattr(k, "__name__")}
+# the names of numpy.array and numpy.ndarray, numpy is only imported when used
+SVALUE_TYPES.update({"array": "numpy.array", "ndarray": "numpy.array"})
 
 CVALUE_TYPES = {
     "array_like": "numpy.array",
     "arraylike": "numpy.array",
-    numpy.ndarray.__name__: "numpy.array",
-    numpy._globals._NoValueType.__name__: "Object",  # type: ignore
+    "ndarray": "numpy.array",
+    "_NoValueType": "Object",  # numpy._globals._NoValueType
     "inspect._empty": "None",
     "type": "Object",
     "any": "Object",
@@ -34,6 +33,27 @@ CVALUE_TYPES = {
     "builtins.NoneType": "None",
 }
 
+
+def load_numpy_types() -> bool:
+    """
+    Add the numpy types to VALUE_TYPES once numpy has been imported.
+
+    Importing numpy takes a good part of the startup time, but no value can be
+    a numpy array before numpy is imported by the inspected code, thus this is
+    called after importing modules and before guessing types.
+
+    :returns: bool, True if the numpy types are known
+    """
+    numpy = sys.modules.get("numpy")
+    if numpy is None or not hasattr(numpy, "ndarray"):  # not (yet) imported
+        return False
+    if numpy.ndarray not in VALUE_TYPES:
+        VALUE_TYPES.update({numpy.array: "numpy.array", numpy.ndarray: "numpy.array"})
+    return True
+
+
+load_numpy_types()
+
 BLOCKDAG_DATA_FIELDS = [
     "inputPorts",
     "outputPorts",
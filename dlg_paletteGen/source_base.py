@@ -2,15 +2,24 @@
 
 import csv
 import os
+import tempfile
 import uuid
 import xml.etree.ElementTree as ET
 from enum import Enum
 from typing import Any, Union
 
 from dlg_paletteGen.classes import Child, Language
-from dlg_paletteGen.support_functions import check_text_element, get_next_id
-
-from . import logger
+from dlg_paletteGen.settings import DOXYGEN_SETTINGS
+from dlg_paletteGen.support_functions import (
+    check_text_element,
+    get_next_id,
+    palette_filename,
+    prepare_and_write_palette,
+    process_doxygen,
+    process_xml,
+)
+
+from . import logger, profiling
 
 KNOWN_CONSTRUCT_TYPES = ["Scatter", "Gather"]
 
@@ -586,6 +595,62 @@ def process_compounddefs(
     return nodes
 
 
+def palette_from_source(
+    inputdir: str,
+    outfile: str,
+    tag: str = "",
+    allow_missing_eagle_start: bool = True,
+    language: Language = Language.PYTHON,
+    recursive: bool = False,
+    incremental: bool = False,
+    compact: bool = False,
+    compression: Union[str, None] = None,
+) -> dict:
+    """
+    Extract the components of source files using doxygen and write them to a palette.
+
+    :param inputdir: str, the directory or file examined
+    :param outfile: str, the file name of the palette
+    :param tag: str, return only those components matching this tag
+    :param allow_missing_eagle_start: bool, treat non-daliuge tagged classes and
+        functions
+    :param language: Language, the language of the source files
+    :param recursive: bool, traverse the sub-directories of inputdir
+    :param incremental: bool, only re-write the palette if its content changed
+    :param compact: bool, write the palette as minified JSON
+    :param compression: str, compress the palette using "gzip" or "zstd"
+
+    :returns: dict, the file name of the palette and its number of components, empty
+        if the palette was not written
+    """
+    with tempfile.TemporaryDirectory() as output_directory:
+        DOXYGEN_SETTINGS.update(
+            {
+                "PROJECT_NAME": os.environ.get("PROJECT_NAME", ""),
+                "INPUT": inputdir,
+                "OUTPUT_DIRECTORY": output_directory,
+                "RECURSIVE": "YES" if recursive else "NO",
+            }
+        )
+        with profiling.phase("doxygen"):
+            process_doxygen(language=language)
+        with profiling.phase("xml"):
+            output_xml_filename = process_xml()
+        with profiling.phase("compounddefs"):
+            nodes = process_compounddefs(
+                output_xml_filename, tag, allow_missing_eagle_start, language
+            )
+    filename = palette_filename(outfile, compression)
+    status = prepare_and_write_palette(
+        nodes,
+        filename,
+        incremental=incremental,
+        indent=None if compact else 4,
+        compression=compression,
+    )
+    return {filename: len(nodes)} if status else {}
+
+
 def process_compounddef_default(compounddef: ET.Element, language: Language) -> list:
     """
     Process a compound definition.
@@ -0,0 +1,741 @@
+# pylint: disable=dangerous-default-value
+"""Provide import-free extraction of the members of Python modules using ast."""
+
+import ast
+import builtins
+import functools
+import importlib.machinery
+import inspect
+import os
+import typing
+from pkgutil import iter_modules
+from typing import Any, Callable, Tuple, Union
+
+from dlg_paletteGen import module_base, profiling, traversal
+from dlg_paletteGen.classes import DetailedDescription
+from dlg_paletteGen.source_base import FieldUsage
+from dlg_paletteGen.support_functions import (
+    constructNode,
+    get_submodules,
+    import_using_name,
+    populateFields,
+)
+
+from . import logger
+
+SKIPPED_SUB_MODULES = ["test", "tests", "src", "setup_package"]
+MAX_IMPORT_DEPTH = 10
+PROPERTY_DECORATORS = ["property", "cached_property", "setter", "getter", "deleter"]
+# constructor of classes without an explicit __init__, as reported by inspect
+OBJECT_INIT = typing.cast(
+    ast.FunctionDef, ast.parse("def __init__(self, /, *args, **kwargs): pass").body[0]
+)
+FunctionDef = Union[ast.FunctionDef, ast.AsyncFunctionDef]
+
+
+def _find_spec(import_name: str) -> Tuple[Any, list]:
+    """
+    Locate a module without importing it or any of its parent packages.
+
+    Parts of import_name which are not modules are returned as member path, e.g.
+    'package.module.Class' returns the spec of 'package.module' and ['Class'].
+
+    :param import_name: str, the dotted import path
+
+    :returns: (ModuleSpec or None, list of the remaining name parts)
+    """
+    parts = import_name.split(".")
+    spec = importlib.machinery.PathFinder.find_spec(parts[0])
+    if spec is None:
+        return None, []
+    for i, part in enumerate(parts[1:], 1):
+        if not spec.submodule_search_locations:
+            return spec, parts[i:]
+        sub_spec = importlib.machinery.PathFinder.find_spec(
+            f"{spec.name}.{part}", spec.submodule_search_locations
+        )
+        if sub_spec is None:
+            return spec, parts[i:]
+        spec = sub_spec
+    return spec, []
+
+
+def _is_source(spec) -> bool:
+    """
+    Check whether a module can be analysed statically.
+
+    :param spec: ModuleSpec, the spec of the module
+
+    :returns: bool, True for Python source files and namespace packages
+    """
+    if spec.origin is None or spec.origin == "namespace":
+        return spec.submodule_search_locations is not None
+    return spec.origin.endswith(tuple(importlib.machinery.SOURCE_SUFFIXES))
+
+
+def _resolve(expr: ast.expr, scope: dict) -> Any:
+    """
+    Resolve an expression built from builtin and typing names, without importing.
+
+    Names defined or imported from other modules by the module itself can only be
+    resolved by importing it, these raise a NameError.
+
+    :param expr: ast expression, e.g. of an annotation
+    :param scope: dict, the scope of the module, see _parse_module
+
+    :returns: the object, e.g. typing.Optional[str] for 'Union[str, None]'
+
+    :raises NameError: if the expression can't be resolved statically
+    """
+    local = set(scope.get("definitions", {})) | set(scope.get("constants", {}))
+    imports = scope.get("imports", {})
+    if isinstance(expr, ast.Constant):  # e.g. None or Literal['a']
+        return expr.value
+    if isinstance(expr, ast.Name) and expr.id not in local:
+        if expr.id in imports:
+            module, name = imports[expr.id]
+            if module == "typing" and hasattr(typing, name):
+                return getattr(typing, name)
+        elif hasattr(builtins, expr.id):
+            return getattr(builtins, expr.id)
+    elif (
+        isinstance(expr, ast.Attribute)
+        and isinstance(expr.value, ast.Name)
+        and expr.value.id in ("typing", "builtins")
+        and expr.value.id not in local | set(imports)
+    ):
+        module = typing if expr.value.id == "typing" else builtins
+        if hasattr(module, expr.attr):
+            return getattr(module, expr.attr)
+    elif isinstance(expr, (ast.Tuple, ast.List)):
+        items = [_resolve(e, scope) for e in expr.elts]
+        return tuple(items) if isinstance(expr, ast.Tuple) else items
+    elif isinstance(expr, ast.Subscript):
+        try:
+            return _resolve(expr.value, scope)[_resolve(expr.slice, scope)]
+        except TypeError as e:  # e.g. a builtin function subscripted
+            raise NameError(ast.unparse(expr)) from e
+    elif isinstance(expr, ast.BinOp) and isinstance(expr.op, ast.BitOr):
+        try:
+            return _resolve(expr.left, scope) | _resolve(expr.right, scope)
+        except TypeError as e:  # X | Y requires Python 3.10
+            raise NameError(ast.unparse(expr)) from e
+    raise NameError(ast.unparse(expr))
+
+
+def _annotation(expr: Union[ast.expr, None], scope: dict = {}) -> Any:
+    """
+    Convert an annotation expression to what populateFields expects.
+
+    Annotations built from builtin and typing names are resolved to the objects
+    inspect would return, thus typeFix produces the same type strings as in the
+    inspect based extraction. Everything else is returned as source string.
+
+    :param expr: ast expression of the annotation
+    :param scope: dict, the scope of the module, see _parse_module
+
+    :returns: the annotation object or str or inspect.Parameter.empty
+    """
+    if expr is None:
+        return inspect.Parameter.empty
+    if isinstance(expr, ast.Constant) and isinstance(expr.value, str):
+        return expr.value  # string annotation
+    try:
+        return _resolve(expr, scope)
+    except NameError:
+        return ast.unparse(expr).replace("typing.", "")
+
+
+def _static_signature(func: FunctionDef, bound: bool = False, scope: dict = {}) -> tuple:
+    """
+    Construct an inspect.Signature from the ast of a function definition.
+
+    Default values which are neither literals, module level constants nor builtin
+    or typing names can't be evaluated without importing the module, their source
+    is returned separately.
+
+    :param func: FunctionDef, the function definition
+    :param bound: bool, drop the first parameter (classmethods)
+    :param scope: dict, the scope of the module, see _parse_module
+
+    :returns: (inspect.Signature, dict of parameter name to default source)
+    """
+    args = func.args
+    kind = inspect.Parameter
+    positional = [(a, kind.POSITIONAL_ONLY) for a in args.posonlyargs] + [
+        (a, kind.POSITIONAL_OR_KEYWORD) for a in args.args
+    ]
+    defaults: list = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    params: list = list(zip(positional, defaults))
+    if args.vararg:
+        params.append(((args.vararg, kind.VAR_POSITIONAL), None))
+    params += [
+        ((a, kind.KEYWORD_ONLY), d) for a, d in zip(args.kwonlyargs, args.kw_defaults)
+    ]
+    if args.kwarg:
+        params.append(((args.kwarg, kind.VAR_KEYWORD), None))
+    if bound:
+        params = params[1:]
+    constants = scope.get("constants", {})
+    parameters = []
+    source_defaults = {}
+    for (arg, param_kind), default in params:
+        value = inspect.Parameter.empty
+        if isinstance(default, ast.Name) and default.id in constants:
+            value = constants[default.id]
+        elif default is not None:
+            try:
+                value = ast.literal_eval(default)
+            except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+                try:
+                    value = _resolve(default, scope)
+                except NameError:
+                    source_defaults[arg.arg] = ast.unparse(default)
+        parameters.append(
+            inspect.Parameter(
+                arg.arg,
+                param_kind,
+                default=value,
+                annotation=_annotation(arg.annotation, scope),
+            )
+        )
+    sig = inspect.Signature(
+        parameters,
+        return_annotation=_annotation(func.returns, scope),
+        __validate_parameters__=False,
+    )
+    return sig, source_defaults
+
+
+def _decorator_names(func: FunctionDef) -> list:
+    """Return the last name part of all decorators of a function."""
+    names = []
+    for dec in func.decorator_list:
+        if isinstance(dec, ast.Call):
+            dec = dec.func
+        names.append(ast.unparse(dec).rsplit(".", 1)[-1])
+    return names
+
+
+def _inherited_docstring(
+    name: str, cls: ast.ClassDef, classes: dict, seen: Union[set, None] = None
+) -> Union[str, None]:
+    """
+    Find the docstring of a method in the base classes, like inspect.getdoc.
+
+    Only the base classes defined in the same module are searched.
+
+    :param name: str, the name of the method
+    :param cls: ast.ClassDef, the class overriding the method
+    :param classes: dict, the classes defined in the module
+    :param seen: set, the names of the classes already searched
+
+    :returns: str, the docstring or None
+    """
+    seen = seen if seen is not None else {cls.name}
+    for base in cls.bases:
+        base_cls = classes.get(ast.unparse(base))
+        if base_cls is None or base_cls.name in seen:
+            continue
+        seen.add(base_cls.name)
+        for stmt in base_cls.body:
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                if stmt.name == name and ast.get_docstring(stmt):
+                    return ast.get_docstring(stmt)
+        doc = _inherited_docstring(name, base_cls, classes, seen)
+        if doc:
+            return doc
+    return None
+
+
+def _get_static_docs(
+    func: FunctionDef,
+    cls: Union[ast.ClassDef, None],
+    node: dict,
+    source: str,
+    classes: dict = {},
+) -> Union[DetailedDescription, None]:
+    """
+    Extract the documentation of a function definition, like _get_docs.
+
+    :param func: FunctionDef, the function definition
+    :param cls: ast.ClassDef, the class containing the function, if any
+    :param node: dict, the node of the function, description and category are updated
+    :param source: str, the source code of the function
+    :param classes: dict, the classes defined in the module
+
+    :returns: DetailedDescription or None
+    """
+    dd = dd_mod = None
+    doc = ast.get_docstring(func)
+    if not doc and cls:
+        doc = _inherited_docstring(func.name, cls, classes)
+    if doc:
+        logger.debug("Process documentation of function %s", node["name"])
+        dd = DetailedDescription(doc, name=node["name"])
+        node["description"] = f"{dd.description.strip()}"
+    class_doc = ast.get_docstring(cls) if cls else None
+    if cls and func.name in ["__init__", "__cls__"] and class_doc:
+        logger.debug("Using description of class '%s' for %s", cls.name, node["name"])
+        node["category"] = "PythonMemberFunction"
+        dd_mod = DetailedDescription(class_doc, name=cls.name)
+        node["description"] += f"\n{dd_mod.description.strip()}"
+    if not dd and dd_mod:
+        dd = dd_mod
+    elif not dd and not dd_mod and source:
+        logger.info(
+            "Entity '%s' has no in-line documentation. "
+            "Trying to generate or using source.",
+            node["name"],
+        )
+        profiling.note("undocumented")
+        description, doc = module_base._format_source_as_doc(source)
+        node["description"] += description
+        dd = DetailedDescription(doc)
+    return dd
+
+
+@profiling.per_member
+def _construct_static_node(
+    func: FunctionDef,
+    module_name: str,
+    scope: dict,
+    cls: Union[ast.ClassDef, None] = None,
+) -> dict:
+    """
+    Construct the node of a function or method definition, like construct_member_node.
+
+    :param func: FunctionDef, the function definition
+    :param module_name: str, the name of the module defining the function
+    :param scope: dict, the source lines, constants and classes of the module
+    :param cls: ast.ClassDef, the class containing the function, if any
+
+    :returns: dict, the node
+    """
+    load_name = (
+        f"{module_name}.{cls.name}.{func.name}" if cls else f"{module_name}.{func.name}"
+    )
+    node = constructNode()
+    node["name"] = load_name
+    decorators = _decorator_names(func)
+    sig, source_defaults = _static_signature(
+        func, bound="classmethod" in decorators, scope=scope
+    )
+    # same as inspect.getsource, i.e. including the decorators
+    first = min([func.lineno] + [d.lineno for d in func.decorator_list]) - 1
+    last = func.end_lineno
+    source = "".join(scope["lines"][first:last]) if func is not OBJECT_INIT else ""
+    dd = _get_static_docs(func, cls, node, source, classes=scope["classes"])
+    fields = populateFields(sig, dd)
+    for name, default in source_defaults.items():
+        # keep the expression, the value is only known at run-time
+        fields[name]["value"] = fields[name]["defaultValue"] = default
+        if fields[name]["type"] == "None":
+            fields[name]["type"] = "Object"
+    self_usage: Union[FieldUsage, str] = ""
+    if next(iter(fields), None) == "self":
+        self_usage = (
+            FieldUsage.OutputPort if func.name in ["__init__", "__cls__"] else "InputPort"
+        )
+    node = module_base._add_member_fields(
+        node, fields, load_name, module_name, self_usage
+    )
+    logger.debug("Constructed node for member %s", node["name"])
+    return node
+
+
+def _module_definitions(body: list) -> dict:
+    """
+    Collect the function and class definitions of a module body.
+
+    Definitions in if/try blocks are included, the first definition of a name wins.
+
+    :param body: list, the statements of the module
+
+    :returns: dict of names to ast.FunctionDef and ast.ClassDef
+    """
+    definitions: dict = {}
+    for stmt in body:
+        if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            definitions.setdefault(stmt.name, stmt)
+        elif isinstance(stmt, (ast.If, ast.Try)):
+            for name, definition in _module_definitions(_sub_blocks(stmt)).items():
+                definitions.setdefault(name, definition)
+    return definitions
+
+
+def _sub_blocks(stmt: Union[ast.If, ast.Try]) -> list:
+    """Return the statements of all blocks of an if or try statement."""
+    blocks = [stmt.body, stmt.orelse]
+    if isinstance(stmt, ast.Try):
+        blocks += [h.body for h in stmt.handlers] + [stmt.finalbody]
+    return [s for block in blocks for s in block]
+
+
+def _module_imports(body: list, package: str) -> tuple:
+    """
+    Collect the names imported into a module body using 'from ... import'.
+
+    :param body: list, the statements of the module
+    :param package: str, the package used to resolve relative imports
+
+    :returns: (dict of names to (module, name), list of modules imported using *)
+    """
+    imports: dict = {}
+    star_imports = []
+    for stmt in body:
+        if isinstance(stmt, (ast.If, ast.Try)):
+            sub_imports, sub_stars = _module_imports(_sub_blocks(stmt), package)
+            for name, source in sub_imports.items():
+                imports.setdefault(name, source)
+            star_imports += sub_stars
+        if not isinstance(stmt, ast.ImportFrom):
+            continue
+        module = stmt.module or ""
+        if stmt.level:
+            parts = package.split(".")
+            base = parts[: len(parts) - stmt.level + 1]
+            module = ".".join(base + ([module] if module else []))
+        for alias in stmt.names:
+            if alias.name == "*":
+                star_imports.append(module)
+            else:
+                imports.setdefault(alias.asname or alias.name, (module, alias.name))
+    return imports, star_imports
+
+
+def _module_all(body: list) -> Union[list, None]:
+    """Return the literal content of __all__ in a module body, if defined."""
+    names = None
+    for stmt in body:
+        if isinstance(stmt, (ast.Assign, ast.AugAssign)):
+            targets = stmt.targets if isinstance(stmt, ast.Assign) else [stmt.target]
+            if not any(isinstance(t, ast.Name) and t.id == "__all__" for t in targets):
+                continue
+            try:
+                value = list(ast.literal_eval(stmt.value))
+            except (ValueError, TypeError, SyntaxError):
+                continue
+            names = names + value if isinstance(stmt, ast.AugAssign) and names else value
+    return names
+
+
+def _module_constants(body: list) -> dict:
+    """Return the module level names assigned to a literal value."""
+    constants = {}
+    for stmt in body:
+        if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1:
+            target, value = stmt.targets[0], stmt.value
+        elif isinstance(stmt, ast.AnnAssign) and stmt.value is not None:
+            target, value = stmt.target, stmt.value
+        else:
+            continue
+        if not isinstance(target, ast.Name):
+            continue
+        try:
+            constants[target.id] = ast.literal_eval(value)
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            constants.pop(target.id, None)
+    return constants
+
+
+def _class_nodes(cls: ast.ClassDef, module_name: str, scope: dict) -> list:
+    """
+    Construct the nodes of the methods of a class, like get_class_members.
+
+    Only the methods defined in the class itself are found. Inherited methods
+    would require to import the base classes.
+
+    :param cls: ast.ClassDef, the class definition
+    :param module_name: str, the name of the module defining the class
+    :param scope: dict, the source lines, constants and classes of the module
+
+    :returns: list of nodes
+    """
+    methods = [
+        m
+        for m in cls.body
+        if isinstance(m, (ast.FunctionDef, ast.AsyncFunctionDef))
+        and (m.name[0].isalpha() or m.name in ["__init__", "__cls__"])
+        and not set(_decorator_names(m)) & set(PROPERTY_DECORATORS)
+    ]
+    if (
+        not any(m.name == "__init__" for m in methods)
+        and not cls.decorator_list
+        and all(ast.unparse(b) == "object" for b in cls.bases)
+    ):
+        methods.insert(0, OBJECT_INIT)
+    return [_construct_static_node(m, module_name, scope, cls=cls) for m in methods]
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_module(module_name: str, filename: str, mtime_ns: int) -> Union[dict, None]:
+    """
+    Parse a Python source file and collect what is needed to construct its nodes.
+
+    The result is cached, the modification time is part of the key to catch changes.
+
+    :param module_name: str, the name of the module
+    :param filename: str, the path of the source file
+    :param mtime_ns: int, the modification time of the file
+
+    :returns: dict, the scope of the module or None if it can't be parsed
+    """
+    logger.debug("Parsing %s (%d)", filename, mtime_ns)
+    with open(filename, "rb") as sfile:
+        source = sfile.read()
+    try:
+        tree = ast.parse(source, filename=filename)
+    except (SyntaxError, ValueError) as e:
+        logger.error("Unable to parse %s: %s", filename, e)
+        return None
+    definitions = _module_definitions(tree.body)
+    is_package = os.path.basename(filename).startswith("__init__.")
+    imports, star_imports = _module_imports(
+        tree.body, module_name if is_package else module_name.rsplit(".", 1)[0]
+    )
+    return {
+        "doc": ast.get_docstring(tree, clean=False),
+        "lines": source.decode("utf-8", errors="replace").splitlines(keepends=True),
+        "all": _module_all(tree.body),
+        "constants": _module_constants(tree.body),
+        "definitions": definitions,
+        "classes": {n: d for n, d in definitions.items() if isinstance(d, ast.ClassDef)},
+        "imports": imports,
+        "star_imports": star_imports,
+    }
+
+
+def _module_scope(module_name: str) -> Union[Tuple[str, dict], None]:
+    """
+    Locate and parse a module without importing it.
+
+    :param module_name: str, the name of the module
+
+    :returns: (module name, scope) or None if this is not a Python source module
+    """
+    spec, member_path = _find_spec(module_name)
+    if spec is None or member_path or not _is_source(spec):
+        return None
+    if not spec.origin or not os.path.isfile(spec.origin):
+        return None
+    scope = _parse_module(spec.name, spec.origin, os.stat(spec.origin).st_mtime_ns)
+    return (spec.name, scope) if scope else None
+
+
+def _public_names(scope: dict, depth: int = 0) -> list:
+    """
+    Return the names exposed by a module, like 'from module import *'.
+
+    :param scope: dict, the scope of the module
+    :param depth: int, the depth of nested star imports
+
+    :returns: list of names
+    """
+    if scope["all"] is not None:
+        return scope["all"]
+    names = list(scope["definitions"]) + list(scope["imports"])
+    for module in scope["star_imports"]:
+        star = _module_scope(module) if depth < MAX_IMPORT_DEPTH else None
+        if star:
+            names += _public_names(star[1], depth + 1)
+    return [n for n in names if n[0] != "_"]
+
+
+def _resolve_definition(module_name: str, scope: dict, name: str, depth: int = 0):
+    """
+    Find the definition of a name, following the imports from other modules.
+
+    :param module_name: str, the name of the module
+    :param scope: dict, the scope of the module
+    :param name: str, the name to be resolved
+    :param depth: int, the number of imports followed so far
+
+    :returns: (defining module name, definition, scope) or None if not found
+    """
+    if name in scope["definitions"]:
+        return module_name, scope["definitions"][name], scope
+    if depth >= MAX_IMPORT_DEPTH:
+        return None
+    sources = [scope["imports"][name]] if name in scope["imports"] else []
+    sources += [(module, name) for module in scope["star_imports"]]
+    for module, source_name in sources:
+        source_scope = _module_scope(module)
+        if source_scope:
+            resolved = _resolve_definition(*source_scope, source_name, depth + 1)
+            if resolved:
+                return resolved
+    return None
+
+
+def get_static_members(module_name: str, member_path: list = []) -> tuple:
+    """
+    Extract the members of a Python source module without importing it.
+
+    This is the static equivalent of get_members and produces the same node
+    dictionaries from the function signatures, annotations, literal default values
+    and docstrings. Members imported from other modules of the same package are
+    followed to their definitions.
+
+    :param module_name: str, the name of the module
+    :param member_path: list, restrict the members to this class or function
+
+    :returns: (dict of short member names to nodes, module docstring)
+    """
+    module_scope = _module_scope(module_name)
+    if module_scope is None:
+        return {}, None
+    module_name, scope = module_scope
+    package = module_name.split(".", 1)[0]
+    names = list(scope["definitions"]) + [
+        n
+        for n, (module, _) in scope["imports"].items()
+        if module.split(".", 1)[0] == package
+    ]
+    for module in scope["star_imports"]:
+        star = _module_scope(module) if module.split(".", 1)[0] == package else None
+        names += _public_names(star[1]) if star else []
+    members: dict = {}
+    # the members are pruned before they are resolved, like in get_members
+    name_filter = traversal.FILTER if not member_path else None
+    for name in dict.fromkeys(names):
+        if member_path and name != member_path[0]:
+            continue
+        if scope["all"] is not None and name not in scope["all"]:
+            continue
+        if name[0] == "_" and name not in ["__init__", "__call__"]:
+            continue
+        if name_filter and not name_filter.member(f"{module_name}.{name}"):
+            traversal.STATS.counts["members_pruned"] += 1
+            continue
+        resolved = _resolve_definition(module_name, scope, name)
+        if resolved is None:
+            continue
+        def_module, definition, def_scope = resolved
+        if isinstance(definition, ast.ClassDef):
+            if def_module.find(module_name) < 0:
+                # same rule as for imported classes in get_members
+                continue
+            nodes = _class_nodes(definition, def_module, def_scope)
+            if len(member_path) > 1:
+                nodes = [n for n in nodes if n["name"].endswith(f".{member_path[1]}")]
+        else:
+            # functions are named after the module they are found in
+            nodes = [_construct_static_node(definition, module_name, def_scope)]
+        for node in nodes:
+            # we only use the last two parts of the name
+            short_name = ".".join(node["name"].rsplit(".", 2)[-2:])
+            node["name"] = short_name
+            members.setdefault(short_name, node)
+    logger.debug("Extracted %d members in module %s", len(members), module_name)
+    return members, scope["doc"]
+
+
+def static_submodules(
+    import_name: str, prune: Union[Callable[[str], bool], None] = None
+) -> list:
+    """
+    Retrieve the names of the sub-modules of a module without importing it.
+
+    Same as get_submodules, but based on the files found in the package directory.
+
+    :param import_name: str, the dotted import path of the module
+    :param prune: callable, called with the name of every sub-module found,
+        returns True if the sub-module is skipped, see traversal.prune_module
+
+    :returns: list of sub-module names
+    """
+    spec, _ = _find_spec(import_name)
+    if spec is None:
+        return []
+    if not _is_source(spec):
+        return list(get_submodules(import_using_name(import_name), prune=prune)[0])
+    if not spec.submodule_search_locations:
+        return []
+    sub_modules = [
+        f"{spec.name}.{pkg.name}"
+        for pkg in iter_modules(spec.submodule_search_locations)
+        if pkg.name[0] != "_" and pkg.name not in SKIPPED_SUB_MODULES
+    ]
+    return [s for s in sub_modules if not (prune and prune(s))]
+
+
+def static_module_hook(
+    import_name: str, modules: dict = {}, recursive: bool = True
+) -> tuple:
+    """
+    Extract the members of a module and its sub-modules without importing them.
+
+    This is the static equivalent of module_hook. Only the top-level package is
+    located using the import machinery, everything else is found by walking the
+    package directories and parsing the source files. Compiled extension modules
+    can't be analysed statically and are extracted by importing them.
+
+    The sub-modules are traversed like in module_hook, thus the filters and the
+    limits set by traversal.configure_traversal apply.
+
+    Args:
+        import_name (str): The dotted import path of the module, class or function.
+        modules (dict, optional): A dictionary to store discovered members and
+            submodules. Defaults to an empty dict.
+        recursive (bool, optional): Whether to recursively process submodules.
+            Defaults to True.
+
+    Returns:
+        tuple: The updated modules dictionary and the docstring of the module.
+    """
+    spec, member_path = _find_spec(import_name)
+    if spec is None:
+        logger.error("Module %s can't be found!", import_name)
+        return ({}, None)
+    if not _is_source(spec):
+        logger.info("%s is not a Python source module, importing it", spec.name)
+        return module_base.module_hook(import_name, modules=modules, recursive=recursive)
+    walk = traversal.ModuleTraversal(
+        traversal.MAX_DEPTH, traversal.MAX_MODULES, name_filter=traversal.FILTER
+    )
+    result = walk.run(
+        spec.name,
+        functools.partial(_static_hook_module, modules=modules, member_path=member_path),
+        recursive=recursive and not member_path,
+    )
+    if result is None:
+        return ({}, None)
+    return modules, result["doc"]
+
+
+def _static_hook_module(
+    module_name: str,
+    walk: traversal.ModuleTraversal,
+    modules: dict,
+    member_path: list = [],
+) -> Union[tuple, None]:
+    """
+    Extract the members of a single module of a static_module_hook traversal.
+
+    Args:
+        module_name (str): The dotted name of the module.
+        walk (traversal.ModuleTraversal): The traversal of the module.
+        modules (dict): A dictionary to store discovered members and submodules.
+        member_path (list, optional): Restrict the members to this class or
+            function, see get_static_members.
+
+    Returns:
+        tuple: The sub-modules and {"doc": docstring} of the module, None if it
+            can't be found.
+    """
+    spec, _ = _find_spec(module_name)
+    if spec is None:
+        logger.error("Module %s can't be found!", module_name)
+        return None
+    if not _is_source(spec):
+        logger.info("%s is not a Python source module, importing it", spec.name)
+        return module_base._hook_module(  # pylint: disable=protected-access
+            spec.name, walk, modules
+        )
+    module_doc = None
+    if spec.origin and os.path.isfile(spec.origin):
+        members, module_doc = get_static_members(spec.name, member_path)
+        modules.update({spec.name: members})
+        logger.info("Found %d members in %s", len(members), spec.name)
+    return static_submodules(spec.name), {"doc": module_doc}
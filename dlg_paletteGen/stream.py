@@ -0,0 +1,212 @@
+"""
+Bounded-memory extraction of very large packages (--stream).
+
+By default the nodes of all modules of a palette are collected in memory, then
+hashed and written at once. In streaming mode the modules dictionary filled by
+module_hook is a NodeSpool, which appends the finished nodes of every module to
+a temporary JSON Lines file as soon as the module is extracted, and keeps only
+the module and node names. The palette is then stitched together from disk in
+batches (ids, BlockDAG hashes) and written node by node, thus the memory used
+does not grow with the size of the package, apart from the names and hashes.
+
+The palettes written are identical to the ones of the in-memory extraction.
+"""
+
+import json
+import os
+import tempfile
+from typing import Iterator, Union
+
+from dlg_paletteGen import ids
+from dlg_paletteGen.support_functions import (
+    add_data_hashes,
+    constructPalette,
+    graph_signature,
+    read_palette_model,
+    write_palette_stream,
+)
+
+from . import logger
+
+BATCH_SIZE = 1000  # nodes hashed at once
+
+
+def module_nodes(members: dict, names: set) -> Iterator[dict]:
+    """
+    Yield the nodes of the members of a module which are not in names yet.
+
+    The fields of the nodes are converted to a list of field values. Nodes with
+    fields as a list have been returned before and are skipped, but their names
+    are still added to names to skip duplicates.
+
+    :param members: dict, the members of a module, as produced by get_members
+    :param names: set, the names of the nodes returned before, updated in place
+    """
+    for node in members.values():
+        # TODO: remove once EAGLE can deal with dict fields pylint: disable=fixme
+        if node is None or not node:
+            continue
+        node_name = ".".join(node["name"].rsplit(".", 2)[-2:])
+        if node_name in names:
+            continue
+        names.add(node_name)
+        try:
+            if isinstance(node["fields"], list):
+                continue
+            node["fields"] = list(node["fields"].values())
+        except (TypeError, KeyError):
+            continue
+        yield node
+
+
+class NodeSpool(dict):
+    """
+    Modules dictionary (see module_hook) spilling the nodes of every module to disk.
+
+    The module names are kept, since they are used to skip duplicate members, but
+    the members are replaced by an empty dictionary once their nodes have been
+    appended to the spill file of the current palette. The node names are kept
+    across palettes, thus in split mode a component is only written to the
+    palette of the first sub-module it was found in.
+    """
+
+    def __init__(self, directory: Union[str, None] = None):
+        """
+        Initialize an empty spool.
+
+        :param directory: str, the directory of the spill files, None for the
+            default temporary directory
+        """
+        super().__init__()
+        self.directory = directory
+        self.names: set = set()
+        self.path = ""
+        self.count = 0
+
+    def __setitem__(self, name: str, members: dict):
+        """Spill the nodes of the members of module name."""
+        if members:
+            self._spill(members)
+        super().__setitem__(name, {})
+
+    def update(self, *args, **kwargs):  # type: ignore[override]
+        """Spill the nodes of all modules, see __setitem__."""
+        for name, members in dict(*args, **kwargs).items():
+            self[name] = members
+
+    def _spill(self, members: dict):
+        lines = [json.dumps(node) + "\n" for node in module_nodes(members, self.names)]
+        if not lines:
+            return
+        if not self.path:
+            fd, self.path = tempfile.mkstemp(
+                prefix="dlg_paletteGen", suffix=".jsonl", dir=self.directory
+            )
+            os.close(fd)
+        with open(self.path, "a", encoding="utf-8") as spill:
+            spill.writelines(lines)
+        self.count += len(lines)
+
+    def take(self) -> tuple:
+        """
+        Return the spill file of the current palette and start a new one.
+
+        :returns: tuple, the name of the spill file ("" if empty), which is owned by
+            the caller now, and the number of nodes in it
+        """
+        spilled = (self.path, self.count)
+        self.path, self.count = "", 0
+        return spilled
+
+    def close(self):
+        """Remove the spill file of the current palette, if any."""
+        path, _ = self.take()
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+def _read_nodes(path: str) -> Iterator[dict]:
+    """Yield the nodes of a spill file."""
+    with open(path, "r", encoding="utf-8") as spill:
+        for line in spill:
+            yield json.loads(line)
+
+
+def _batches(path: str, size: int = BATCH_SIZE) -> Iterator[list]:
+    """Yield the nodes of a spill file in lists of size nodes."""
+    batch = []
+    for node in _read_nodes(path):
+        batch.append(node)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_spooled_palette(
+    path: str,
+    output_filename: str,
+    module_doc: Union[str, None] = "",
+    incremental: bool = False,
+    indent: Union[int, None] = 4,
+    compression: Union[str, None] = None,
+) -> int:
+    """
+    Stitch a palette together from a spill file and write it.
+
+    Same as prepare_and_write_palette, apart from incremental mode: a palette
+    whose signature, description and number of components are unchanged is not
+    re-written, but the components of a changed palette are not reused. The spill
+    file is removed.
+
+    :param path: str, the spill file returned by NodeSpool.take
+    :param output_filename: the filename of the output
+    :param module_doc: module level docstring
+    :param incremental: bool, don't re-write an unchanged palette
+    :param indent: int, indentation of the JSON, None writes minified JSON
+    :param compression: str, one of PALETTE_COMPRESSIONS, None writes plain JSON
+
+    :returns: int, 1 if successful, 0 if not
+    """
+    hashed = f"{path}.hashed"
+    try:
+        # the field ids are part of the hashed data, thus they are assigned first
+        hashes: list = []
+        seen: dict = {}
+        with open(hashed, "w", encoding="utf-8") as spill:
+            for batch in _batches(path):
+                ids.ID_GENERATOR.assign_ids(batch, seen)
+                hashes += add_data_hashes(batch)
+                spill.writelines(json.dumps(node) + "\n" for node in batch)
+        os.remove(path)
+        signature = graph_signature(hashes)
+        if incremental:
+            old_model = read_palette_model(output_filename) or {}
+            if (
+                old_model.get("signature") == signature
+                and old_model.get("detailedDescription") == (module_doc or "").strip()
+                and old_model.get("numLGNodes") == len(hashes)
+            ):
+                logger.info("Palette %s is unchanged, not re-written", output_filename)
+                return 1
+        palette = constructPalette(
+            module_doc=module_doc,
+            output_filename=output_filename,
+            nodes=[],
+            git_repo=os.environ.get("GIT_REPO"),
+            version=os.environ.get("PROJECT_VERSION"),
+            signature=signature,
+        )
+        palette["modelData"]["numLGNodes"] = len(hashes)
+        palette["nodeDataArray"] = _read_nodes(hashed)
+        if write_palette_stream(
+            palette, output_filename, indent=indent, compression=compression
+        ):
+            logger.debug("Wrote %s components to %s", len(hashes), output_filename)
+            return 1
+        return 0
+    finally:
+        for name in (path, hashed):
+            if os.path.exists(name):
+                os.remove(name)
@@ -11,11 +11,14 @@
 
 import ast
 import datetime
+import functools
+import gzip
 import importlib
-import importlib.metadata
+import importlib.util
 import inspect
 import io
 import json
+import math
 import os
 import re
 import subprocess
@@ -26,10 +29,6 @@ import xml.etree.ElementTree as ET
 from pkgutil import iter_modules
 from typing import Any, Union
 
-import numpy
-from blockdag import build_block_dag
-from google import genai
-
 from dlg_paletteGen.settings import (
     BLOCKDAG_DATA_FIELDS,
     CVALUE_TYPES,
@@ -39,9 +38,22 @@ from dlg_paletteGen.settings import (
     SVALUE_TYPES,
     VALUE_TYPES,
     Language,
+    load_numpy_types,
 )
 
-from . import logger, silence_module_logger
+from . import ids, llm, logger, profiling, silence_module_logger
+
+try:  # optional, faster JSON backend
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+try:  # optional, zstd compressed palettes
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore
+
+PALETTE_COMPRESSIONS = {"gzip": ".gz", "zstd": ".zst"}
+MAGIC_NUMBERS = {"gzip": b"\x1f\x8b", "zstd": b"\x28\xb5\x2f\xfd"}
 
 logger.debug("Number of enabled loggers: %d", silence_module_logger())
 
@@ -75,24 +87,18 @@ def generate_google_docstring(func_source, model="gemini-2.0-flash"):
     """
     Generate a Google-style docstring for a given function using Gemini.
 
+    The request is sent by the shared llm.GENERATOR, which reuses its client and
+    returns cached docstrings without sending a request.
+
     Args:
-        func (callable): The function object to document.
-        model (str, optional): The OpenAI model to use. Defaults to "gemini-2.0-flash".
+        func_source (str): The source code of the function to document.
+        model (str, optional): The Gemini model to use. Defaults to "gemini-2.0-flash".
 
     Returns:
         str: The generated Google-style docstring.
     """
-    prompt = (
-        "Produce the Google-style Python docstring for the function:\n\n"
-        f"{func_source}\n\nReturn parameter descriptions with types."
-        "Return only the docstring without any quotes. "
-        "Wrap lines at 90 characters"
-    )
     # As long as GEMINI_API_KEY is set, we can use the API
-    client = genai.Client()
-    response = client.models.generate_content(model=model, contents=prompt)
-    doc = response.text.replace('"""', "")
-    return doc
+    return llm.GENERATOR.generate(func_source, model=model)
 
 
 def read(*paths, **kwargs):
@@ -132,19 +138,39 @@ def this_module() -> str:
     return f"{package}.{fname}"
 
 
-nn = this_module()
-NAME = "dlg_paletteGen"
-meta = importlib.metadata.metadata(NAME)
-VERSION = meta["Version"]
+def get_version(name: str = "dlg_paletteGen") -> str:
+    """
+    Return the version of the package.
+
+    The VERSION file is read, which is much faster than importing
+    importlib.metadata, the installed metadata are only used if it is missing.
+
+    :param name: str, the name of the package
+
+    :returns: str, the version
+    """
+    try:
+        return read("VERSION")
+    except OSError:
+        import importlib.metadata  # pylint: disable=import-outside-toplevel
+
+        return importlib.metadata.version(name)
 
-# pkg_name = this_module()
 
-nn = this_module()
 NAME = "dlg_paletteGen"
-meta = importlib.metadata.metadata(NAME)
-VERSION = meta["Version"]
+VERSION = get_version(NAME)
 
-# pkg_name = this_module()
+
+def is_ndarray(value: Any) -> bool:
+    """
+    Check whether value is a numpy array, without importing numpy.
+
+    :param value: any, the value to check
+
+    :returns: bool, True if value is a numpy.ndarray
+    """
+    numpy = sys.modules.get("numpy")
+    return numpy is not None and isinstance(value, numpy.ndarray)
 
 
 def cleanString(input_text: str) -> str:
@@ -217,23 +243,81 @@ def guess_type_from_default(default_value: typing.Any = "", raw=False):
     return vt if vt in VALUE_TYPES else typing.Any
 
 
+TYPEFIX_CACHE_SIZE = 4096
+
+
+class TypeFixStats:
+    """Counters of the typeFix calls answered without running the type checks."""
+
+    def __init__(self):
+        """Initialize the counters."""
+        self.table = 0
+        self.unhashable = 0
+
+    def summary(self) -> str:
+        """Return a one line summary of the typeFix cache statistics."""
+        info = _cached_type_fix.cache_info()
+        saved = self.table + info.hits
+        calls = saved + info.misses + self.unhashable
+        rate = 100.0 * saved / calls if calls else 0.0
+        return (
+            f"Type cache: {saved} of {calls} typeFix calls saved ({rate:.1f}%), "
+            f"{self.table} table and {info.hits} memo hits, "
+            f"{self.unhashable} unhashable types"
+        )
+
+
+TYPEFIX_STATS = TypeFixStats()
+
+
+@profiling.profiled("typeFix")
 def typeFix(value_type: Union[Any, None] = "", default_value: Any = None) -> str:
     """
     Fix or guess the type of a parameter.
 
     If a value_type is provided, this will be used to determine the type.
-    Fix or guess the type of a parameter.
-
-    If a value_type is provided, this will be used to determine the type.
+    The results for the types in the settings tables are precomputed and all
+    other (hashable) types are memoized, unless a default_value is given.
 
     :param value_type: any, convert type to one of our strings
     :param default_value: any, this will be used to determine the
                           type if value_type is not specified.
 
+    :returns: str, the converted type as a supported string
+    """
+    if default_value is not None:
+        return _typeFix(value_type, default_value)
+    key_type: type = type(value_type)
+    try:
+        # the type is part of the key, since e.g. True == 1
+        guess_type = _TYPE_TABLE.get((key_type, value_type))
+    except TypeError:  # unhashable annotation, e.g. Annotated[int, {}]
+        TYPEFIX_STATS.unhashable += 1
+        return _typeFix(value_type)
+    if guess_type is not None:
+        TYPEFIX_STATS.table += 1
+        return guess_type
+    return _cached_type_fix(key_type, value_type)
+
+
+@functools.lru_cache(maxsize=TYPEFIX_CACHE_SIZE)
+def _cached_type_fix(_key_type: type, value_type: Any) -> str:
+    """Memoized _typeFix, the key_type is only used to separate equal values."""
+    return _typeFix(value_type)
+
+
+def _typeFix(value_type: Union[Any, None] = "", default_value: Any = None) -> str:
+    """
+    Uncached implementation of typeFix.
+
+    :param value_type: any, convert type to one of our strings
+    :param default_value: any, used if value_type is not specified
+
     :returns: str, the converted type as a supported string
     """
     path_ind = 0.0
     guess_type = "UNIDENTIFIED"
+    load_numpy_types()
     try:
         knownType = value_type in VALUE_TYPES
     except Exception:
@@ -293,6 +377,19 @@ def typeFix(value_type: Union[Any, None] = "", default_value: Any = None) -> str
     return guess_type
 
 
+_TYPE_TABLE = {
+    (type(t), t): _typeFix(t)
+    for t in [
+        *VALUE_TYPES,
+        *SVALUE_TYPES,
+        *CVALUE_TYPES,
+        *CVALUE_TYPES.values(),
+        None,
+        inspect._empty,
+    ]
+}
+
+
 def check_text_element(xml_element: ET.Element, sub_element: str):
     """Check if the xml element has a text value and return it.
 
@@ -344,8 +441,8 @@ def modify_doxygen_options(doxygen_filename: str, options: dict):
 
 
 def get_next_id() -> str:
-    """Use tempfile.mktmp now."""
-    return tempfile.mktemp(prefix="", dir="")
+    """Return a new node or field id from the configured ids.IdGenerator."""
+    return ids.ID_GENERATOR.next_id()
 
 
 def get_mod_name(mod) -> str:
@@ -363,7 +460,7 @@ def get_mod_name(mod) -> str:
     Returns:
         str: The extracted name, or an empty string if no name could be determined.
     """
-    if isinstance(mod, numpy.ndarray):
+    if is_ndarray(mod):
         logger.debug("Trying to get module name: %s", mod)
     if mod is None:
         return ""
@@ -447,72 +544,134 @@ def process_xml() -> str:
     return output_xml_filename
 
 
-def nodes2palette(
-    output_filename: str,
-    nodes_tuple: tuple,
-    git_repo: Union[str, None],
-    version: Union[str, None],
-) -> Union[str, None]:
+def palette_filename(filename: str, compression: Union[str, None] = None) -> str:
     """
-    Construct palette header and converts nodes to json.
+    Append the file extension of the compression to a palette file name.
 
-    The function does not write the output to a file, but returns a JSON string.
+    :param filename: str, the file name
+    :param compression: str, one of PALETTE_COMPRESSIONS or None
 
-    Parameters
-    ----------
-    output_filename : str
-        The name of the output file.
-    nodes_tuple : tuple
-        A tuple containing the signature hash, the module docstring and a list of nodes.
-    git_repo : str or None
-        The git repository URL.
-    version : str or None
-        Version string to be used.
-    signature : str
-        Signature for the palette, usually a hash or unique identifier.
+    :returns: str, the file name with extension
+    """
+    ext = PALETTE_COMPRESSIONS.get(compression or "", "")
+    return filename if filename.endswith(ext) else f"{filename}{ext}"
 
-    Returns
-    -------
-    str
-        JSON string representation of the nodes.
+
+def json_dumps(obj: Any, indent: Union[int, None] = 4) -> str:
     """
-    signature, module_doc, nodes = nodes_tuple
-    palette = constructPalette(
-        module_doc=module_doc,
-        output_filename=output_filename,
-        nodes=nodes,
-        git_repo=git_repo,
-        version=version,
-        signature=signature,
-    )
-    try:
-        json_palette = json.dumps(palette, indent=4)
-        return json_palette
-    except (TypeError, ValueError) as e:
-        logger.error("Problem serializing palette! Bailing out!! %s", e)
-        return None
+    Serialize obj to JSON.
 
+    Minified JSON (indent None) is produced by orjson if installed.
 
-def write_palette(
-    palette: str,
+    :param obj: the object to serialize
+    :param indent: int, indentation of the JSON, None for minified JSON
+
+    :returns: str, the JSON string
+
+    :raises TypeError: if obj can't be serialized
+    """
+    if indent is not None:
+        return json.dumps(obj, indent=indent)
+    if orjson:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:  # e.g. integers exceeding 64 bit, try again below
+            pass
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def _palette_writer(raw: typing.BinaryIO, filename: str, compression=None):
+    """
+    Wrap a binary file into a, possibly compressing, text writer.
+
+    :param raw: binary file object, which is not closed by the writer
+    :param filename: str, the name stored in the gzip header
+    :param compression: str, one of PALETTE_COMPRESSIONS or None
+
+    :returns: text file object
+    """
+    stream: Any = raw
+    if compression == "gzip":
+        # no timestamp, thus the same palette always produces the same file
+        name = os.path.basename(filename)
+        stream = gzip.GzipFile(filename=name, mode="wb", fileobj=raw, mtime=0)
+    elif compression == "zstd":
+        stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+    elif compression:
+        raise ValueError(f"Unknown compression {compression}")
+    return io.TextIOWrapper(stream, encoding="utf-8")
+
+
+@profiling.profiled("serialization")
+def write_palette_stream(
+    palette: dict,
     output_filename: str,
-):
+    indent: Union[int, None] = 4,
+    compression: Union[str, None] = None,
+) -> bool:
     """
-    Write palette to the output file specified.
+    Write a palette to the output file, serializing one node at a time.
+
+    The output is identical to json.dumps(palette, indent=indent), but the JSON
+    string of the whole palette is never held in memory. With indent None minified
+    JSON is written. The palette is written to a temporary file first, thus an
+    existing file is only replaced once the new one is complete.
 
     Parameters
     ----------
-    palette : str
+    palette : dict
         The palette to be written
     output_filename : str
         The name of the output file.
+    indent : int or None
+        Indentation of the JSON, None writes minified JSON.
+    compression : str or None
+        One of PALETTE_COMPRESSIONS, None writes plain JSON.
+
+    Returns
+    -------
+    bool
+        True if the palette was written.
     """
+    pad = " " * indent if indent is not None else ""
+    newline = "\n" if indent is not None else ""
+    sep = f",{newline}"
+
+    def dumps(obj: Any, level: int) -> str:
+        text = json_dumps(obj, indent=indent)
+        return text.replace("\n", "\n" + pad * level) if indent is not None else text
+
+    if compression == "zstd" and not zstandard:
+        logger.error("Writing %s requires the zstandard package", output_filename)
+        return False
+    tmp_name = f"{output_filename}.{os.getpid()}.tmp"
     try:
-        with open(output_filename, "w", encoding="utf-8") as outfile:
-            outfile.write(palette)
-    except Exception:
+        with open(tmp_name, "wb") as raw, _palette_writer(
+            raw, output_filename, compression
+        ) as outfile:
+            outfile.write("{" + newline)
+            for i, (key, value) in enumerate(palette.items()):
+                key_sep = ": " if indent is not None else ":"
+                outfile.write(f"{sep if i else ''}{pad}{json.dumps(key)}{key_sep}")
+                if key != "nodeDataArray" or not value:
+                    outfile.write(dumps(value, 1))
+                    continue
+                outfile.write("[" + newline)
+                for j, node in enumerate(value):
+                    outfile.write(f"{sep if j else ''}{pad * 2}{dumps(node, 2)}")
+                outfile.write(f"{newline}{pad}]")
+            outfile.write(newline + "}")
+        os.replace(tmp_name, output_filename)
+    except (TypeError, ValueError) as e:
+        logger.error("Problem serializing palette! Bailing out!! %s", e)
+        os.remove(tmp_name)
+        return False
+    except OSError:
         logger.critical("Palette not created %s", output_filename)
-    return None
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        return False
+    return True
 
 
 def get_field_by_name(name: str, node, value_key: str = "") -> dict:
@@ -535,6 +694,29 @@ def get_field_by_name(name: str, node, value_key: str = "") -> dict:
         return {}
 
 
+def _blockdag_vertices(nodes: list) -> dict:
+    """
+    Return the BlockDAG vertices of nodes, keyed by their index.
+
+    BlockDAG hashes the repr of the values, thus they are normalized to what is
+    written to the palette to get the same hashes for nodes read back from JSON.
+
+    :param nodes: list, the nodes
+
+    :returns: dict, the data fields of the nodes as written to the palette
+    """
+    return {
+        index: json.loads(
+            json.dumps(
+                {k: v for k, v in node.items() if k in BLOCKDAG_DATA_FIELDS},
+                default=repr,
+            )
+        )
+        for index, node in enumerate(nodes)
+    }
+
+
+@profiling.profiled("hashing")
 def add_repro_hashes(nodes_tuple: tuple) -> tuple:
     """
     Add data hashes to the nodes based on the block_dag.
@@ -551,46 +733,231 @@ def add_repro_hashes(nodes_tuple: tuple) -> tuple:
     """
     nodes, module_doc = nodes_tuple
     # logger.debug(">>>>> %s", module_doc)
-    vertices = {index: value for index, value in enumerate(nodes)}
-    block_dag = build_block_dag(vertices, [], data_fields=BLOCKDAG_DATA_FIELDS)
+    from blockdag import build_block_dag  # pylint: disable=import-outside-toplevel
+
+    block_dag = build_block_dag(
+        _blockdag_vertices(nodes), [], data_fields=BLOCKDAG_DATA_FIELDS
+    )
     for i, node in enumerate(nodes):
         node["dataHash"] = block_dag[i]["data_hash"]
     return block_dag["signature"], module_doc, nodes
 
 
-def prepare_and_write_palette(nodes: list, output_filename: str, module_doc: str = ""):
+@profiling.profiled("hashing")
+def add_data_hashes(nodes: list) -> list:
+    """
+    Add the BlockDAG data hashes to a batch of nodes, see add_repro_hashes.
+
+    :param nodes: list, the nodes, updated in place
+
+    :returns: list of str, the block hashes of the nodes, see graph_signature
+    """
+    from blockdag import build_block_dag  # pylint: disable=import-outside-toplevel
+
+    block_dag = build_block_dag(
+        _blockdag_vertices(nodes), [], data_fields=BLOCKDAG_DATA_FIELDS
+    )
+    for i, node in enumerate(nodes):
+        node["dataHash"] = block_dag[i]["data_hash"]
+    return [block_dag[i]["hash"] for i in range(len(nodes))]
+
+
+def graph_signature(hashes: list) -> str:
+    """
+    Return the BlockDAG signature of a palette from the block hashes of its nodes.
+
+    The nodes of a palette are not linked, thus all of them are leaves and the
+    signature is computed by the same BlockDAG function build_block_dag uses for
+    the leaves of all nodes at once. These are internals of blockdag, thus its
+    version is pinned in requirements.txt.
+
+    :param hashes: list of str, the block hashes returned by add_data_hashes
+
+    :returns: str, the signature
+    """
+    # pylint: disable=import-outside-toplevel,protected-access
+    from blockdag import blockdag
+
+    return blockdag._generate_graph_signature(
+        [{"hash": h} for h in hashes], blockdag._default_hash
+    )
+
+
+def read_palette_model(filename: str, size: int = 1024**2) -> Union[dict, None]:
+    """
+    Read the modelData of an existing palette without reading its nodes.
+
+    The palettes written by this package start with the modelData, thus only the
+    beginning of the file is read.
+
+    :param filename: str, the filename of the palette
+    :param size: int, the number of (decompressed) bytes read
+
+    :returns: dict, the modelData or None if not found
+    """
+    try:
+        with open(filename, "rb") as raw:
+            magic = raw.read(4)
+            raw.seek(0)
+            if magic.startswith(MAGIC_NUMBERS["gzip"]):
+                content = gzip.GzipFile(fileobj=raw).read(size)
+            elif magic.startswith(MAGIC_NUMBERS["zstd"]):
+                if not zstandard:
+                    return None
+                try:
+                    content = zstandard.ZstdDecompressor().stream_reader(raw).read(size)
+                except zstandard.ZstdError as e:
+                    raise ValueError(e) from e
+            else:
+                content = raw.read(size)
+        text = content.decode("utf-8", errors="ignore")
+        start = text.index('"modelData"')
+        start = text.index("{", start)
+        model, _ = json.JSONDecoder().raw_decode(text, start)
+    except (OSError, ValueError, EOFError):
+        return None
+    return model if isinstance(model, dict) else None
+
+
+def read_palette(filename: str) -> Union[dict, None]:
+    """
+    Read an existing palette file.
+
+    Plain, gzip and zstd compressed palettes are detected automatically.
+
+    :param filename: str, the filename of the palette
+
+    :returns: dict, the palette or None if the file does not exist or is invalid
+    """
+    try:
+        with open(filename, "rb") as pfile:
+            content = pfile.read()
+        if content.startswith(MAGIC_NUMBERS["gzip"]):
+            content = gzip.decompress(content)
+        elif content.startswith(MAGIC_NUMBERS["zstd"]):
+            if not zstandard:
+                logger.error("Reading %s requires the zstandard package", filename)
+                return None
+            try:
+                content = zstandard.ZstdDecompressor().decompressobj().decompress(content)
+            except zstandard.ZstdError as e:
+                raise ValueError(e) from e
+        palette = orjson.loads(content) if orjson else json.loads(content)
+    except (OSError, ValueError, EOFError):
+        return None
+    if not isinstance(palette, dict) or "nodeDataArray" not in palette:
+        logger.warning("%s does not look like a palette, ignoring it", filename)
+        return None
+    return palette
+
+
+def reuse_unchanged_nodes(nodes: list, palette: dict) -> int:
+    """
+    Replace the nodes which did not change by their version in an existing palette.
+
+    A node is unchanged if it has the same name and dataHash as a node of the
+    existing palette and all other entries, apart from the node id, are equal.
+    Reusing the existing node keeps its id stable across regenerations.
+
+    :param nodes: list, the hashed nodes of the new palette, updated in place
+    :param palette: dict, the existing palette
+
+    :returns: int, the number of nodes reused
+    """
+    old_nodes = {
+        (n.get("name"), n.get("dataHash")): n for n in palette.get("nodeDataArray", [])
+    }
+    reused = 0
+    for i, node in enumerate(nodes):
+        old_node = old_nodes.get((node.get("name"), node.get("dataHash")))
+        if old_node is None:
+            continue
+        if {k: v for k, v in old_node.items() if k != "id"} == {
+            k: v for k, v in node.items() if k != "id"
+        }:
+            nodes[i] = old_node
+            reused += 1
+    return reused
+
+
+def prepare_and_write_palette(
+    nodes: list,
+    output_filename: str,
+    module_doc: str = "",
+    incremental: bool = False,
+    indent: Union[int, None] = 4,
+    compression: Union[str, None] = None,
+):
     """
     Prepare and write the palette in JSON format.
 
     :param nodes: the list of nodes
     :param output_filename: the filename of the output
     :param module_doc: module level docstring
+    :param incremental: bool, reuse the unchanged nodes of an existing palette and
+        don't re-write it if its BlockDAG signature and nodes are unchanged.
+    :param indent: int, indentation of the JSON, None writes minified JSON
+    :param compression: str, one of PALETTE_COMPRESSIONS, None writes plain JSON
 
     :returns: int, 1 if successful, 0 if not
     """
     # add signature for whole palette using BlockDAG
     GITREPO = os.environ.get("GIT_REPO")
     VERSION = os.environ.get("PROJECT_VERSION")
+    # the field ids are part of the hashed data, thus they are assigned first
+    ids.ID_GENERATOR.assign_ids(nodes)
     nodes_doc = add_repro_hashes((nodes, module_doc))
+    if incremental:
+        old_palette = read_palette(output_filename)
+        if old_palette:
+            reused = reuse_unchanged_nodes(nodes_doc[2], old_palette)
+            old_model = old_palette.get("modelData", {})
+            if (
+                old_model.get("signature") == nodes_doc[0]
+                and old_model.get("detailedDescription") == (module_doc or "").strip()
+                and reused == len(nodes) == len(old_palette["nodeDataArray"])
+            ):
+                logger.info("Palette %s is unchanged, not re-written", output_filename)
+                return 1
+            logger.info(
+                "Re-writing %s, reused %d of %d components",
+                output_filename,
+                reused,
+                len(nodes),
+            )
 
     # write the output json file
-    palette = nodes2palette(
-        output_filename,
-        nodes_doc,
-        GITREPO,
-        VERSION,
+    signature, module_doc, nodes = nodes_doc
+    palette = constructPalette(
+        module_doc=module_doc,
+        output_filename=output_filename,
+        nodes=nodes,
+        git_repo=GITREPO,
+        version=VERSION,
+        signature=signature,
     )
-    if palette:
-        _ = write_palette(
-            palette,
-            output_filename,
-        )
+    if write_palette_stream(
+        palette, output_filename, indent=indent, compression=compression
+    ):
         logger.debug("Wrote %s components to %s", len(nodes), output_filename)
         return 1
     return 0
 
 
-def get_submodules(module):
+def _find_spec(name: str):
+    """Return the module spec of name without importing it, None if not found."""
+    try:
+        return importlib.util.find_spec(name)
+    except (ImportError, ValueError, AttributeError):
+        return None
+
+
+def get_submodules(
+    module,
+    check_import: bool = True,
+    lazy: bool = False,
+    prune: Union[typing.Callable, None] = None,
+):
     """
     Retrieve names of sub-modules using iter_modules.
 
@@ -598,6 +965,13 @@ def get_submodules(module):
     item is a flag ispkg indicating that.
 
     :param: module: module object to be searched
+    :param: check_import: bool, skip sub-packages which can't be imported. If False
+        the sub-packages are not imported here.
+    :param: lazy: bool, find the sub-modules without importing them, using the
+        attributes already set and the module specs (see importlib.util.find_spec).
+        Names which can't be resolved this way are imported.
+    :param: prune: callable, called with the name of a sub-module before it is
+        imported, returns True if the sub-module is skipped
 
     :returns: iterator[tuple]
     """
@@ -606,6 +980,14 @@ def get_submodules(module):
     module_name = get_mod_name(module)
     if hasattr(module, "__all__") and len(module.__all__) > 0:
         for mod in module.__all__:
+            submod = f"{module_name}.{mod}"
+            if lazy and mod not in vars(module) and _find_spec(submod):
+                # e.g. a sub-module only imported on first access
+                if prune and prune(submod):
+                    continue
+                logger.debug("Found sub-module %s without importing it", submod)
+                submods.append(submod)
+                continue
             try:
                 type_mod = getattr(module, mod)
             except AttributeError:
@@ -625,9 +1007,8 @@ def get_submodules(module):
                     dict,
                     list,
                     tuple,
-                    numpy.ndarray,
                 ),
-            ):
+            ) or is_ndarray(type_mod):
                 # just store module level variables for now
                 value = getattr(module, mod)
                 field = initializeField(
@@ -640,7 +1021,19 @@ def get_submodules(module):
                 )
                 module_vars[mod] = field
                 continue
-            submod = f"{module_name}.{mod}"
+            if lazy and mod in vars(module):
+                # already imported, there is nothing to find out by importing it
+                if inspect.ismodule(type_mod) and get_mod_name(type_mod) != module_name:
+                    if not (prune and prune(submod)):
+                        submods.append(submod)
+                continue
+            if (
+                prune
+                and (inspect.ismodule(type_mod) or _find_spec(submod))
+                and prune(submod)
+            ):
+                # only sub-modules are pruned here, members are pruned by get_members
+                continue
             logger.debug("Trying to import %s", submod)
             traverse = submod not in submods
             m = import_using_name(f"{module_name}.{mod}", traverse=traverse)
@@ -661,8 +1054,11 @@ def get_submodules(module):
                 "src",
                 "setup_package",
             ]:
+                if prune and prune(f"{module_name}.{pkg.name}"):
+                    continue
                 try:
-                    mod = import_using_name(f"{module_name}.{pkg.name}")
+                    if check_import and not lazy:
+                        mod = import_using_name(f"{module_name}.{pkg.name}")
                 except ImportError:
                     logger.warning(
                         "Unable to import sub-package %s from %s", pkg.name, module_name
@@ -684,7 +1080,8 @@ def get_submodules(module):
             ):
                 logger.debug("Trying to import submodule: %s", get_mod_name(m[1]))
                 submods.append(get_mod_name(getattr(module, m[0])))
-    return submods, iter(module_vars)
+    # the sub-modules in __all__ are usually also found by iter_modules
+    return list(dict.fromkeys(submods)), iter(module_vars)
 
 
 def _get_loaded_module(mod_name: str) -> Union[None, Any]:
@@ -795,10 +1192,76 @@ def _import_module(
     return mod
 
 
+class ResolutionCache:
+    """
+    Memo of the objects resolved by import_using_name, keyed by the dotted name.
+
+    Failed resolutions are remembered as well, since the same unknown names (e.g.
+    type strings) are tried over and over. All entries are dropped once the set of
+    loaded modules changes, because an import can make a name resolvable or
+    resolve it differently.
+    """
+
+    def __init__(self):
+        """Initialize an empty cache."""
+        self.entries: dict = {}
+        self.generation = len(sys.modules)
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def lookup(self, key: tuple) -> tuple:
+        """
+        Look up a resolution.
+
+        :param key: tuple, (dotted name, traverse)
+
+        :returns: tuple, (True, object or None) if cached, else (False, None)
+        """
+        if len(sys.modules) != self.generation:
+            if self.entries:
+                self.stats["invalidations"] += 1
+            self.entries = {}
+            self.generation = len(sys.modules)
+        if key in self.entries:
+            self.stats["hits"] += 1
+            return True, self.entries[key]
+        self.stats["misses"] += 1
+        return False, None
+
+    def store(self, key: tuple, obj: Any):
+        """
+        Store a resolution, None for a failed one.
+
+        :param key: tuple, (dotted name, traverse)
+        :param obj: the resolved object or None
+        """
+        if len(sys.modules) != self.generation:
+            # the resolution itself imported modules
+            self.entries = {}
+            self.generation = len(sys.modules)
+        self.entries[key] = obj
+
+    def summary(self) -> str:
+        """Return a one line summary of the cache statistics."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        rate = 100.0 * self.stats["hits"] / lookups if lookups else 0.0
+        return (
+            f"Name resolution cache: {self.stats['hits']} hits, "
+            f"{self.stats['misses']} misses ({rate:.1f}% hit rate), "
+            f"{self.stats['invalidations']} invalidations"
+        )
+
+
+RESOLUTION_CACHE = ResolutionCache()
+
+
+@profiling.profiled("import")
 def import_using_name(mod_name: str, traverse: bool = False, err_log=True):
     """
     Import a module using its name.
 
+    The results, including failures, are memoized in RESOLUTION_CACHE until
+    sys.modules changes.
+
     Attempts to import a module, class, or function by its name. If direct import is
     not possible, it tries to traverse up the hierarchy. This function can import
     modules, classes, functions, as well as already loaded functions and builtins.
@@ -820,11 +1283,33 @@ def import_using_name(mod_name: str, traverse: bool = False, err_log=True):
     object or None
         The imported module, class, function, or None if not found.
     """
+    key = (mod_name, traverse)
+    cached, mod = RESOLUTION_CACHE.lookup(key)
+    if cached:
+        return mod
+    mod = _import_using_name(mod_name, traverse=traverse, err_log=err_log)
+    # numpy may have been imported by the module
+    load_numpy_types()
+    RESOLUTION_CACHE.store(key, mod)
+    return mod
+
+
+def _import_using_name(mod_name: str, traverse: bool = False, err_log=True):
+    """
+    Uncached implementation of import_using_name.
+
+    :param mod_name: str, the name of the module, class, or function
+    :param traverse: bool, follow the hierarchy even if the module is already loaded
+    :param err_log: bool, log import errors
+
+    :returns: the imported object or None
+    """
     logger.debug("Trying to import %s", mod_name)
     if not re.match("^[_A-Z,a-z]", mod_name):
         return None
-    if _get_loaded_module(mod_name):
-        return _get_loaded_module(mod_name)
+    loaded = _get_loaded_module(mod_name)
+    if loaded:
+        return loaded
     parts = mod_name.split(".")
     exists = ".".join(parts[:-1]) in sys.modules if not traverse else False
     mod_version = "Unknown"
@@ -944,14 +1429,14 @@ def initializeField(
     fieldValue["id"] = get_next_id()
     fieldValue["encoding"] = ""
     fieldValue["name"] = name
-    if isinstance(value, numpy.ndarray):
+    if is_ndarray(value):
         try:
             fieldValue["value"] = value if len(value) > 0 else None  # type: ignore
         except Exception:
             fieldValue["value"] = None  # type: ignore
     else:
         fieldValue["value"] = value if value else None  # type: ignore
-    if isinstance(defaultValue, numpy.ndarray):
+    if is_ndarray(defaultValue):
         try:
             fieldValue["defaultValue"] = (
                 defaultValue
@@ -1042,7 +1527,7 @@ def get_value_type_from_default(default):
             # this is a complex type
             logger.debug("Object not JSON serializable: %s", value)
             ptype = value = type(value).__name__
-    if repr(default) == "nan" and numpy.isnan(default):
+    if repr(default) == "nan" and math.isnan(default):
         value = None
     param_desc["value"] = value
     param_desc["type"] = typeFix(ptype)
@@ -1093,6 +1578,7 @@ def identify_field_type(field: dict, value: Any, param_desc: dict, dd_p: dict) -
     return CVALUE_TYPES["NoneType"]
 
 
+@profiling.profiled("populateFields")
 def populateFields(sig: Any, dd) -> dict:
     """
     Use signature and docstring to populate field definitions for function parameters.
@@ -1141,12 +1627,12 @@ def populateFields(sig: Any, dd) -> dict:
         if dd and p in dd.params:
             logger.debug("Final desc of parameter %s: %s", p, dd.params[p]["desc"])
 
-        if isinstance(field[p]["value"], numpy.ndarray):
+        if is_ndarray(field[p]["value"]):
             try:
                 field[p]["value"] = field[p]["defaultValue"] = field[p]["value"].tolist()
             except NotImplementedError:
                 field[p]["value"] = []
-        if repr(field[p]["value"]) == "nan" and numpy.isnan(field[p]["value"]):
+        if repr(field[p]["value"]) == "nan" and math.isnan(field[p]["value"]):
             field[p]["value"] = None
         if p != "base_name":
             fields.update(field)
@@ -0,0 +1,170 @@
+"""
+Generate synthetic Python packages to benchmark the scaling of palette generation.
+
+The size of a package is given by the number of modules, functions and classes
+per module, methods per class and parameters per function or method. The
+docstrings cycle through the formats in DetailedDescription.KNOWN_FORMATS, thus
+all docstring parsers are exercised. The same arguments always produce the
+same package.
+
+Run `python -m dlg_paletteGen.synthetic -h` to write a package to a directory.
+"""
+
+import argparse
+import os
+import textwrap
+
+from dlg_paletteGen.classes import DetailedDescription
+
+from . import logger
+
+DOCSTRING_STYLES = tuple(DetailedDescription.KNOWN_FORMATS)
+
+# annotation and default value of the generated parameters
+PARAM_TYPES = [
+    ("int", "1"),
+    ("float", "0.5"),
+    ("str", "'value'"),
+    ("bool", "True"),
+    ("list", "None"),
+]
+
+
+def docstring(style: str, summary: str, params: list, returns: str = "int") -> str:
+    """
+    Return a docstring in one of the DOCSTRING_STYLES.
+
+    :param style: str, one of DOCSTRING_STYLES
+    :param summary: str, the first line of the docstring
+    :param params: list of (name, type) tuples of the parameters
+    :param returns: str, the type of the return value
+
+    :returns: str, the docstring without the quotes and indentation
+    """
+    lines = [summary, ""]
+    if style == "rEST":
+        lines += [f":param {name}: the {name} of type {ptype}" for name, ptype in params]
+        lines += [f":returns: a value of type {returns}"]
+    elif style == "Google":
+        lines += ["Args:"]
+        lines += [f"    {name} ({ptype}): the {name}" for name, ptype in params]
+        lines += ["", "Returns:", f"    {returns}: the result"]
+    elif style == "Numpy":
+        lines += ["Parameters", "----------"]
+        for name, ptype in params:
+            lines += [f"{name} : {ptype}", f"    the {name}"]
+        lines += ["", "Returns", "-------", returns, "    the result"]
+    elif style == "casa":
+        lines = [f"{summary.split()[0]} ---- {summary}", ""]
+        lines += ["--------- parameter descriptions " + "-" * 45, ""]
+        for name, ptype in params:
+            lines += [f"{name:22s}the {name} of type {ptype}"]
+        lines += ["", "--------- examples " + "-" * 59, ""]
+    else:
+        raise ValueError(f"Unknown docstring style '{style}', use {DOCSTRING_STYLES}")
+    return "\n".join(lines)
+
+
+def _function(name: str, nparams: int, style: str, method: bool = False) -> str:
+    """Return the source code of a documented function or method."""
+    params = [(f"p{i}", PARAM_TYPES[i % len(PARAM_TYPES)][0]) for i in range(nparams)]
+    signature = ["self"] if method else []
+    signature += [
+        f"{pname}: {ptype} = {PARAM_TYPES[i % len(PARAM_TYPES)][1]}"
+        for i, (pname, ptype) in enumerate(params)
+    ]
+    result = " + ".join(["0"] + [f"len(str({pname}))" for pname, _ in params])
+    if name == "__init__":
+        header, body = f"def {name}({', '.join(signature)}):", f"self.value = {result}"
+    else:
+        header, body = f"def {name}({', '.join(signature)}) -> int:", f"return {result}"
+    doc = docstring(style, f"{name} computes a synthetic result.", params)
+    return "\n".join([header, textwrap.indent(f'"""\n{doc}\n"""', "    "), f"    {body}"])
+
+
+def _class(name: str, methods: int, nparams: int, style_offset: int) -> str:
+    """Return the source code of a documented class with __init__ and methods."""
+    parts = [f"class {name}:", f'    """{name} is a synthetic class."""']
+    for m, method in enumerate(["__init__"] + [f"method_{i}" for i in range(methods)]):
+        style = DOCSTRING_STYLES[(style_offset + m) % len(DOCSTRING_STYLES)]
+        parts += ["", textwrap.indent(_function(method, nparams, style, True), "    ")]
+    return "\n".join(parts)
+
+
+def generate_package(
+    directory: str,
+    name: str = "synthetic_package",
+    modules: int = 10,
+    classes: int = 5,
+    methods: int = 5,
+    params: int = 3,
+    functions: int = 5,
+) -> tuple:
+    """
+    Write a synthetic package to directory.
+
+    :param directory: str, the directory the package is written to
+    :param name: str, the name of the package
+    :param modules: int, number of modules of the package
+    :param classes: int, number of classes per module
+    :param methods: int, number of methods per class, not counting __init__
+    :param params: int, number of parameters per function or method
+    :param functions: int, number of functions per module
+
+    :returns: tuple, the path of the package and the number of functions and
+        methods (including __init__) it contains
+    """
+    path = os.path.join(directory, name)
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "__init__.py"), "w", encoding="utf-8") as f:
+        f.write(f'"""{name} is a synthetic package with {modules} modules."""\n')
+    for mod in range(modules):
+        parts = [f'"""Synthetic module {mod} of {name}."""']
+        for i in range(functions):
+            style = DOCSTRING_STYLES[(mod + i) % len(DOCSTRING_STYLES)]
+            parts.append(_function(f"function_{i}", params, style))
+        for i in range(classes):
+            parts.append(_class(f"Class{mod}_{i}", methods, params, mod + i))
+        with open(os.path.join(path, f"module_{mod}.py"), "w", encoding="utf-8") as f:
+            f.write("\n\n\n".join(parts) + "\n")
+    members = modules * (functions + classes * (methods + 1))
+    logger.info("Wrote synthetic package %s with %d members", path, members)
+    return path, members
+
+
+def main(args=None):  # pragma: no cover
+    """Write a synthetic package using the command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="python -m dlg_paletteGen.synthetic",
+        description="Write a synthetic Python package to benchmark palette generation",
+    )
+    parser.add_argument("directory", help="directory the package is written to")
+    parser.add_argument(
+        "--name",
+        help="name of the package (default: %(default)s)",
+        default="synthetic_package",
+    )
+    for option, default, help_text in (
+        ("--modules", 10, "number of modules"),
+        ("--functions", 5, "number of functions per module"),
+        ("--classes", 5, "number of classes per module"),
+        ("--methods", 5, "number of methods per class"),
+        ("--params", 3, "number of parameters per function or method"),
+    ):
+        parser.add_argument(
+            option, help=f"{help_text} (default: %(default)s)", type=int, default=default
+        )
+    parsed = parser.parse_args(args)
+    generate_package(
+        parsed.directory,
+        name=parsed.name,
+        modules=parsed.modules,
+        classes=parsed.classes,
+        methods=parsed.methods,
+        params=parsed.params,
+        functions=parsed.functions,
+    )
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,319 @@
+"""
+Breadth-first traversal of the module graph of a package (module_hook).
+
+Packages which re-export their sub-modules, like numpy, scipy and astropy,
+reach the same modules along many paths. The traversal keeps a canonical
+visited set, thus every module is extracted once, and counts the duplicate
+visits avoided. The depth of the traversal and the number of modules extracted
+can be limited (--max-depth, --max-modules), the modules skipped due to the
+limits are reported.
+
+The --include and --exclude filters prune the modules before they are imported
+and the members before they are inspected, see NameFilter.
+
+In lazy mode (--lazy) the sub-modules are found without importing them, see
+support_functions.get_submodules, thus every module is only imported when it is
+extracted and the modules never extracted are never imported.
+"""
+
+import collections
+import fnmatch
+import re
+from typing import Callable, Union
+
+from . import logger
+
+
+class TraversalStats:
+    """Counters of the module traversals of a run."""
+
+    KEYS = (
+        "modules",
+        "duplicates",
+        "depth_limited",
+        "over_budget",
+        "modules_pruned",
+        "members_pruned",
+    )
+
+    def __init__(self):
+        """Initialize the counters."""
+        self.counts = dict.fromkeys(self.KEYS, 0)
+
+    def snapshot(self) -> dict:
+        """Return a copy of the counters."""
+        return dict(self.counts)
+
+    def since(self, before: dict) -> dict:
+        """Return the counts added since the snapshot before was taken."""
+        return {k: v - before[k] for k, v in self.counts.items()}
+
+    def merge(self, counts: Union[dict, None]):
+        """Add the counts of another process, see since."""
+        for k, v in (counts or {}).items():
+            self.counts[k] += v
+
+    def summary(self) -> str:
+        """Return a one-line summary of the counters."""
+        summary = (
+            f"Module traversal: {self.counts['modules']} modules extracted, "
+            f"{self.counts['duplicates']} duplicate visits avoided, "
+            f"{self.counts['depth_limited']} modules beyond the depth limit and "
+            f"{self.counts['over_budget']} beyond the module budget skipped"
+        )
+        if self.counts["modules_pruned"] or self.counts["members_pruned"]:
+            summary += (
+                f", {self.counts['modules_pruned']} modules and "
+                f"{self.counts['members_pruned']} members pruned by the filters"
+            )
+        return summary
+
+
+class NameFilter:
+    """
+    Include and exclude filters of dotted module and member names.
+
+    A pattern is a glob, e.g. '*.tests', or a regular expression prefixed by
+    're:', e.g. 're:.*\\.(qt|tk)$'. A name matches a pattern if the name
+    itself or one of its parents matches, thus excluding a package excludes
+    everything below it.
+    """
+
+    def __init__(
+        self, include: Union[list, tuple] = (), exclude: Union[list, tuple] = ()
+    ):
+        """
+        Initialize the filter.
+
+        :param include: list of str, only the names matching one of these patterns
+            are kept, all names are kept if empty
+        :param exclude: list of str, the names matching one of these patterns are
+            pruned, even if included
+        """
+        self.include = list(include)
+        self.exclude = list(exclude)
+        for pattern in self.include + self.exclude:
+            if pattern.startswith("re:"):
+                try:
+                    re.compile(pattern[3:])
+                except re.error as e:
+                    raise ValueError(f"Invalid filter pattern {pattern}: {e}") from e
+
+    def __bool__(self) -> bool:
+        """Return True if any pattern is set."""
+        return bool(self.include or self.exclude)
+
+    def patterns(self) -> list:
+        """Return the patterns, e.g. for cache keys."""
+        return [self.include, self.exclude]
+
+    @staticmethod
+    def _match(name: str, patterns: list) -> bool:
+        parts = name.split(".")
+        prefixes = [".".join(parts[: i + 1]) for i in range(len(parts))]
+        for pattern in patterns:
+            if pattern.startswith("re:"):
+                regex = re.compile(pattern[3:])
+                if any(regex.fullmatch(p) for p in prefixes):
+                    return True
+            elif any(fnmatch.fnmatchcase(p, pattern) for p in prefixes):
+                return True
+        return False
+
+    @staticmethod
+    def _may_contain(name: str, pattern: str) -> bool:
+        """Check whether sub-modules of name can match pattern."""
+        if pattern.startswith("re:"):
+            return True  # unknown, thus not pruned
+        depth = name.count(".") + 1
+        return fnmatch.fnmatchcase(name, ".".join(pattern.split(".")[:depth]))
+
+    def module(self, name: str) -> bool:
+        """
+        Check whether a module is traversed.
+
+        Unless excluded, a module not included is still traversed if its
+        sub-modules may be included, but its members are pruned (see member).
+
+        :param name: str, the dotted name of the module
+
+        :returns: bool, False if the module is pruned
+        """
+        if self._match(name, self.exclude):
+            return False
+        return (
+            not self.include
+            or self._match(name, self.include)
+            or any(self._may_contain(name, p) for p in self.include)
+        )
+
+    def member(self, name: str) -> bool:
+        """
+        Check whether a member is inspected.
+
+        :param name: str, the dotted name of the member, including its module
+
+        :returns: bool, False if the member is pruned
+        """
+        if self._match(name, self.exclude):
+            return False
+        return not self.include or self._match(name, self.include)
+
+
+STATS = TraversalStats()
+FILTER = NameFilter()
+MAX_DEPTH: Union[int, None] = None
+MAX_MODULES: Union[int, None] = None
+LAZY = False
+
+
+def configure_traversal(
+    max_depth: Union[int, None] = None,
+    max_modules: Union[int, None] = None,
+    lazy: bool = False,
+    include: Union[list, tuple] = (),
+    exclude: Union[list, tuple] = (),
+):
+    """
+    Set the limits of the module traversals.
+
+    :param max_depth: int, the maximum depth of the sub-modules extracted below
+        the module requested, None for no limit
+    :param max_modules: int, the maximum number of modules extracted per
+        traversal, None for no limit
+    :param lazy: bool, find the sub-modules without importing them
+    :param include: list of str, the patterns of the names kept, see NameFilter
+    :param exclude: list of str, the patterns of the names pruned, see NameFilter
+    """
+    global MAX_DEPTH, MAX_MODULES, LAZY, FILTER  # pylint: disable=global-statement
+    MAX_DEPTH, MAX_MODULES, LAZY = max_depth, max_modules, lazy
+    FILTER = NameFilter(include, exclude)
+    if FILTER:
+        logger.info("Filtering the names, include: %s exclude: %s", include, exclude)
+    if lazy:
+        logger.info("Lazy sub-module discovery ON")
+    if max_depth is not None or max_modules is not None:
+        logger.info(
+            "Limiting the module traversal to depth %s and %s modules",
+            max_depth,
+            max_modules,
+        )
+
+
+def prune_module(name: str) -> bool:
+    """
+    Check whether a sub-module is pruned by the filters, see get_submodules.
+
+    :param name: str, the dotted name of the sub-module
+
+    :returns: bool, True if the sub-module is pruned
+    """
+    if FILTER and not FILTER.module(name):
+        STATS.counts["modules_pruned"] += 1
+        return True
+    return False
+
+
+class ModuleTraversal:
+    """A breadth-first traversal of the sub-modules of a module."""
+
+    def __init__(
+        self,
+        max_depth: Union[int, None] = None,
+        max_modules: Union[int, None] = None,
+        stats: TraversalStats = STATS,
+        name_filter: Union[NameFilter, None] = None,
+    ):
+        """
+        Initialize the traversal with an empty visited set.
+
+        :param max_depth: int, the maximum depth, None for no limit
+        :param max_modules: int, the maximum number of modules, None for no limit
+        :param stats: TraversalStats, the counters updated by the traversal
+        :param name_filter: NameFilter, the filter of the sub-modules, the root is
+            never pruned
+        """
+        self.max_depth = max_depth
+        self.max_modules = max_modules
+        self.stats = stats
+        self.name_filter = name_filter or NameFilter()
+        self.visited: set = set()
+
+    def visit(self, name: str) -> bool:
+        """
+        Mark a module as visited.
+
+        :param name: str, the name of the module, e.g. the canonical name of a
+            module reached by an alias
+
+        :returns: bool, False if the module was visited before
+        """
+        if name in self.visited:
+            self.stats.counts["duplicates"] += 1
+            return False
+        self.visited.add(name)
+        return True
+
+    def run(self, root: str, extract: Callable, recursive: bool = True):
+        """
+        Extract root and, if recursive, its sub-modules breadth-first.
+
+        :param root: str, the import path of the module
+        :param extract: callable, called with the name of a module and this
+            traversal, returns the names of its sub-modules and its result, or
+            None if the module failed. A module which turns out to be an alias of
+            a visited one is marked by calling visit with its canonical name.
+        :param recursive: bool, extract the sub-modules
+
+        :returns: the result of extract for root, None if it failed
+        """
+        queue = collections.deque([(root, 0)])
+        root_result = None
+        extracted = 0
+        while queue:
+            name, depth = queue.popleft()
+            if not self.visit(name):
+                continue
+            if self.max_modules is not None and extracted >= self.max_modules:
+                skipped = 1 + len({n for n, _ in queue if n not in self.visited})
+                self.stats.counts["over_budget"] += skipped
+                logger.warning(
+                    "Module budget of %d reached, skipping %d modules below %s",
+                    self.max_modules,
+                    skipped,
+                    root,
+                )
+                break
+            duplicates = self.stats.counts["duplicates"]
+            outcome = extract(name, self)
+            if self.stats.counts["duplicates"] == duplicates:  # not an alias
+                extracted += 1
+                self.stats.counts["modules"] += 1
+            if outcome is None:
+                if name == root:
+                    return None
+                continue
+            sub_modules, result = outcome
+            if name == root:
+                root_result = result
+            if not recursive or not sub_modules:
+                continue
+            new = [s for s in sub_modules if s not in self.visited]
+            self.stats.counts["duplicates"] += len(sub_modules) - len(new)
+            if self.name_filter:
+                kept = [s for s in new if self.name_filter.module(s)]
+                pruned = set(new) - set(kept)
+                self.stats.counts["modules_pruned"] += len(pruned)
+                self.visited |= pruned  # counted once
+                new = kept
+            if self.max_depth is not None and depth >= self.max_depth:
+                self.stats.counts["depth_limited"] += len(new)
+                logger.info(
+                    "Not extracting %d sub-modules of %s beyond depth %d",
+                    len(new),
+                    name,
+                    self.max_depth,
+                )
+                continue
+            queue.extend((s, depth + 1) for s in new)
+        return root_result
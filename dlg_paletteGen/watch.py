@@ -0,0 +1,224 @@
+"""
+Regenerate palettes when their sources change (--watch).
+
+The sources are polled for changes, thus no additional dependency is needed.
+A burst of changes, e.g. an editor saving several files, triggers a single
+regeneration once no further change is seen for the debounce time. The
+palettes are generated incrementally: in module mode only the changed modules
+are re-extracted (the others are read from the extraction cache), and in both
+modes a palette is only re-written if its signature changed.
+
+In module mode every regeneration runs in a forked process, since the changed
+modules have to be imported afresh, while the watching process never imports
+them.
+"""
+
+import fnmatch
+import importlib.util
+import multiprocessing
+import os
+import time
+from typing import Callable, Union
+
+from dlg_paletteGen.classes import Language
+from dlg_paletteGen.module_base import palettes_from_module
+from dlg_paletteGen.settings import DOXYGEN_SETTINGS_C, DOXYGEN_SETTINGS_PYTHON
+from dlg_paletteGen.source_base import palette_from_source
+
+from . import logger
+
+DEFAULT_INTERVAL = 0.2  # seconds between two scans of the sources
+DEFAULT_DEBOUNCE = 0.3  # seconds without changes before regenerating
+
+
+class Watcher:
+    """Poll the modification times of the files matching patterns in paths."""
+
+    def __init__(
+        self,
+        paths: list,
+        patterns: tuple = ("*.py",),
+        interval: float = DEFAULT_INTERVAL,
+        debounce: float = DEFAULT_DEBOUNCE,
+    ):
+        """
+        Initialize the watcher and take the first snapshot of the files.
+
+        :param paths: list of str, the files and directories watched
+        :param patterns: tuple of str, the file name patterns in directories
+        :param interval: float, seconds between two scans
+        :param debounce: float, seconds without changes ending a burst of changes
+        """
+        self.paths = paths
+        self.patterns = patterns
+        self.interval = interval
+        self.debounce = debounce
+        self.files = self.scan()
+
+    def scan(self) -> dict:
+        """Return the modification time and size of all watched files."""
+        files = {}
+        for path in self.paths:
+            if os.path.isfile(path):
+                candidates = [path]
+            else:
+                candidates = []
+                for root, dirs, names in os.walk(path):
+                    dirs[:] = [d for d in dirs if not d.startswith((".", "__pycache__"))]
+                    candidates += [
+                        os.path.join(root, name)
+                        for name in names
+                        if any(fnmatch.fnmatch(name, p) for p in self.patterns)
+                    ]
+            for candidate in candidates:
+                try:
+                    stat = os.stat(candidate)
+                except OSError:  # removed while scanning
+                    continue
+                files[candidate] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def changes(self) -> set:
+        """Return the files added, removed or modified since the last scan."""
+        files = self.scan()
+        changed = {
+            path
+            for path in files.keys() | self.files.keys()
+            if files.get(path) != self.files.get(path)
+        }
+        self.files = files
+        return changed
+
+    def wait(self, timeout: Union[float, None] = None) -> list:
+        """
+        Wait for a burst of changes to end.
+
+        :param timeout: float, seconds to wait for the first change, None for ever
+
+        :returns: list of str, the changed files, empty after a timeout
+        """
+        changed: set = set()
+        start = last = time.monotonic()
+        while True:
+            time.sleep(self.interval)
+            now = time.monotonic()
+            new = self.changes()
+            if new:
+                changed |= new
+                last = now
+            elif changed and now - last >= self.debounce:
+                return sorted(changed)
+            elif not changed and timeout is not None and now - start >= timeout:
+                return []
+
+
+def watch(
+    generate: Callable,
+    watcher: Watcher,
+    runs: Union[int, None] = None,
+    timeout: Union[float, None] = None,
+) -> int:
+    """
+    Generate once and then whenever the watched files change.
+
+    :param generate: callable, called with the list of changed files, which is
+        empty for the first generation
+    :param watcher: Watcher, the watcher of the sources
+    :param runs: int, stop after this number of regenerations, None for never
+    :param timeout: float, stop if nothing changed for this number of seconds
+
+    :returns: int, the number of regenerations
+    """
+    generate([])
+    count = 0
+    logger.info("Watching %d files for changes, press Ctrl-C to stop", len(watcher.files))
+    try:
+        while runs is None or count < runs:
+            changed = watcher.wait(timeout)
+            if not changed:
+                break
+            logger.info("Changed: %s", ", ".join(changed))
+            start = time.perf_counter()
+            generate(changed)
+            count += 1
+            logger.info("Regenerated in %.2f s", time.perf_counter() - start)
+    except KeyboardInterrupt:
+        logger.info("Stopped watching")
+    return count
+
+
+def module_sources(module_path: str) -> list:
+    """
+    Return the files and directories of the top-level package of module_path.
+
+    The package is located without importing it.
+
+    :param module_path: str, the import path of the module
+
+    :returns: list of str, the paths to watch
+    """
+    spec = importlib.util.find_spec(module_path.split(".", 1)[0])
+    if spec is None:
+        raise ValueError(f"Module {module_path} not found")
+    if spec.submodule_search_locations:
+        return list(spec.submodule_search_locations)
+    if spec.origin and os.path.exists(spec.origin):
+        return [spec.origin]
+    raise ValueError(f"Module {module_path} has no source files to watch")
+
+
+def module_generator(module_path: str, **options) -> Callable:
+    """
+    Return the function regenerating the palettes of a module in a forked process.
+
+    :param module_path: str, the import path of the module
+    :param options: the arguments of palettes_from_module, incremental is enforced
+
+    :returns: callable, called with the list of changed files, returns the exit
+        code of the process
+    """
+    options["incremental"] = True
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("fork" if "fork" in methods else None)
+
+    def generate(_changed: list) -> Union[int, None]:
+        process = ctx.Process(
+            target=palettes_from_module, args=(module_path,), kwargs=options
+        )
+        process.start()
+        process.join()
+        if process.exitcode:
+            logger.error("Generating the palettes of %s failed", module_path)
+        return process.exitcode
+
+    return generate
+
+
+def source_generator(inputdir: str, outfile: str, **options) -> Callable:
+    """
+    Return the function regenerating the palette of source files.
+
+    :param inputdir: str, the directory or file examined
+    :param outfile: str, the file name of the palette
+    :param options: the arguments of palette_from_source, incremental is enforced
+
+    :returns: callable, called with the list of changed files, returns the palettes
+        written
+    """
+    options["incremental"] = True
+
+    def generate(_changed: list) -> dict:
+        try:
+            return palette_from_source(inputdir, outfile, **options)
+        except Exception as e:  # pylint: disable=broad-except
+            # e.g. a file saved in the middle of an edit, keep on watching
+            logger.error("Generating the palette of %s failed: %s", inputdir, e)
+            return {}
+
+    return generate
+
+
+def source_patterns(language: Language) -> tuple:
+    """Return the file name patterns doxygen examines for language."""
+    settings = DOXYGEN_SETTINGS_C if language == Language.C else DOXYGEN_SETTINGS_PYTHON
+    return tuple(p.strip() for p in settings["FILE_PATTERNS"].split(","))
@@ -44,7 +44,13 @@ setup(
         "console_scripts": [
             "dlg_paletteGen = dlg_paletteGen.__main__:main",
             "dlg-paletteGen = dlg_paletteGen.__main__:main",
+            "dlg_paletteGen-benchmark = dlg_paletteGen.benchmark:main",
+            "dlg_paletteGen-server = dlg_paletteGen.server:main",
         ]
     },
-    extras_require={"test": read_requirements("requirements-test.txt")},
+    extras_require={
+        "test": read_requirements("requirements-test.txt"),
+        "fast": ["orjson", "zstandard"],
+        "yaml": ["PyYAML"],
+    },
 )
@@ -1,19 +1,61 @@
 # pylint: disable=too-few-public-methods
+import asyncio
+import importlib
 import inspect
 import json
 import logging
+import multiprocessing
 import os
 import subprocess
 import sys
+import threading
+import types
+import typing
+import urllib.error
+import urllib.parse
+import urllib.request
 
 import numpy
 from pytest import LogCaptureFixture
 
+from dlg_paletteGen import (
+    benchmark,
+    llm,
+    manifest,
+    module_base,
+    profiling,
+    server,
+    stream,
+    synthetic,
+    traversal,
+    watch,
+)
+from dlg_paletteGen.cache import configure_cache
+from dlg_paletteGen.classes import DOCSTRING_CACHE, DetailedDescription
+from dlg_paletteGen.ids import configure_ids
+from dlg_paletteGen.llm import configure_llm
+from dlg_paletteGen.sandbox import configure_sandbox
 from dlg_paletteGen.settings import DOXYGEN_SETTINGS
 from dlg_paletteGen.__main__ import check_environment_variables, get_args
-from dlg_paletteGen.module_base import module_hook, nodes_from_module
+from dlg_paletteGen.module_base import (
+    module_hook,
+    nodes_from_module,
+    palettes_from_module,
+)
 from dlg_paletteGen.source_base import Language, process_compounddefs
+from dlg_paletteGen.static_base import static_module_hook
 from dlg_paletteGen.support_functions import (
+    add_data_hashes,
+    add_repro_hashes,
+    constructPalette,
+    palette_filename,
+    read_palette,
+    read_palette_model,
+    write_palette_stream,
+    RESOLUTION_CACHE,
+    TYPEFIX_STATS,
+    get_submodules,
+    graph_signature,
     guess_type_from_default,
     import_using_name,
     prepare_and_write_palette,
@@ -22,6 +64,7 @@ from dlg_paletteGen.support_functions import (
     NAME,
     this_module,
     typeFix,
+    _typeFix,
 )
 
 pytest_plugins = ["pytester", "pytest-datadir"]
@@ -307,14 +350,40 @@ def test_direct_cli():
         split = False
         c = False
         prevent_cyclic = False
+        max_depth = None
+        max_modules = None
+        lazy = False
+        stream = False
+        include: list = []
+        exclude: list = []
         quiet = False
+        jobs = 1
+        cache_dir = ""
+        cache_size = 512
+        incremental = False
+        static = False
+        sandbox = False
+        sandbox_timeout = 60.0
+        sandbox_memory = 0
+        compact = False
+        compress = None
+        llm_concurrency = 8
+        llm_rate = 10.0
+        llm_batch = 1
+        ids = "random"
+        manifest = ""
+        watch = False
+        profile = False
+        profile_top = 10
+        profile_memory = False
 
         def __len__(self):
             return 10
 
     a = CliArgs()
     res = get_args(args=a)
-    assert res[:3] == (".", "", "dlg_paletteGen.palette")
+    assert (res.idir, res.tag, res.ofile) == (".", "", "dlg_paletteGen.palette")
+    assert res.language == Language.PYTHON
 
 
 def test_direct_numpy(tmpdir: str, shared_datadir: str):
@@ -653,6 +722,20 @@ def test_import_using_name(caplog: LogCaptureFixture):
     mod = import_using_name(module_name, traverse=True)
     assert mod.__name__ == "print"
 
+    # failures are memoized until sys.modules changes
+    hits = RESOLUTION_CACHE.stats["hits"]
+    assert import_using_name("no_such_module.attr", traverse=True, err_log=False) is None
+    assert import_using_name("no_such_module.attr", traverse=True, err_log=False) is None
+    assert RESOLUTION_CACHE.stats["hits"] == hits + 1
+    sys.modules["no_such_module"] = inspect
+    try:
+        assert (
+            import_using_name("no_such_module.attr", traverse=True, err_log=False) is None
+        )
+        assert RESOLUTION_CACHE.stats["hits"] == hits + 1
+    finally:
+        del sys.modules["no_such_module"]
+
 
 def test_typeFix(tmpdir: str, shared_datadir: str):
     """
@@ -677,6 +760,370 @@ def test_typeFix(tmpdir: str, shared_datadir: str):
     prepare_and_write_palette(nodes, output_file, module_doc=module_doc)
 
 
+def test_write_palette_stream(tmpdir: str, shared_datadir: str):
+    """
+    Test that the streamed palette is identical to the serialized one.
+
+    :param tmpdir: the path to the temp directory to use
+    :param shared_datadir: the path the the local directory
+    """
+    sys.path.append(str(shared_datadir.absolute()))
+    nodes, module_doc = nodes_from_module("example_rest", recursive=True)
+    signature, module_doc, nodes = add_repro_hashes((nodes, module_doc))
+    output_file = f"{tmpdir}/t.palette"
+    palette = constructPalette(output_file, module_doc, nodes, None, None, signature)
+    assert write_palette_stream(palette, output_file)
+    with open(output_file, "r", encoding="utf8") as f:
+        assert f.read() == json.dumps(palette, indent=4)
+    # minified and compressed palettes are read back transparently
+    size = os.path.getsize(output_file)
+    assert write_palette_stream(palette, output_file, indent=None)
+    assert os.path.getsize(output_file) < size
+    with open(output_file, "r", encoding="utf8") as f:
+        assert json.load(f) == palette
+    gz_file = palette_filename(output_file, "gzip")
+    assert gz_file.endswith(".palette.gz")
+    assert write_palette_stream(palette, gz_file, indent=None, compression="gzip")
+    with open(gz_file, "rb") as f:
+        assert f.read(2) == b"\x1f\x8b"
+    assert read_palette(gz_file) == palette
+    os.remove(gz_file)
+    # a palette which can't be serialized leaves the existing file untouched
+    palette["nodeDataArray"] = nodes + [{"value": numpy.zeros(2)}]
+    assert not write_palette_stream(palette, output_file)
+    with open(output_file, "r", encoding="utf8") as f:
+        assert len(json.load(f)["nodeDataArray"]) == len(nodes)
+    assert not [f for f in os.listdir(str(tmpdir)) if f.endswith(".tmp")]
+
+
+def test_ids(tmpdir: str, shared_datadir: str):
+    """
+    Test that deterministic ids produce identical palettes in every run.
+
+    :param tmpdir: the path to the temp directory to use
+    :param shared_datadir: the path the the local directory
+    """
+    sys.path.append(str(shared_datadir.absolute()))
+    generator = configure_ids("counter")
+    assert len({generator.next_id() for _ in range(1000)}) == 1000
+    configure_ids("deterministic")
+    try:
+        contents = []
+        for i in range(2):
+            nodes, module_doc = nodes_from_module("example_rest", recursive=True)
+            output_file = f"{tmpdir}/t.palette"
+            prepare_and_write_palette(nodes, output_file, module_doc=module_doc)
+            palette = read_palette(output_file)
+            del palette["modelData"]["lastModifiedDatetime"]
+            contents.append(palette)
+    finally:
+        configure_ids()
+    assert contents[0] == contents[1]
+    node_ids = [n["id"] for n in contents[0]["nodeDataArray"]]
+    assert len(set(node_ids)) == len(node_ids)
+
+
+def test_benchmark(tmpdir: str, shared_datadir: str):
+    """
+    Test that a benchmark case is timed and the results can be compared.
+
+    :param tmpdir: the path to the temp directory to use
+    :param shared_datadir: the path the the local directory
+    """
+    cases = benchmark.default_cases(
+        str(shared_datadir.absolute()), packages=["json", "not_a_package"]
+    )
+    assert "module:json" in [c["name"] for c in cases]
+    assert "module:not_a_package" not in [c["name"] for c in cases]
+    cases = [c for c in cases if c["name"] == "module:example_rest"]
+    results = benchmark.run_benchmarks(cases)
+    assert results[0]["nodes"] == 3
+    assert results[0]["wall"] > 0 and results[0]["peak_rss"] > 0
+    assert results[0]["nodes_per_second"] > 0
+    output_file = f"{tmpdir}/bench.json"
+    content = benchmark.save_results(results, output_file)
+    with open(output_file, "r", encoding="utf8") as f:
+        assert json.load(f) == content
+    assert "module:example_rest" in benchmark.compare_results(results, content)
+
+
+def test_synthetic_package(tmpdir: str):
+    """
+    Test that all members of a synthetic package end up in the palette.
+
+    :param tmpdir: the path to the temp directory to use
+    """
+    for style in synthetic.DOCSTRING_STYLES:
+        doc = synthetic.docstring(style, "f does it.", [("p0", "int"), ("p1", "str")])
+        descr = DetailedDescription(doc)
+        assert descr.format == style
+        assert list(descr.params) == ["p0", "p1"]
+    _, members = synthetic.generate_package(
+        str(tmpdir), "synth_pkg", modules=3, classes=2, methods=2, functions=2
+    )
+    assert members == 3 * (2 + 2 * 3)
+    nodes, _ = nodes_from_module("synth_pkg")
+    assert len(nodes) == members
+    results = [
+        {"mode": "module", "members": 100, "wall": 1.0},
+        {"mode": "module", "members": 1000, "wall": 10.0},
+        {"mode": "module", "members": 10000, "wall": 1000.0},
+    ]
+    exponents = benchmark.scaling_exponents(results)
+    assert [e["super_linear"] for e in exponents] == [False, True]
+    assert round(exponents[1]["exponent"], 6) == 2.0
+
+
+def test_profile(tmpdir: str, shared_datadir: str):
+    """
+    Test that the phases are recorded per module and the report is written.
+
+    :param tmpdir: the path to the temp directory to use
+    :param shared_datadir: the path the the local directory
+    """
+    sys.path.append(str(shared_datadir.absolute()))
+    profiler = profiling.configure_profiler(True)
+    try:
+        palettes_from_module("example_google", outfile=f"{tmpdir}/t.palette")
+        before = profiling.snapshot()
+        with profiling.module("worker"), profiling.phase("import"):
+            pass
+        profile = profiling.since(before)
+        profiling.merge(profile)
+    finally:
+        profiling.configure_profiler(False)
+    for phase in ["import", "getmembers", "docstrings", "populateFields", "typeFix"]:
+        assert profiler.modules["example_google"][phase][1] > 0
+    for phase in ["hashing", "serialization"]:
+        assert profiler.phases[phase][1] == 1
+    # only the difference to the snapshot is returned by a worker process
+    assert list(profile["modules"]) == ["worker"]
+    assert profile["modules"]["worker"]["import"][1] == 1
+    assert profiler.modules["worker"]["import"][1] == 2
+    with open(f"{tmpdir}/t.profile.json", "r", encoding="utf8") as f:
+        report = json.load(f)
+    assert report["phases"]["docstrings"]["calls"] == profiler.phases["docstrings"][1]
+    assert "example_google" in profiler.summary()
+
+
+def test_profile_members(tmpdir: str):
+    """
+    Test that the time, memory and failure path of every member are recorded.
+
+    :param tmpdir: the path to the temp directory to use
+    """
+    with open(f"{tmpdir}/profiled_mod.py", "w", encoding="utf8") as f:
+        f.write(
+            'def documented(a: int = 1):\n    """Do it."""\n    return a\n\n\n'
+            "def undocumented(a, b=1):\n    return a + b\n"
+        )
+    profiler = profiling.configure_profiler(True, top=2, memory=True)
+    try:
+        nodes_from_module("profiled_mod")
+    finally:
+        profiling.configure_profiler(False)
+    members = {m["name"]: m for m in profiler.slowest()}
+    assert set(members) == {"profiled_mod.documented", "profiled_mod.undocumented"}
+    assert members["profiled_mod.documented"]["path"] == []
+    assert members["profiled_mod.undocumented"]["path"] == ["undocumented"]
+    for member in members.values():
+        assert member["module"] == "profiled_mod"
+        assert member["type"] == "function"
+        assert member["memory"] > 0
+    assert profiler.slowest(1) == [max(members.values(), key=lambda m: m["time"])]
+
+    # only the top slowest members are kept, including those of other processes
+    profiler = profiling.configure_profiler(True, top=1)
+    try:
+        before = profiling.snapshot()
+        nodes_from_module("profiled_mod")
+        profile = profiling.since(before)
+        profiling.merge(profile)
+    finally:
+        profiling.configure_profiler(False)
+    assert len(profile["members"]) == 1
+    assert profiler.recorded == 3
+    assert len(profiler.members) == 1
+    assert len(profiler.report()["slowest_members"]) == 1
+
+
+def test_server(shared_datadir: str):
+    """
+    Test that the palette server answers palette and status requests.
+
+    :param shared_datadir: the path to the test data directory
+    """
+    sys.path.append(str(shared_datadir.absolute()))
+    palette_server = server.create_server(port=0)
+    thread = threading.Thread(target=palette_server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{palette_server.server_address[1]}"
+
+    def request(path, data=None):
+        try:
+            with urllib.request.urlopen(url + path, data=data) as response:
+                return response.status, json.load(response)
+        except urllib.error.HTTPError as e:
+            return e.code, json.load(e)
+
+    try:
+        status, palette = request("/palette?module=example_rest&recursive=1")
+        assert status == 200
+        assert len(palette["nodeDataArray"]) == 3
+        body = json.dumps({"module": "example_rest", "split": True}).encode()
+        status, palettes = request("/palette", body)
+        assert status == 200
+        assert list(palettes["palettes"]) == ["example_rest.palette"]
+        results: list = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(request("/palette?module=example_google"))
+            )
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert [r[0] for r in results] == [200] * 4
+        assert all(r[1] == results[0][1] for r in results)
+        assert request("/palette?module=example_rest&unknown=1")[0] == 400
+        assert request("/palette?module=example_rest&ids=unknown")[0] == 400
+        probe = "__import__('os').getcwd()"
+        assert request(f"/palette?module={urllib.parse.quote(probe)}")[0] == 400
+        assert request("/palette?module=example_rest%0A")[0] == 400
+        assert request("/palette?module=no_such_module_to_serve")[0] == 404
+        status, info = request("/status")
+        assert status == 200
+        assert info["requests"] == 7
+        assert info["busy"] is False
+    finally:
+        palette_server.shutdown()
+        palette_server.server_close()
+
+
+def test_startup_time():
+    """
+    Test that importing the command line tool does not import the heavy dependencies.
+
+    The LLM client, BlockDAG, numpy and the package metadata are only imported
+    when used.
+    """
+    heavy = ["google.genai", "blockdag", "numpy", "importlib.metadata"]
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import dlg_paletteGen.__main__\n"
+        "print(time.perf_counter() - start)\n"
+        f"print([m for m in {heavy!r} if m in sys.modules])\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    # the log messages are written to stdout as well
+    elapsed, imported = result.stdout.splitlines()[-2:]
+    assert imported == "[]"
+    # about 0.1 s, the eager imports took more than 1 s
+    assert float(elapsed) < 0.5
+
+
+def test_manifest(tmpdir: str, shared_datadir: str):
+    """
+    Test that the palettes listed in a manifest are generated and summarized.
+
+    :param tmpdir: the path to the temp directory to use
+    :param shared_datadir: the path to the test data directory
+    """
+    sys.path.append(str(shared_datadir.absolute()))
+    with open(f"{tmpdir}/nightly.yaml", "w", encoding="utf8") as f:
+        f.write(
+            "defaults:\n  recursive: true\n"
+            "palettes:\n"
+            "  - example_rest\n"
+            "  - module: example_google\n    output: google.palette\n"
+            "  - module: no_such_module_in_manifest\n"
+        )
+    entries = manifest.load_manifest(f"{tmpdir}/nightly.yaml")
+    assert [e["output"] for e in entries[:2]] == [
+        "example_rest.palette",
+        "google.palette",
+    ]
+    assert all(e["recursive"] for e in entries)
+    for jobs in (1, 2):
+        results = manifest.run_manifest(entries, jobs=jobs)
+        summary = manifest.summarize(results, 1.0)
+        assert [r["palettes"] for r in results[:2]] == [
+            {"example_rest.palette": 3},
+            {"google.palette": 9},
+        ]
+        assert (summary["palettes"], summary["components"]) == (2, 12)
+        assert summary["failed"] == 1
+        assert results[2]["error"] == "ValueError: no palette written"
+        assert "3 entries" in manifest.format_summary(summary)
+    assert read_palette("google.palette")["modelData"]["filePath"] == "google.palette"
+    with open(f"{tmpdir}/invalid.json", "w", encoding="utf8") as f:
+        json.dump({"palettes": [{"module": "json", "source": "."}]}, f)
+    try:
+        manifest.load_manifest(f"{tmpdir}/invalid.json")
+        assert False, "expected a ValueError"
+    except ValueError as e:
+        assert "either a module or a source" in str(e)
+
+
+def test_watch(tmpdir: str):
+    """
+    Test that a palette is regenerated after its module changed.
+
+    :param tmpdir: the path to the temp directory to use
+    """
+    source = f"{tmpdir}/watched_mod.py"
+    with open(source, "w", encoding="utf8") as f:
+        f.write('def first(a: int = 1):\n    """Do it."""\n    return a\n')
+    watcher = watch.Watcher(
+        watch.module_sources("watched_mod"), interval=0.05, debounce=0.1
+    )
+    assert list(watcher.files) == [source]
+    module_generator = watch.module_generator("watched_mod", outfile="watched.palette")
+    calls = []
+
+    def generate(changed):
+        calls.append(changed)
+        assert module_generator(changed) == 0
+        if len(calls) == 1:  # edit the module after the first generation
+            with open(source, "a", encoding="utf8") as f:
+                f.write(
+                    '\n\ndef second(b: str = "x"):\n    """Do more."""\n    return b\n'
+                )
+
+    assert watch.watch(generate, watcher, runs=1) == 1
+    assert calls == [[], [source]]
+    palette = read_palette("watched.palette")
+    assert [n["name"] for n in palette["nodeDataArray"]] == [
+        "watched_mod.first",
+        "watched_mod.second",
+    ]
+    # nothing changed, the palette is not re-written
+    mtime = os.stat("watched.palette").st_mtime_ns
+    assert watch.watch(module_generator, watcher, timeout=0.2) == 0
+    assert os.stat("watched.palette").st_mtime_ns == mtime
+
+
+def test_docstring_cache():
+    """
+    Test that identical docstrings are parsed once and returned as copies.
+    """
+    doc = "Do something.\n\n:param a: first\n:param b: second\n:returns: result"
+    first = DetailedDescription(doc, name="first")
+    hits = DOCSTRING_CACHE.stats["hits"]
+    first.params["a"]["desc"] = "modified"
+    second = DetailedDescription(doc, name="second")
+    assert DOCSTRING_CACHE.stats["hits"] == hits + 1
+    assert second.format == "rEST"
+    assert second.params["a"]["desc"] == "first"
+    assert second.description == first.description
+    assert "Docstring cache" in DOCSTRING_CACHE.summary()
+
+
 def test_guess_type_from_default():
     """
     Test the function
@@ -777,3 +1224,674 @@ def test_typeFix():
         "float",
         "None",
     }
+    # cached results match the uncached ones, also for unhashable annotations
+    annotations = [typing.List[int], typing.Optional[str], "numpy.ndarray", True, 1]
+    annotations += [typing.Annotated[int, {}]]  # type: ignore
+    assert [typeFix(a) for a in annotations] == [_typeFix(a) for a in annotations]
+    assert typeFix(typing.List[int]) == typeFix(typing.List[int])
+    assert "unhashable" in TYPEFIX_STATS.summary()
+
+
+def test_split_jobs(tmpdir: str):
+    """
+    Test that the parallel split mode produces the same palettes as the serial one.
+
+    :param tmpdir: the path to the temp directory to use
+    """
+
+    def node_names(path):
+        palettes = {}
+        for fname in sorted(os.listdir(path)):
+            with open(os.path.join(path, fname), "r", encoding="utf8") as f:
+                content = json.load(f)
+            palettes[fname] = [n["name"] for n in content["nodeDataArray"]]
+        return palettes
+
+    for jobs in [1, 2]:
+        with tmpdir.mkdir(f"jobs_{jobs}").as_cwd():
+            palettes_from_module("json", outfile="", split=True, jobs=jobs)
+    serial = node_names(str(tmpdir.join("jobs_1")))
+    assert len(serial) > 1
+    assert serial == node_names(str(tmpdir.join("jobs_2")))
+
+
+def test_split_jobs_failure(tmpdir: str):
+    """
+    Test that a sub-module failing in a worker is skipped in the parallel split mode.
+
+    :param tmpdir: the path to the temp directory to use
+    """
+    pkg = tmpdir.mkdir("jobs_pkg")
+    pkg.join("__init__.py").write("")
+    pkg.join("good.py").write('def good(a: int = 1):\n    """Good."""\n')
+    pkg.join("broken.py").write('raise RuntimeError("broken on import")\n')
+    sys.path.append(str(tmpdir))
+    traversal.configure_traversal(lazy=True)
+    try:
+        with tmpdir.mkdir("out").as_cwd():
+            palettes = palettes_from_module("jobs_pkg", outfile="", split=True, jobs=2)
+    finally:
+        traversal.configure_traversal()
+    names = sorted(palettes)
+    assert "jobs_pkg_good.palette" in names
+    assert not any("broken" in name for name in names)
+    assert sorted(os.listdir(str(tmpdir.join("out")))) == names
+
+
+def test_split_prefix(tmpdir: str):
+    """
+    Test that in split mode outfile is the prefix of the palette file names.
+
+    :param tmpdir: the path to the temp directory to use
+    """
+    prefix = str(tmpdir.join("json_"))
+    palettes_from_module("json", outfile=prefix, split=True)
+    files = sorted(os.listdir(str(tmpdir)))
+    assert len(files) > 1
+    assert "json_" not in files
+    assert all(f.startswith("json_json") and f.endswith(".palette") for f in files)
+
+
+def test_extraction_cache(tmpdir: str, shared_datadir: str):
+    """
+    Test that unchanged modules are loaded from the extraction cache.
+
+    :param tmpdir: the path to the temp directory to use
+    :param shared_datadir: the path the the local directory
+    """
+    sys.path.append(str(shared_datadir.absolute()))
+    extraction_cache = configure_cache(str(tmpdir.join("cache")))
+    try:
+        first, _ = module_hook("example_rest", modules={}, recursive=True)
+        assert extraction_cache.stats["misses"] == 1
+        assert extraction_cache.stats["writes"] == 1
+        second, _ = module_hook("example_rest", modules={}, recursive=True)
+        assert extraction_cache.stats["hits"] == 1
+        assert json.loads(json.dumps(first)) == second
+        # a cache too small for a single entry evicts everything
+        extraction_cache.max_size = 1
+        extraction_cache.evict()
+        assert extraction_cache.stats["evictions"] == 1
+        assert extraction_cache.size == 0
+    finally:
+        configure_cache(None)
+
+
+def test_extraction_cache_origins(tmpdir: str):
+    """
+    Test that editing the module defining a re-exported member is a cache miss.
+
+    :param tmpdir: the path to the temp directory to use
+    """
+    package = tmpdir.mkdir("reexporting_pkg")
+    package.join("__init__.py").write(
+        '"""Re-exporting package."""\nfrom reexporting_pkg.impl.funcs import add\n'
+    )
+    package.mkdir("impl").join("__init__.py").write("")
+    funcs = package.join("impl").join("funcs.py")
+    funcs.write(
+        'def add(a: int, b: int) -> int:\n    """Add a and b."""\n    return a + b\n'
+    )
+    sys.path.append(str(tmpdir))
+    extraction_cache = configure_cache(str(tmpdir.join("cache")))
+    try:
+        module = importlib.import_module("reexporting_pkg")
+        key = extraction_cache.key(module)
+        module_base._get_module_members(module, modules={})
+        module_base._get_module_members(module, modules={})
+        assert extraction_cache.stats["hits"] == 1
+        funcs.write("# edited\n", mode="a")
+        # the key only covers the files of the package itself
+        assert extraction_cache.key(module) == key
+        module_base._get_module_members(module, modules={})
+        assert extraction_cache.stats["hits"] == 1
+        assert extraction_cache.stats["misses"] == 2
+    finally:
+        configure_cache(None)
+        sys.path.remove(str(tmpdir))
+
+
+def test_incremental(tmpdir: str, shared_datadir: str):
+    """
+    Test that unchanged palettes are not re-written in incremental mode.
+
+    :param tmpdir: the path to the temp directory to use
+    :param shared_datadir: the path the the local directory
+    """
+    sys.path.append(str(shared_datadir.absolute()))
+    output_file = str(tmpdir.join("example_rest.palette"))
+    configure_cache(str(tmpdir.join("cache")))
+    try:
+        palettes_from_module("example_rest", outfile=output_file, incremental=True)
+        with open(output_file, "r", encoding="utf8") as f:
+            first = json.load(f)
+        palettes_from_module("example_rest", outfile=output_file, incremental=True)
+        with open(output_file, "r", encoding="utf8") as f:
+            assert json.load(f) == first
+        # a palette missing a component is re-written, keeping the other node ids
+        removed = first["nodeDataArray"].pop()
+        with open(output_file, "w", encoding="utf8") as f:
+            json.dump(first, f)
+        palettes_from_module("example_rest", outfile=output_file, incremental=True)
+        with open(output_file, "r", encoding="utf8") as f:
+            third = json.load(f)
+        assert third["modelData"]["signature"] == first["modelData"]["signature"]
+        assert [n["id"] for n in third["nodeDataArray"][:-1]] == [
+            n["id"] for n in first["nodeDataArray"]
+        ]
+        assert third["nodeDataArray"][-1]["dataHash"] == removed["dataHash"]
+    finally:
+        configure_cache(None)
+
+
+def test_static_module(tmpdir: str, shared_datadir: str):
+    """
+    Test that the static extraction matches the live one without importing.
+
+    :param tmpdir: the path to the temp directory to use
+    :param shared_datadir: the path the the local directory
+    """
+    sys.path.append(str(shared_datadir.absolute()))
+
+    def fields(modules, module_name, skip=()):
+        return {
+            n["name"]: [
+                (k, f["type"], f["value"], f["defaultValue"])
+                for k, f in n["fields"].items()
+                if k not in skip
+            ]
+            for n in modules[module_name].values()
+        }
+
+    static_modules, _ = static_module_hook("example_rest", modules={})
+    live_modules, _ = module_hook("example_rest", modules={})
+    assert fields(static_modules, "example_rest") == fields(live_modules, "example_rest")
+
+    # builtin and typing names are resolved like in the live extraction, names
+    # of other packages are only known by importing them
+    static_modules, _ = static_module_hook("example_options", modules={})
+    live_modules, _ = module_hook("example_options", modules={})
+    third_party = ("test_kw_complex1", "test_kw_complex2")
+    assert fields(static_modules, "example_options", third_party) == fields(
+        live_modules, "example_options", third_party
+    )
+    node = static_modules["example_options"]["example_options.testField"]
+    assert node["fields"]["test_kw_none"]["type"] == "typing.Optional"
+    assert node["fields"]["test_pos_hint_doc"]["type"] == "builtins.any"
+    assert node["fields"]["test_kw_complex1"]["type"] == "np.array"
+    assert node["fields"]["test_kw_complex1"]["value"] == "np.array([123, 456])"
+
+    # a package failing at import time can still be extracted
+    pkg = tmpdir.mkdir("static_pkg")
+    pkg.join("__init__.py").write(
+        '"""Package docstring."""\nfrom .core import func\nraise RuntimeError()\n'
+    )
+    pkg.join("core.py").write(
+        "DEFAULT = 2\n\n\n"
+        "def func(a: int, b=DEFAULT, *, c=len):\n"
+        '    """\n    Do something.\n\n    :param a: first\n    """\n'
+    )
+    sys.path.append(str(tmpdir))
+    modules, doc = static_module_hook("static_pkg", modules={})
+    assert "static_pkg" not in sys.modules
+    assert doc == "Package docstring."
+    node = modules["static_pkg"]["static_pkg.func"]
+    assert node["description"].startswith("Do something.")
+    assert node["fields"]["a"]["type"] == "int"
+    assert node["fields"]["b"]["value"] == 2
+    assert node["fields"]["c"]["value"] == "builtins.builtin_function_or_method"
+    assert node["fields"]["func_name"]["value"] == "static_pkg.func"
+    assert "core.func" in modules["static_pkg.core"]
+
+    # the filters and the limits of the traversal apply as well
+    for options, expected in [
+        ({"exclude": ["static_pkg.core"]}, ["static_pkg"]),
+        ({"max_depth": 0}, ["static_pkg"]),
+        ({"max_modules": 1}, ["static_pkg"]),
+        ({"include": ["static_pkg.core"]}, ["static_pkg", "static_pkg.core"]),
+    ]:
+        traversal.configure_traversal(**options)
+        walked = traversal.STATS.snapshot()
+        try:
+            modules, _ = static_module_hook("static_pkg", modules={})
+        finally:
+            traversal.configure_traversal()
+        counts = traversal.STATS.since(walked)
+        assert sorted(modules) == expected
+        assert "static_pkg" not in sys.modules
+        if "include" in options:
+            assert modules["static_pkg"] == {}
+            assert counts["members_pruned"] == 1
+        else:
+            assert (
+                counts["modules_pruned"] + counts["depth_limited"] + counts["over_budget"]
+                == 1
+            )
+
+
+def test_sandbox(tmpdir: str):
+    """
+    Test that sub-modules hanging or crashing at import time are skipped.
+
+    :param tmpdir: the path to the temp directory to use
+    """
+    pkg = tmpdir.mkdir("sandbox_pkg")
+    pkg.join("__init__.py").write(
+        '"""Package docstring."""\n\n\ndef good(a: int = 1):\n    """Good."""\n'
+    )
+    pkg.join("hang.py").write("import time\n\ntime.sleep(60)\n")
+    pkg.join("crash.py").write("import os\n\nos._exit(3)\n")
+    pkg.join("fine.py").write('def fine(b: str = "x"):\n    """Fine."""\n')
+    sys.path.append(str(tmpdir))
+    pool = configure_sandbox(True, timeout=2)
+    try:
+        modules, doc = module_hook("sandbox_pkg", modules={}, recursive=True)
+        assert "sandbox_pkg" not in sys.modules
+        assert doc == "Package docstring."
+        assert "sandbox_pkg.good" in modules["sandbox_pkg"]
+        assert "fine.fine" in modules["sandbox_pkg.fine"]
+        assert "no result after" in pool.failures["sandbox_pkg.hang"]
+        assert "exit code 3" in pool.failures["sandbox_pkg.crash"]
+        assert "sandbox_pkg.hang" not in modules
+    finally:
+        configure_sandbox(False)
+
+
+def test_module_traversal(tmpdir: str):
+    """
+    Test that cyclic and re-exported sub-modules are extracted once.
+
+    :param tmpdir: the path to the temp directory to use
+    """
+    pkg = tmpdir.mkdir("graph_pkg")
+    pkg.join("__init__.py").write(
+        'from . import alpha, beta, sub\n\n__all__ = ["alpha", "beta", "sub"]\n'
+    )
+    pkg.join("alpha.py").write(
+        "from graph_pkg import beta\n\n\n" 'def first(a: int = 1):\n    """First."""\n'
+    )
+    pkg.join("beta.py").write(
+        'from graph_pkg import alpha\n\n__all__ = ["alpha", "second"]\n\n\n'
+        'def second(b: str = "x"):\n    """Second."""\n'
+    )
+    sub = pkg.mkdir("sub")
+    sub.join("__init__.py").write(
+        'from graph_pkg import alpha\nfrom . import deep\n\n__all__ = ["alpha"]\n'
+    )
+    sub.join("deep.py").write('def third(c: float = 1.0):\n    """Third."""\n')
+    sys.path.append(str(tmpdir))
+    expected = [
+        "graph_pkg",
+        "graph_pkg.alpha",
+        "graph_pkg.beta",
+        "graph_pkg.sub",
+        "graph_pkg.sub.deep",
+    ]
+    before = traversal.STATS.snapshot()
+    modules, _ = module_hook("graph_pkg", modules={}, recursive=True)
+    walked = traversal.STATS.since(before)
+    assert sorted(modules) == expected
+    assert walked["modules"] == len(expected)
+    assert walked["duplicates"] > 0
+    assert "duplicate visits avoided" in traversal.STATS.summary()
+
+    # prevent_cyclic is a depth limit of 1, the limits are reported
+    before = traversal.STATS.snapshot()
+    modules, _ = module_hook("graph_pkg", modules={}, prevent_cyclic=True)
+    assert sorted(modules) == expected[:-1]
+    assert traversal.STATS.since(before)["depth_limited"] > 0
+    traversal.configure_traversal(max_modules=2)
+    try:
+        before = traversal.STATS.snapshot()
+        modules, _ = module_hook("graph_pkg", modules={})
+        assert sorted(modules) == expected[:2]
+        assert traversal.STATS.since(before)["over_budget"] > 0
+    finally:
+        traversal.configure_traversal()
+
+
+def test_lazy_submodules(tmpdir: str):
+    """
+    Test that lazy discovery finds the sub-modules without importing them.
+
+    :param tmpdir: the path to the temp directory to use
+    """
+    pkg = tmpdir.mkdir("lazy_pkg")
+    pkg.join("__init__.py").write(
+        '__all__ = ["listed", "base"]\n\n\ndef base(a: int = 1):\n    """Base."""\n'
+    )
+    pkg.join("listed.py").write('def listed(b: str = "x"):\n    """Listed."""\n')
+    sub = pkg.mkdir("sub")
+    sub.join("__init__.py").write("")
+    sub.join("deep.py").write('def deep(c: float = 1.0):\n    """Deep."""\n')
+    sys.path.append(str(tmpdir))
+    mod = import_using_name("lazy_pkg")
+    sub_modules, _ = get_submodules(mod, lazy=True)
+    assert sub_modules == ["lazy_pkg.listed", "lazy_pkg.sub"]
+    assert "lazy_pkg.listed" not in sys.modules
+    assert "lazy_pkg.sub" not in sys.modules
+
+    traversal.configure_traversal(lazy=True)
+    try:
+        lazy_modules, _ = module_hook("lazy_pkg", modules={})
+    finally:
+        traversal.configure_traversal()
+    assert sorted(lazy_modules) == [
+        "lazy_pkg",
+        "lazy_pkg.listed",
+        "lazy_pkg.sub",
+        "lazy_pkg.sub.deep",
+    ]
+    modules, _ = module_hook("lazy_pkg", modules={})
+    assert {k: list(v) for k, v in modules.items()} == {
+        k: list(v) for k, v in lazy_modules.items()
+    }
+
+
+def test_lazy_split(tmpdir: str):
+    """
+    Test that lazy discovery writes the same split palettes as the eager one.
+
+    :param tmpdir: the path to the temp directory to use
+    """
+    import email  # pylint: disable=import-outside-toplevel
+
+    eager = get_submodules(email)[0]
+    lazy = get_submodules(email, lazy=True)[0]
+    assert len(lazy) == len(set(lazy))
+    assert sorted(lazy) == sorted(eager)
+    files = palettes_from_module("email", outfile=str(tmpdir.join("eager_")), split=True)
+    traversal.configure_traversal(lazy=True)
+    try:
+        lazy_files = palettes_from_module(
+            "email", outfile=str(tmpdir.join("lazy_")), split=True
+        )
+    finally:
+        traversal.configure_traversal()
+    assert len(lazy_files) == len(files)
+    assert sum(lazy_files.values()) == sum(files.values())
+
+
+def test_name_filter(tmpdir: str):
+    """
+    Test that the include and exclude filters prune modules before importing them.
+
+    :param tmpdir: the path to the temp directory to use
+    """
+    name_filter = traversal.NameFilter(
+        include=["pkg.sub*"], exclude=["*.gui", "re:.*_old"]
+    )
+    assert name_filter.module("pkg")  # may contain included modules
+    assert name_filter.module("pkg.sub.deep")
+    assert not name_filter.module("pkg.other")
+    assert not name_filter.module("pkg.sub.gui.qt")
+    assert not name_filter.member("pkg.func")
+    assert name_filter.member("pkg.sub.func")
+    assert not name_filter.member("pkg.sub.func_old")
+
+    pkg = tmpdir.mkdir("filter_pkg")
+    pkg.join("__init__.py").write(
+        'def kept(a: int = 1):\n    """Kept."""\n\n\n'
+        'def kept_old(a: int = 1):\n    """Old."""\n'
+    )
+    pkg.join("gui.py").write('raise RuntimeError("GUI back-end imported")\n')
+    pkg.join("core.py").write('def core(b: str = "x"):\n    """Core."""\n')
+    sys.path.append(str(tmpdir))
+    traversal.configure_traversal(exclude=["*.gui", "re:.*_old"])
+    try:
+        before = traversal.STATS.snapshot()
+        modules, _ = module_hook("filter_pkg", modules={})
+        pruned = traversal.STATS.since(before)
+    finally:
+        traversal.configure_traversal()
+    assert sorted(modules) == ["filter_pkg", "filter_pkg.core"]
+    assert list(modules["filter_pkg"]) == ["filter_pkg.kept"]
+    assert "filter_pkg.gui" not in sys.modules
+    assert pruned["modules_pruned"] == 1
+    assert pruned["members_pruned"] == 1
+    assert "pruned by the filters" in traversal.STATS.summary()
+
+    # only the sub-modules in __all__ are counted as modules, the functions and
+    # classes are counted once as members
+    traversal.configure_traversal(include=["json.decoder"])
+    try:
+        before = traversal.STATS.snapshot()
+        json_modules, _ = module_hook("json", modules={})
+        pruned = traversal.STATS.since(before)
+    finally:
+        traversal.configure_traversal()
+    assert sorted(json_modules) == ["json", "json.decoder"]
+    assert pruned["modules_pruned"] == 3  # json.encoder, json.scanner and json.tool
+    assert pruned["members_pruned"] == 7  # json.__all__
+
+    # the sandbox workers apply the filters, also when spawned, and report the
+    # members pruned
+    traversal.configure_traversal(exclude=["*.gui", "re:.*_old"])
+    pool = configure_sandbox(True)
+    pool._ctx = multiprocessing.get_context("spawn")
+    try:
+        before = traversal.STATS.snapshot()
+        sandboxed, _ = module_hook("filter_pkg", modules={})
+        pruned = traversal.STATS.since(before)
+    finally:
+        configure_sandbox(False)
+        traversal.configure_traversal()
+    assert {k: list(v) for k, v in sandboxed.items()} == {
+        k: list(v) for k, v in modules.items()
+    }
+    assert pruned["modules_pruned"] == 1
+    assert pruned["members_pruned"] == 1
+
+
+def test_streaming(tmpdir: str, shared_datadir: str):
+    """
+    Test that a streamed palette is identical to the one assembled in memory.
+
+    :param tmpdir: the path to the temp directory to use
+    :param shared_datadir: the path the the local directory
+    """
+    os.chdir(tmpdir)
+    sys.path.append(str(shared_datadir.absolute()))
+    configure_ids("deterministic")
+    try:
+        palettes_from_module("example_rest", outfile="memory.palette")
+        files = palettes_from_module(
+            "example_rest", outfile="streamed.palette.gz", streaming=True
+        )
+    finally:
+        configure_ids()
+    memory = read_palette("memory.palette")
+    streamed = read_palette("streamed.palette.gz")
+    assert files == {"streamed.palette.gz": len(memory["nodeDataArray"])}
+    for palette in (memory, streamed):
+        del palette["modelData"]["filePath"]
+        del palette["modelData"]["lastModifiedDatetime"]
+    assert streamed == memory
+    assert read_palette_model("streamed.palette.gz")["signature"] == (
+        memory["modelData"]["signature"]
+    )
+    # the signature of nodes hashed in batches is the one of all nodes at once
+    nodes = memory["nodeDataArray"]
+    hashes = add_data_hashes(nodes[:1]) + add_data_hashes(nodes[1:])
+    assert graph_signature(hashes) == add_repro_hashes((nodes, ""))[0]
+    # a change of the blockdag internals used by graph_signature would change
+    # all palette signatures
+    assert graph_signature(["0" * 64, "1" * 64, "2" * 64]) == (
+        "7a30068f6a08af49bc642d3fbf8f00b8ce9657034ee5937d57434e1ae4a5b360"
+    )
+    # the unchanged palette is not re-written, the spill files are removed
+    mtime = os.stat("streamed.palette.gz").st_mtime_ns
+    configure_ids("deterministic")
+    try:
+        palettes_from_module(
+            "example_rest",
+            outfile="streamed.palette.gz",
+            streaming=True,
+            incremental=True,
+        )
+    finally:
+        configure_ids()
+    assert os.stat("streamed.palette.gz").st_mtime_ns == mtime
+
+    spool = stream.NodeSpool(directory=str(tmpdir))
+    spool.update({"mod": {"mod.f": {"name": "mod.f", "fields": {"a": {"name": "a"}}}}})
+    spool.update({"other": {"other.f": {"name": "mod.f", "fields": {}}}})
+    assert spool == {"mod": {}, "other": {}}
+    path, count = spool.take()
+    assert count == 1
+    with open(path, encoding="utf-8") as spill:
+        assert json.loads(spill.read())["fields"] == [{"name": "a"}]
+    os.remove(path)
+
+
+def test_llm_docstrings(tmpdir: str, monkeypatch):
+    """
+    Test the concurrent, cached docstring generation using a fake client.
+
+    :param tmpdir: the path to the temp directory to use
+    """
+
+    class FakeModels:
+        def __init__(self):
+            self.requests = []
+            self.running = self.max_running = 0
+
+        async def generate_content(self, model, contents):
+            self.requests.append(contents)
+            self.running += 1
+            self.max_running = max(self.running, self.max_running)
+            await asyncio.sleep(0.01)
+            self.running -= 1
+            if "flaky" in contents and self.requests.count(contents) == 1:
+                raise ConnectionError("try again")
+            return types.SimpleNamespace(text='"""Generated docstring."""')
+
+    models = FakeModels()
+    client = types.SimpleNamespace(aio=types.SimpleNamespace(models=models))
+    cache_dir = str(tmpdir.join("llm"))
+    sources = [f"def func_{i}(a):\n    return a\n" for i in range(5)]
+    sources.append("def flaky(a):\n    return a\n")
+    try:
+        generator = configure_llm(
+            client=client, concurrency=2, rate=0, backoff=0.01, cache_dir=cache_dir
+        )
+        docs = generator.generate_many(sources)
+        assert set(docs) == set(sources)
+        assert docs[sources[0]] == "Generated docstring."
+        assert models.max_running == 2
+        assert generator.stats["retries"] == 1
+        assert len(models.requests) == 7
+        # a new run is answered from the persistent cache
+        generator = configure_llm(client=client, cache_dir=cache_dir)
+        assert generator.generate_many(sources) == docs
+        assert len(models.requests) == 7
+
+        # the undocumented functions of a module are generated up front
+        tmpdir.join("undocumented.py").write(
+            "def first(a: int):\n    return a\n\n\ndef second(b: str):\n    return b\n"
+        )
+        sys.path.append(str(tmpdir))
+        monkeypatch.setattr(module_base, "GEMINI_API_KEY", "fake")
+        generator = configure_llm(client=client, concurrency=2, rate=0)
+        modules, _ = module_hook("undocumented", modules={})
+        node = modules["undocumented"]["undocumented.first"]
+        assert "generated by GenAI" in node["description"]
+        assert generator.stats["requests"] == 2
+        assert models.max_running == 2
+    finally:
+        configure_llm()
+
+
+def test_llm_empty_response(tmpdir: str, monkeypatch):
+    """
+    Test that empty LLM responses are retried, never cached and never crash.
+
+    :param tmpdir: the path to the temp directory to use
+    """
+
+    class FakeModels:
+        def __init__(self):
+            self.requests = []
+
+        async def generate_content(self, model, contents):
+            self.requests.append(contents)
+            if "blocked" in contents:
+                return types.SimpleNamespace(text=None)
+            if "flaky" in contents and self.requests.count(contents) == 1:
+                return types.SimpleNamespace(text="")
+            return types.SimpleNamespace(text="Generated docstring.")
+
+    models = FakeModels()
+    client = types.SimpleNamespace(aio=types.SimpleNamespace(models=models))
+    sources = ["def blocked(a):\n    return a\n", "def flaky(a):\n    return a\n"]
+    try:
+        generator = configure_llm(
+            client=client, rate=0, retries=1, backoff=0.01, cache_dir=str(tmpdir)
+        )
+        docs = generator.generate_many(sources)
+        assert docs == {sources[1]: "Generated docstring."}
+        assert generator.stats["failures"] == 1
+        assert generator.stats["retries"] == 2
+        assert generator.cached(llm.docstring_prompt(sources[0])) is None
+
+        # a failing generation keeps the existing docstrings
+        def fail(sources, model=None):
+            raise RuntimeError("LLM unavailable")
+
+        tmpdir.join("undocumented_fallback.py").write(
+            "def first(a: int):\n    return a\n\n\ndef second(b: str):\n    return b\n"
+        )
+        sys.path.append(str(tmpdir))
+        monkeypatch.setattr(module_base, "GEMINI_API_KEY", "fake")
+        monkeypatch.setattr(generator, "generate_many", fail)
+        modules, _ = module_hook("undocumented_fallback", modules={})
+        node = modules["undocumented_fallback"]["undocumented_fallback.first"]
+        assert "No in-line documentation available" in node["description"]
+    finally:
+        configure_llm()
+
+
+def test_llm_batching():
+    """
+    Test that batched docstring requests are split and fall back to single ones.
+    """
+
+    class FakeModels:
+        def __init__(self):
+            self.requests = []
+
+        async def generate_content(self, model, contents, **kwargs):
+            self.requests.append(contents)
+            if "### Function" not in contents:
+                return types.SimpleNamespace(text="Single docstring.")
+            if "broken" in contents:
+                return types.SimpleNamespace(text="Not JSON")
+            count = contents.count("### Function")
+            # the last function of a batch is always missing in the response
+            docs = {str(i): f"Docstring {i}." for i in range(count - 1)}
+            return types.SimpleNamespace(text=f"```json\n{json.dumps(docs)}\n```")
+
+    models = FakeModels()
+    client = types.SimpleNamespace(aio=types.SimpleNamespace(models=models))
+    sources = [f"def func_{i}(a):\n    return a\n" for i in range(5)]
+    try:
+        generator = configure_llm(client=client, rate=0, batch_size=3)
+        docs = generator.generate_many(sources)
+        # batches [0, 1, 2] and [3, 4], the last ones are requested singly
+        assert [docs[s] for s in sources] == [
+            "Docstring 0.",
+            "Docstring 1.",
+            "Single docstring.",
+            "Docstring 0.",
+            "Single docstring.",
+        ]
+        assert len(models.requests) == 4
+        assert generator.stats["batches"] == 2
+        # an unparsable batch response falls back to single requests
+        broken = [f"def broken_{i}(a):\n    return a\n" for i in range(2)]
+        docs = generator.generate_many(broken)
+        assert [docs[s] for s in broken] == ["Single docstring."] * 2
+        assert generator.stats["batch_failures"] == 1
+        assert len(models.requests) == 7
+    finally:
+        configure_llm()